@@ -0,0 +1,49 @@
+"""
+Микробенчмарк подготовки API запроса: конвертация имени метода
+и параметров для типичного вызова `messages.send`.
+
+    python scripts/benchmark_api_params.py
+
+Скрипт замеряет `vkquick` из этого репозитория,
+а не установленный в окружение пакет
+"""
+import pathlib
+import sys
+import timeit
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from vkquick.api import (  # noqa: E402
+    _convert_method_name,
+    _convert_params_for_api,
+)
+
+MESSAGES_SEND_PARAMS = dict(
+    peer_id=2_000_000_001,
+    message="Привет! Это сообщение отправлено ботом",
+    random_id=123456789,
+    attachment=["photo1_2", "photo1_3"],
+    user_ids=[1, 2, 3, 4, 5, 6, 7, 8, 9, 10],
+    dont_parse_links=True,
+    reply_to=None,
+)
+
+CASES = {
+    "_convert_method_name": lambda: _convert_method_name(
+        "messages.send_message_event_answer"
+    ),
+    "_convert_params_for_api": lambda: _convert_params_for_api(
+        MESSAGES_SEND_PARAMS
+    ),
+}
+
+
+def main() -> None:
+    number = 100_000
+    for name, case in CASES.items():
+        best = min(timeit.repeat(case, number=number, repeat=5))
+        print(f"{name:<25} {best / number * 1e6:.3f} us per call")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 import asyncio
+import re
 import typing
 import unittest.mock
 
@@ -217,3 +218,180 @@ async def test_group_entity_by_string(input_string, group_api):
         == result_user_id.parsed_part.id
         == 1
     )
+
+
+@pytest.mark.parametrize(
+    "arguments_string",
+    [
+        "12 3.5 word",
+        "  -7   .5e3   x  ",
+        "abc123 1",
+        "12 word",
+        "12 3.5",
+        "12 3.5 word extra",
+        "",
+    ],
+)
+@pytest.mark.asyncio
+async def test_arguments_regex_matches_cutters(arguments_string):
+    async def handler(number: int, fraction: float, word: str):
+        ...
+
+    command = vq.Command(handler=handler, invalid_argument_config=None)
+    assert command._arguments_regex is not None
+    mocked_context = unittest.mock.Mock()
+    fast_arguments = await command._make_arguments(
+        mocked_context, arguments_string
+    )
+    command._arguments_regex = None
+    slow_arguments = await command._make_arguments(
+        mocked_context, arguments_string
+    )
+    assert fast_arguments == slow_arguments
+
+
+@pytest.mark.asyncio
+async def test_custom_cut_part_disables_regex_plan():
+    class DoubledIntegerCutter(vq.IntegerCutter):
+        async def cut_part(self, ctx, arguments_string):
+            parsed = await super().cut_part(ctx, arguments_string)
+            return vq.CutterParsingResponse(
+                parsed.parsed_part * 2, parsed.new_arguments_string
+            )
+
+    assert vq.IntegerCutter().regex_plan is not None
+    assert DoubledIntegerCutter().regex_plan is None
+
+    async def handler(number: int):
+        ...
+
+    with unittest.mock.patch(
+        "vkquick.chatbot.command.adapters.IntegerCutter",
+        DoubledIntegerCutter,
+    ):
+        command = vq.Command(handler=handler, invalid_argument_config=None)
+    assert command._arguments_regex is None
+    mocked_context = unittest.mock.Mock()
+    mocked_context.argument_processing_payload = {}
+    arguments = await command._make_arguments(mocked_context, "21")
+    assert arguments == {"number": 42}
+
+
+def test_custom_cut_part_disables_sync_parsing():
+    class DoubledIntegerCutter(vq.IntegerCutter):
+        async def cut_part(self, ctx, arguments_string):
+            parsed = await super().cut_part(ctx, arguments_string)
+            return vq.CutterParsingResponse(
+                parsed.parsed_part * 2, parsed.new_arguments_string
+            )
+
+    assert vq.IntegerCutter().is_sync
+    assert not DoubledIntegerCutter().is_sync
+    assert not vq.OptionalCutter(DoubledIntegerCutter()).is_sync
+
+
+def test_sync_cutters_chain():
+    sync_chain = vq.OptionalCutter(
+        vq.UnionCutter(
+            vq.MutableSequenceCutter(vq.IntegerCutter()),
+            vq.GroupCutter(
+                vq.LiteralCutter("on"),
+                vq.chatbot.command.cutters.BoolCutter(),
+            ),
+        )
+    )
+    assert sync_chain.is_sync
+    assert not vq.OptionalCutter(vq.EntityCutter(vq.User)).is_sync
+
+    mocked_context = unittest.mock.Mock()
+    parsed = sync_chain.cut_part_sync(mocked_context, "1, 2 3 rest")
+    assert parsed.parsed_part == [1, 2, 3]
+    assert parsed.new_arguments_string == "rest"
+    assert asyncio.run(
+        sync_chain.cut_part(mocked_context, "1, 2 3 rest")
+    ) == parsed
+
+
+@pytest.mark.asyncio
+async def test_entities_are_resolved_in_batch():
+    sent_requests = []
+
+    async def send_api_request(method_name, params):
+        sent_requests.append(method_name)
+        if method_name == "execute":
+            screen_names = re.findall(
+                r"'screen_name': '(\w+)'", params["code"]
+            )
+            object_ids = {"durov": 3, "other": 4, "id1": 1}
+            return {
+                "response": [
+                    {"type": "user", "object_id": object_ids[screen_name]}
+                    for screen_name in screen_names
+                ]
+            }
+        user_ids = map(int, params["user_ids"].split(","))
+        return {
+            "response": [
+                {"id": user_id, "first_name": "A", "last_name": "B"}
+                for user_id in user_ids
+            ]
+        }
+
+    api = vq.API(
+        "token",
+        token_owner=vq.TokenOwner.GROUP,
+        rate_limiter=vq.TokenBucketRateLimiter(per_second=1000),
+    )
+    api._send_api_request = send_api_request
+
+    async def ban(users: typing.List[vq.User]):
+        ...
+
+    command = vq.Command(handler=ban)
+    ctx = unittest.mock.Mock()
+    ctx.api = api
+    ctx.argument_processing_payload = {}
+    ctx.msg.is_cropped = False
+    ctx.msg.reply_message = None
+    ctx.msg.fwd_messages = []
+    arguments = await command._make_arguments(
+        ctx, "[id1|a] [id2|b] durov vk.com/other id1"
+    )
+    assert [user.id for user in arguments["users"]] == [1, 2, 3, 4, 1]
+    assert sent_requests == ["execute", "users.get"]
+    assert "_entities_resolver" not in ctx.argument_processing_payload
+
+
+@pytest.mark.asyncio
+async def test_deferred_entity_does_not_consume_next_argument():
+    sent_requests = []
+
+    async def send_api_request(method_name, params):
+        sent_requests.append(method_name)
+        # Такого короткого имени нет
+        return {"response": []}
+
+    api = vq.API(
+        "token",
+        token_owner=vq.TokenOwner.GROUP,
+        rate_limiter=vq.TokenBucketRateLimiter(per_second=1000),
+    )
+    api._send_api_request = send_api_request
+
+    async def handler(user: typing.Optional[vq.User], word: str):
+        ...
+
+    invalid_argument_config = unittest.mock.Mock(vq.InvalidArgumentConfig)
+    command = vq.Command(
+        handler=handler, invalid_argument_config=invalid_argument_config
+    )
+    ctx = unittest.mock.Mock()
+    ctx.api = api
+    ctx.argument_processing_payload = {}
+    ctx.msg.is_cropped = False
+    ctx.msg.reply_message = None
+    ctx.msg.fwd_messages = []
+    arguments = await command._make_arguments(ctx, "durovxyz")
+    assert arguments == {"user": None, "word": "durovxyz"}
+    assert sent_requests == ["utils.resolveScreenName"]
+    invalid_argument_config.on_invalid_argument.assert_not_called()
@@ -0,0 +1,187 @@
+import asyncio
+
+import pytest
+
+import vkquick as vq
+
+
+def make_job(handled, number, release):
+    async def job():
+        await release.wait()
+        handled.append(number)
+
+    return job
+
+
+@pytest.mark.asyncio
+async def test_block_policy_limits_in_flight():
+    dispatcher = vq.EventDispatcher(max_in_flight=2)
+    handled = []
+    release = asyncio.Event()
+    for number in range(2):
+        await dispatcher.dispatch(
+            "message_new", make_job(handled, number, release)
+        )
+    blocked = asyncio.create_task(
+        dispatcher.dispatch("message_new", make_job(handled, 2, release))
+    )
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+    assert dispatcher.statistics.in_flight == 2
+
+    release.set()
+    await blocked
+    await asyncio.sleep(0.01)
+    assert sorted(handled) == [0, 1, 2]
+    assert dispatcher.statistics.finished == 3
+
+
+@pytest.mark.asyncio
+async def test_drop_oldest_and_shed_policies():
+    release = asyncio.Event()
+    handled = []
+    dispatcher = vq.EventDispatcher(
+        max_in_flight=1,
+        overflow_policy=vq.OverflowPolicy.DROP_OLDEST,
+        max_pending=1,
+    )
+    for number in range(3):
+        await dispatcher.dispatch(
+            "message_new", make_job(handled, number, release)
+        )
+    assert dispatcher.statistics.dropped == 1
+    release.set()
+    await asyncio.sleep(0.01)
+    assert handled == [0, 2]
+
+    release.clear()
+    dispatcher = vq.EventDispatcher(
+        max_in_flight=1,
+        overflow_policy=vq.OverflowPolicy.SHED,
+        shed_event_types={"message_typing_state"},
+    )
+    await dispatcher.dispatch("message_new", make_job(handled, 3, release))
+    await dispatcher.dispatch(
+        "message_typing_state", make_job(handled, 4, release)
+    )
+    assert dispatcher.statistics.dropped == 1
+    release.set()
+
+
+@pytest.mark.asyncio
+async def test_lanes_keep_order_within_key():
+    dispatcher = vq.EventDispatcher(max_in_flight=10)
+    handled = []
+
+    def make_laned_job(key, number):
+        async def job():
+            await asyncio.sleep(0.01 if number == 0 else 0)
+            handled.append((key, number))
+
+        return job
+
+    for number in range(3):
+        for key in ("a", "b"):
+            await dispatcher.dispatch(
+                "message_new", make_laned_job(key, number), lane_key=key
+            )
+    assert dispatcher.statistics.lanes == 2
+    assert dispatcher.statistics.in_flight == 2
+    await asyncio.sleep(0.05)
+    assert [number for key, number in handled if key == "a"] == [0, 1, 2]
+    assert [number for key, number in handled if key == "b"] == [0, 1, 2]
+    assert dispatcher.statistics.lanes == 0
+
+
+def test_peer_id_lane_key():
+    message_event = vq.GroupEvent(
+        {"type": "message_new", "object": {"message": {"peer_id": 5}}}
+    )
+    storage = vq.NewEvent(event=message_event, bot=None)
+    assert vq.peer_id_lane_key(storage) == 5
+    typing_event = vq.UserEvent([63, 5, 1])
+    assert (
+        vq.peer_id_lane_key(vq.NewEvent(event=typing_event, bot=None)) is None
+    )
+
+
+@pytest.mark.asyncio
+async def test_dropped_lane_head_does_not_stall_lane():
+    release = asyncio.Event()
+    handled = []
+    dispatcher = vq.EventDispatcher(
+        max_in_flight=1,
+        overflow_policy=vq.OverflowPolicy.DROP_OLDEST,
+        max_pending=1,
+    )
+    await dispatcher.dispatch("message_new", make_job(handled, 0, release))
+    await dispatcher.dispatch(
+        "message_new", make_job(handled, 1, release), lane_key="a"
+    )
+    await dispatcher.dispatch(
+        "message_new", make_job(handled, 2, release), lane_key="a"
+    )
+    await dispatcher.dispatch("message_new", make_job(handled, 3, release))
+    release.set()
+    await asyncio.sleep(0.01)
+    assert dispatcher.statistics.dropped == 2
+    assert handled == [0, 3]
+    assert dispatcher.statistics.lanes == 0
+
+
+@pytest.mark.asyncio
+async def test_overflowing_event_drops_exactly_one_job():
+    release = asyncio.Event()
+    handled = []
+    dispatcher = vq.EventDispatcher(
+        max_in_flight=1,
+        overflow_policy=vq.OverflowPolicy.DROP_OLDEST,
+        max_pending=50,
+    )
+    await dispatcher.dispatch("message_new", make_job(handled, 0, release))
+    for number in range(1, 51):
+        await dispatcher.dispatch(
+            "message_edit", make_job(handled, number, release), lane_key="a"
+        )
+    assert dispatcher.statistics.dropped == 0
+    await dispatcher.dispatch(
+        "message_new", make_job(handled, 51, release), lane_key="b"
+    )
+    statistics = dispatcher.statistics
+    assert statistics.dropped == 1
+    # Отброшено самое старое событие, а не пришедшее
+    assert statistics.dropped_by_type == {"message_edit": 1}
+    assert statistics.pending + statistics.queued_in_lanes == 50
+
+    release.set()
+    await asyncio.sleep(0.05)
+    assert handled == [0, *range(2, 52)]
+    assert dispatcher.statistics.started == 51
+    assert dispatcher.statistics.finished == 51
+    assert dispatcher.statistics.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_lane_queues_count_toward_max_pending():
+    release = asyncio.Event()
+    handled = []
+    dispatcher = vq.EventDispatcher(max_in_flight=10, max_pending=2)
+    for number in range(3):
+        await dispatcher.dispatch(
+            "message_new", make_job(handled, number, release), lane_key="a"
+        )
+    assert dispatcher.statistics.queued_in_lanes == 2
+    blocked = asyncio.create_task(
+        dispatcher.dispatch(
+            "message_new", make_job(handled, 3, release), lane_key="a"
+        )
+    )
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+
+    release.set()
+    await blocked
+    await asyncio.sleep(0.01)
+    assert handled == [0, 1, 2, 3]
+    assert dispatcher.statistics.started == 4
+    assert dispatcher.statistics.lanes == 0
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+import vkquick as vq
+
+
+def test_pages_cache_merges_fields():
+    cache = vq.PagesCache(maxsize=2)
+    cache.put(vq.User, {"id": 1, "sex": 2}, ["sex"])
+    cache.put(vq.User, {"id": 1, "bdate": "1.1"}, ["bdate", "city"])
+
+    assert cache.get(vq.User, 1, ["sex", "city"]) == {
+        "id": 1,
+        "sex": 2,
+        "bdate": "1.1",
+    }
+    assert cache.get(vq.User, 1, ["sex", "photo_50"]) is None
+    assert cache.get(vq.User, 1, ["sex"], name_case="gen") is None
+    assert cache.get(vq.Group, 1, ["sex"]) is None
+
+    cache.put(vq.User, {"id": 2}, [])
+    cache.put(vq.User, {"id": 3}, [])
+    assert cache.get(vq.User, 1, []) is None
+    assert len(cache) == 2
+    assert cache.statistics == vq.PagesCacheStatistics(
+        hits=1, misses=4, evictions=1
+    )
+
+
+def test_pages_cache_ttl():
+    cache = vq.PagesCache(ttl=0)
+    cache.put(vq.User, {"id": 1}, [])
+    assert cache.get(vq.User, 1, []) is None
+
+
+@pytest.mark.asyncio
+async def test_fetch_pages_through_cache():
+    sent_requests = []
+
+    async def send_api_request(method_name, params):
+        sent_requests.append(params["user_ids"])
+        return {
+            "response": [
+                {"id": int(user_id), "first_name": "A", "last_name": "B"}
+                for user_id in params["user_ids"].split(",")
+            ]
+        }
+
+    api = vq.API(
+        "token",
+        token_owner=vq.TokenOwner.GROUP,
+        rate_limiter=vq.TokenBucketRateLimiter(per_second=1000),
+    )
+    api._send_api_request = send_api_request
+
+    await vq.User.fetch_one(api, 1, fields=["sex", "city"])
+    user = await vq.User.fetch_one(api, "1", fields=["city"])
+    users = await vq.User.fetch_many(api, 2, 1, 3, fields=["sex"])
+
+    assert user.id == 1
+    assert [user.id for user in users] == [2, 1, 3]
+    assert sent_requests == ["1", "2,3"]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_fetch_one_is_batched():
+    sent_requests = []
+
+    async def send_api_request(method_name, params):
+        sent_requests.append(params["user_ids"])
+        user_ids = [int(user_id) for user_id in params["user_ids"].split(",")]
+        if user_ids == [404]:
+            return {
+                "error": {
+                    "error_code": 113,
+                    "error_msg": "Invalid user id",
+                    "request_params": [],
+                }
+            }
+        return {
+            "response": [
+                {"id": user_id, "first_name": "A", "last_name": "B"}
+                for user_id in user_ids
+                if user_id != 404
+            ]
+        }
+
+    api = vq.API(
+        "token",
+        token_owner=vq.TokenOwner.GROUP,
+        rate_limiter=vq.TokenBucketRateLimiter(per_second=1000),
+    )
+    api._send_api_request = send_api_request
+
+    first, second, same, missing = await asyncio.gather(
+        vq.User.fetch_one(api, 1),
+        vq.User.fetch_one(api, 2),
+        vq.User.fetch_one(api, 1),
+        vq.User.fetch_one(api, 404),
+        return_exceptions=True,
+    )
+    assert (first.id, second.id, same.id) == (1, 2, 1)
+    assert first is not same
+    assert isinstance(missing, vq.APIError[113])
+    assert sent_requests == ["1,2,404", "404"]
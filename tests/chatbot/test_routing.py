@@ -0,0 +1,132 @@
+import dataclasses
+import unittest.mock
+
+import pytest
+
+import vkquick as vq
+
+
+def test_commands_index_candidates():
+    app = vq.App(prefixes=["/"])
+    package = vq.Package()
+
+    @app.command("ping", "пинг")
+    async def ping():
+        ...
+
+    @app.command("pin", routing_re_flags=0)
+    async def pin():
+        ...
+
+    @package.command("echo", prefixes=["!"])
+    async def echo(text: str):
+        ...
+
+    @package.command()
+    async def anything():
+        ...
+
+    app.add_package(package)
+    index = vq.CommandsIndex(app.packages)
+
+    def names(text):
+        return {
+            command.handler.__name__
+            for commands in index.find_candidates(text).values()
+            for command in commands
+        }
+
+    assert names("/PING") == {"ping", "anything"}
+    assert names("/ПИНГ") == {"ping", "anything"}
+    assert names("/ping") == {"ping", "pin", "anything"}
+    assert names("/PIN") == {"anything"}
+    assert names("!echo hi") == {"echo"}
+    assert names("hello") == set()
+    assert id(package) in index.find_candidates("!echo")
+
+
+@pytest.mark.asyncio
+async def test_package_skips_non_matching_handlers():
+    calls = []
+
+    @dataclasses.dataclass
+    class CountingFilter(vq.BaseFilter):
+        async def make_decision(self, ctx, **kwargs):
+            calls.append("filter")
+
+    package = vq.Package(filter=CountingFilter())
+
+    @package.command("ping", prefixes=["/"])
+    async def ping():
+        calls.append("ping")
+
+    @package.on_user_joined_by_link()
+    async def joined(ctx, user):
+        calls.append("joined")
+
+    ctx = unittest.mock.Mock()
+    ctx.msg.text = "hello"
+    ctx.msg.action = None
+    ctx.msg.payload = None
+    await package.handle_message(ctx)
+    assert calls == []
+
+    ctx.msg.text = "/ping"
+    await package.handle_message(ctx)
+    assert calls == ["filter", "ping"]
+
+    ctx.msg.text = ""
+    ctx.msg.action = {"type": "chat_invite_user_by_link"}
+    await package.handle_message(ctx)
+    assert calls == ["filter", "ping", "filter", "joined"]
+
+
+@pytest.mark.asyncio
+async def test_event_handlers_index():
+    app = vq.App()
+    package = vq.Package()
+    handled = []
+
+    @app.on_event("message_typing_state")
+    async def app_typing(event):
+        handled.append("app")
+
+    @package.on_event("message_typing_state", "group_join")
+    async def package_typing(event):
+        handled.append("package")
+
+    app.add_package(package)
+    assert len(app.get_event_handlers("message_typing_state")) == 2
+    assert app.get_event_handlers("message_read") == ()
+
+    new_event = unittest.mock.Mock()
+    new_event.event.type = "message_typing_state"
+    await app.route_event(new_event)
+    assert sorted(handled) == ["app", "package"]
+
+    new_event.event.type = "message_read"
+    await app.route_event(new_event)
+    assert "message_read" not in package.event_handlers
+
+
+@pytest.mark.asyncio
+async def test_failing_event_handler_does_not_skip_commands():
+    app = vq.App()
+
+    @app.on_event("message_new")
+    async def broken(event):
+        raise RuntimeError("boom")
+
+    bot = vq.Bot(
+        app=app,
+        api=unittest.mock.Mock(),
+        events_factory=unittest.mock.Mock(),
+    )
+    bot._route_message = unittest.mock.AsyncMock()
+    event = vq.GroupEvent(
+        {"type": "message_new", "object": {}, "group_id": 1}
+    )
+    await bot.handle_event(
+        vq.NewEvent(event=event, bot=bot), wrap_to_task=False
+    )
+    bot._route_message.assert_awaited_once()
@@ -0,0 +1,111 @@
+import asyncio
+
+import aiohttp.test_utils
+import aiohttp.web
+import pytest
+
+import vkquick as vq
+
+
+@pytest.mark.asyncio
+async def test_streaming_downloads(tmp_path):
+    active_downloads = 0
+    max_active_downloads = 0
+
+    async def download(request):
+        nonlocal active_downloads, max_active_downloads
+        active_downloads += 1
+        max_active_downloads = max(max_active_downloads, active_downloads)
+        await asyncio.sleep(0.01)
+        active_downloads -= 1
+        return aiohttp.web.Response(
+            body=request.match_info["name"].encode() * 100
+        )
+
+    server = aiohttp.test_utils.TestServer(aiohttp.web.Application())
+    server.app.router.add_get("/{name}", download)
+    await server.start_server()
+    try:
+        chunks = [
+            chunk
+            async for chunk in vq.iter_file_chunks(
+                str(server.make_url("/abc")), chunk_size=30
+            )
+        ]
+        budget = vq.ByteBudget(1000)
+        written_sizes = await vq.save_files(
+            [
+                (str(server.make_url(f"/f{index}")), tmp_path / f"{index}")
+                for index in range(6)
+            ],
+            max_parallel_downloads=3,
+            budget=budget,
+        )
+    finally:
+        await vq.close_shared_sessions()
+        await server.close()
+
+    assert b"".join(chunks) == b"abc" * 100
+    assert max(map(len, chunks)) <= 30
+    assert written_sizes == [200] * 6
+    assert (tmp_path / "5").read_bytes() == b"f5" * 100
+    assert max_active_downloads == 3
+    assert budget.used_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_save_file_budget_and_cleanup(tmp_path):
+    budget = vq.ByteBudget(64)
+    used_sizes = []
+
+    async def chunked(request):
+        response = aiohttp.web.StreamResponse()
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        for _ in range(5):
+            used_sizes.append(budget.used_bytes)
+            await response.write(b"x" * 20)
+            await asyncio.sleep(0.01)
+        if request.match_info["name"] == "broken":
+            request.transport.close()
+            return response
+        await response.write_eof()
+        return response
+
+    server = aiohttp.test_utils.TestServer(aiohttp.web.Application())
+    server.app.router.add_get("/{name}", chunked)
+    await server.start_server()
+    try:
+        written_size = await vq.save_file(
+            str(server.make_url("/ok")),
+            tmp_path / "ok",
+            budget=budget,
+            chunk_size=16,
+        )
+        with pytest.raises(aiohttp.ClientError):
+            await vq.save_file(
+                str(server.make_url("/broken")),
+                tmp_path / "broken",
+                budget=budget,
+                chunk_size=16,
+            )
+    finally:
+        await vq.close_shared_sessions()
+        await server.close()
+
+    assert written_size == 100
+    assert (tmp_path / "ok").read_bytes() == b"x" * 100
+    assert 16 in used_sizes
+    assert budget.used_bytes == 0
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["ok"]
+
+
+@pytest.mark.asyncio
+async def test_helpers_share_pooled_session():
+    session = vq.get_shared_session()
+    assert vq.get_shared_session() is session
+    await vq.close_shared_sessions()
+    assert session.closed
+    new_session = vq.get_shared_session()
+    assert new_session is not session
+    await vq.close_shared_sessions()
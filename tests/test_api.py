@@ -0,0 +1,609 @@
+import asyncio
+import contextlib
+import io
+import re
+import socket
+
+import aiohttp.test_utils
+import aiohttp.web
+import pytest
+
+import vkquick as vq
+
+
+def make_api(responses, **kwargs):
+    """
+    API, который вместо HTTP запросов отдает заготовленные ответы
+    и запоминает, какие методы были вызваны
+    """
+    api = vq.API(
+        "token",
+        token_owner=vq.TokenOwner.GROUP,
+        rate_limiter=vq.TokenBucketRateLimiter(per_second=1000),
+        **kwargs,
+    )
+    api.sent_requests = []
+
+    async def send_api_request(method_name, params):
+        api.sent_requests.append((method_name, params))
+        return responses(method_name, params)
+
+    api._send_api_request = send_api_request
+    return api
+
+
+@pytest.mark.asyncio
+async def test_batch_requests_into_execute():
+    def responses(method_name, params):
+        assert method_name == "execute"
+        calls = params["code"].split("), ")
+        return {
+            "response": [
+                False if "messages.send" in call else [{"id": 1}]
+                for call in calls
+            ],
+            "execute_errors": [
+                {
+                    "method": "messages.send",
+                    "error_code": 901,
+                    "error_msg": "Can't send messages",
+                }
+            ],
+        }
+
+    api = make_api(responses, batch_requests=True)
+    users, send_error = await asyncio.gather(
+        api.method("users.get", user_ids=1),
+        api.method("messages.send", peer_id=1, message="hi"),
+        return_exceptions=True,
+    )
+    assert users == [{"id": 1}]
+    assert isinstance(send_error, vq.APIError[901])
+    assert len(api.sent_requests) == 1
+    assert "API.users.get" in api.sent_requests[0][1]["code"]
+    # Таски отправки пачек хранятся, пока не завершатся
+    assert not api._requests_batcher._sending_tasks
+
+
+@pytest.mark.asyncio
+async def test_batched_calls_are_serialized_as_json():
+    england_flag = (
+        "🏴\U000e0067\U000e0062\U000e0065\U000e006e\U000e0067\U000e007f"
+    )
+
+    def responses(method_name, params):
+        if method_name == "execute":
+            # `users.get` сам вернул `false`, поэтому неизвестно,
+            # чья ошибка в `execute_errors`
+            return {
+                "response": [1, False, False],
+                "execute_errors": [
+                    {
+                        "method": "groups.getById",
+                        "error_code": 100,
+                        "error_msg": "Invalid group id",
+                    }
+                ],
+            }
+        elif method_name == "groups.getById":
+            return {
+                "error": {
+                    "error_code": 100,
+                    "error_msg": "Invalid group id",
+                    "request_params": [],
+                }
+            }
+        return {"response": False}
+
+    api = make_api(responses, batch_requests=True)
+    sent, users, group_error = await asyncio.gather(
+        api.method("messages.send", peer_id=1, message=f"Go {england_flag}"),
+        api.method("users.get", user_ids=1),
+        api.method("groups.getById", group_id=0),
+        return_exceptions=True,
+    )
+    assert (sent, users) == (1, False)
+    assert isinstance(group_error, vq.APIError[100])
+    code = api.sent_requests[0][1]["code"]
+    assert f'"message":"Go {england_flag}"' in code.replace(": ", ":")
+    assert "\\U" not in code
+    assert [method_name for method_name, _ in api.sent_requests] == [
+        "execute",
+        "users.get",
+        "groups.getById",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_single_batched_request_is_sent_directly():
+    api = make_api(
+        lambda method_name, params: {"response": method_name},
+        batch_requests=True,
+    )
+    assert await api.method("users.get") == "users.get"
+
+
+@pytest.mark.asyncio
+async def test_api_pool_skips_rate_limited_token():
+    def flooded(method_name, params):
+        return {
+            "error": {
+                "error_code": 6,
+                "error_msg": "Too many requests per second",
+                "request_params": [],
+            }
+        }
+
+    flooded_api = make_api(flooded)
+    free_api = make_api(lambda method_name, params: {"response": 1})
+    pool = vq.APIPool(flooded_api, free_api)
+
+    assert await pool.users.get() == 1
+    assert await pool.method("users.get") == 1
+    assert len(flooded_api.sent_requests) <= 1
+    assert len(free_api.sent_requests) == 2
+    assert pool.statistics[free_api].requests == 2
+    assert pool.statistics[free_api].in_flight == 0
+    # Ошибки 6 и 9 обрабатывает пул, а не повторы токенов
+    for api in pool.apis:
+        assert api.retry_policy.retry_error_codes == {10}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_read_requests_are_deduplicated():
+    api = make_api(lambda method_name, params: {"response": [{"id": 1}]})
+    responses = await asyncio.gather(
+        *(api.method("users.get", user_ids=1) for _ in range(5)),
+        api.method("messages.send", message="hi"),
+        api.method("messages.send", message="hi"),
+    )
+    assert responses[0] == responses[4] == [{"id": 1}]
+    sent_methods = [method_name for method_name, _ in api.sent_requests]
+    assert sent_methods.count("users.get") == 1
+    assert sent_methods.count("messages.send") == 2
+
+
+@pytest.mark.asyncio
+async def test_method_proxies_are_independent():
+    api = make_api(lambda method_name, params: {"response": method_name})
+    users_get = api.users.get
+    cached_groups = api.cached.groups
+    assert await api.messages.get_history() == "messages.getHistory"
+    assert await users_get() == "users.get"
+    assert await cached_groups.get_by_id() == "groups.getById"
+    assert await api.cached.groups.get_by_id() == "groups.getById"
+    assert len(api.sent_requests) == 3
+
+
+def test_params_conversion():
+    photo = vq.Photo({"owner_id": 1, "id": 2})
+    converted = vq.api._convert_params_for_api(
+        dict(
+            peer_id=1,
+            message="hi",
+            user_ids=[1, 2, 3],
+            attachment=(photo, "photo1_3"),
+            keyboard={"buttons": []},
+            dont_parse_links=True,
+            reply_to=None,
+        )
+    )
+    assert converted == dict(
+        peer_id="1",
+        message="hi",
+        user_ids="1,2,3",
+        attachment="photo1_2,photo1_3",
+        keyboard='{"buttons":[]}',
+        dont_parse_links=1,
+    )
+    assert vq.api._convert_method_name("groups.get_by_id") == "groups.getById"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+async def test_cache_backends_stale_while_revalidate(backend, tmp_path):
+    if backend == "memory":
+        cache_backend = vq.MemoryCacheBackend()
+    else:
+        cache_backend = vq.SQLiteCacheBackend(tmp_path / "cache.sqlite")
+    responses = iter(range(10))
+    api = make_api(
+        lambda method_name, params: {"response": next(responses)},
+        cache_backend=cache_backend,
+        cache_policies={"users.get": vq.CachePolicy(ttl=0, stale_ttl=60)},
+    )
+
+    assert await api.cached.users.get() == 0
+    # Устаревший ответ отдается сразу, а новый запрашивается в фоне
+    assert await api.cached.users.get() == 0
+    await asyncio.sleep(0.1)
+    assert await api.cached.users.get() == 1
+    await asyncio.sleep(0.1)
+    assert len(api.sent_requests) == 3
+
+    other_api = make_api(
+        lambda method_name, params: {"response": "other token"},
+        cache_backend=cache_backend,
+    )
+    other_api._cache_key_prefix = "other"
+    assert await other_api.cached.users.get() == "other token"
+    await cache_backend.close()
+
+
+@pytest.mark.asyncio
+async def test_cache_policies():
+    api = make_api(
+        lambda method_name, params: {"response": method_name},
+        cache_policies={"groups.get_by_id": vq.CachePolicy(ttl=3600)},
+    )
+    # Метод из таблицы кэшируется без `use_cache`
+    await api.groups.get_by_id()
+    await api.groups.get_by_id()
+    # Изменяющие методы не кэшируются даже с `use_cache`
+    await api.cached.messages.send(peer_id=1)
+    await api.cached.messages.send(peer_id=1)
+
+    sent_methods = [method_name for method_name, _ in api.sent_requests]
+    assert sent_methods == [
+        "groups.getById",
+        "messages.send",
+        "messages.send",
+    ]
+    statistics = api.cache_statistics["groups.getById"]
+    assert (statistics.hits, statistics.misses) == (1, 1)
+    assert statistics.hit_rate == 0.5
+    assert "messages.send" not in api.cache_statistics
+
+
+@contextlib.asynccontextmanager
+async def run_upload_server():
+    """
+    Локальный сервер загрузки: возвращает содержимое
+    полученных файлов (`fileNN`) в поле `photo`
+    """
+    active_uploads = 0
+    upload_server = aiohttp.test_utils.TestServer(aiohttp.web.Application())
+
+    async def upload(request):
+        nonlocal active_uploads
+        active_uploads += 1
+        upload_server.max_active_uploads = max(
+            upload_server.max_active_uploads, active_uploads
+        )
+        body = await request.read()
+        files = re.findall(r"file\d\d", body.decode())
+        await asyncio.sleep(0.01)
+        active_uploads -= 1
+        return aiohttp.web.json_response(
+            {"server": 1, "photo": ",".join(files), "hash": "h", "file": "f"}
+        )
+
+    upload_server.app.router.add_post("/upload", upload)
+    upload_server.max_active_uploads = 0
+    await upload_server.start_server()
+    try:
+        yield upload_server
+    finally:
+        await upload_server.close()
+
+
+@pytest.mark.asyncio
+async def test_photo_batches_are_uploaded_concurrently():
+    def responses(method_name, params):
+        if method_name == "photos.getMessagesUploadServer":
+            upload_url = str(upload_server.make_url("/upload"))
+            return {"response": {"upload_url": upload_url}}
+        return {
+            "response": [
+                {"id": file, "owner_id": 1}
+                for file in params["photo"].split(",")
+            ]
+        }
+
+    api = make_api(responses)
+    photos = [f"file{index:02}".encode() for index in range(12)]
+    async with run_upload_server() as upload_server, api:
+        uploaded_photos = await api.upload_photos_to_message(
+            *photos, max_parallel_batches=2
+        )
+
+    assert [photo.fields["id"] for photo in uploaded_photos] == [
+        photo.decode() for photo in photos
+    ]
+    sent_methods = [method_name for method_name, _ in api.sent_requests]
+    assert sent_methods.count("photos.getMessagesUploadServer") == 1
+    assert upload_server.max_active_uploads == 2
+
+
+@pytest.mark.asyncio
+async def test_byte_budget_queues_transfers():
+    budget = vq.ByteBudget(10)
+    assert await budget.acquire(6) == 6
+    waiter = asyncio.create_task(budget.acquire(6))
+    await asyncio.sleep(0)
+    assert not waiter.done()
+    budget.release(6)
+    assert await waiter == 6
+    # Передача больше лимита ждет, пока бюджет не опустеет
+    assert budget.used_bytes == 6
+    oversized = asyncio.create_task(budget.acquire(100))
+    await asyncio.sleep(0)
+    assert not oversized.done()
+    budget.release(6)
+    assert await oversized == 10
+
+
+@pytest.mark.asyncio
+async def test_uploads_are_streamed(tmp_path):
+    def responses(method_name, params):
+        if method_name.endswith("UploadServer"):
+            upload_url = str(upload_server.make_url("/upload"))
+            return {"response": {"upload_url": upload_url}}
+        elif method_name == "docs.save":
+            return {"response": {"doc": {"id": params["photo"]}}}
+        return {
+            "response": [
+                {"id": file, "owner_id": 1}
+                for file in params["photo"].split(",")
+            ]
+        }
+
+    async def iter_chunks():
+        for chunk in (b"fi", b"le", b"02"):
+            yield chunk
+
+    photo_path = tmp_path / "photo.png"
+    photo_path.write_bytes(b"file00")
+    api = make_api(responses)
+    async with run_upload_server() as upload_server, api:
+        with open(photo_path, "rb") as photo_file:
+            uploaded_photos = await api.upload_photos_to_message(
+                photo_path, photo_file, iter_chunks()
+            )
+        document = await api.upload_doc_to_message(
+            iter_chunks(), "document.txt"
+        )
+
+    assert [photo.fields["id"] for photo in uploaded_photos] == [
+        "file00",
+        "file00",
+        "file02",
+    ]
+    assert document.fields["id"] == "file02"
+    assert api.upload_budget.used_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_bytes_io_is_uploaded_whole():
+    def responses(method_name, params):
+        if method_name == "photos.getMessagesUploadServer":
+            upload_url = str(upload_server.make_url("/upload"))
+            return {"response": {"upload_url": upload_url}}
+        return {
+            "response": [
+                {"id": file, "owner_id": 1}
+                for file in params["photo"].split(",")
+            ]
+        }
+
+    # Позиция после записи -- в конце потока
+    photo = io.BytesIO()
+    photo.write(b"file00")
+    api = make_api(responses)
+    async with run_upload_server() as upload_server, api:
+        uploaded_photos = await api.upload_photos_to_message(photo)
+
+    assert [photo.fields["id"] for photo in uploaded_photos] == ["file00"]
+    assert api.upload_budget.used_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_shared_transport_connector():
+    request_received = asyncio.Event()
+    release_response = asyncio.Event()
+
+    async def index(request):
+        return aiohttp.web.Response(text="ok")
+
+    async def slow(request):
+        request_received.set()
+        await release_response.wait()
+        return aiohttp.web.Response(text="ok")
+
+    async def stream(request):
+        response = aiohttp.web.StreamResponse()
+        await response.prepare(request)
+        await response.write(b"o")
+        await release_body.wait()
+        await response.write(b"k")
+        await response.write_eof()
+        return response
+
+    release_body = asyncio.Event()
+    server = aiohttp.test_utils.TestServer(aiohttp.web.Application())
+    server.app.router.add_route("*", "/", index)
+    server.app.router.add_get("/slow", slow)
+    server.app.router.add_get("/stream", stream)
+    await server.start_server()
+    transport = vq.TransportConfig(
+        share_connector=True, prewarm_connections=3, send_buffer_size=2 ** 16
+    )
+    api = vq.API(
+        "token", requests_url=str(server.make_url("/")), transport=transport
+    )
+    long_poll = vq.GroupLongPoll(api, transport=api.transport)
+    try:
+        await api.prewarm_connections()
+        assert (
+            api.requests_session.connector
+            is long_poll.requests_session.connector
+        )
+        statistics = api.transport_statistics
+        assert (statistics.opened, statistics.in_use) == (3, 0)
+        assert statistics.idle == 3
+        assert long_poll.transport_statistics == statistics
+
+        async def request_slowly():
+            async with api.requests_session.get(server.make_url("/slow")):
+                pass
+
+        request = asyncio.create_task(request_slowly())
+        await request_received.wait()
+        statistics = api.transport_statistics
+        assert (statistics.opened, statistics.in_use) == (3, 1)
+        assert statistics.idle == 2
+        release_response.set()
+        await request
+        assert api.transport_statistics.in_use == 0
+
+        # Соединение занято, пока читается тело ответа
+        stream_url = server.make_url("/stream")
+        async with api.requests_session.get(stream_url) as response:
+            assert api.transport_statistics.in_use == 1
+            release_body.set()
+            assert await response.read() == b"ok"
+        assert api.transport_statistics.in_use == 0
+        await api.close_session()
+        # Сессия не закрывает общий коннектор
+        assert not long_poll.requests_session.connector.closed
+    finally:
+        await long_poll.close_session()
+        await transport.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_tcp_nodelay_can_be_disabled():
+    release_body = asyncio.Event()
+
+    async def stream(request):
+        response = aiohttp.web.StreamResponse()
+        await response.prepare(request)
+        await release_body.wait()
+        await response.write_eof(b"ok")
+        return response
+
+    server = aiohttp.test_utils.TestServer(aiohttp.web.Application())
+    server.app.router.add_get("/", stream)
+    await server.start_server()
+    session = vq.TransportConfig(tcp_nodelay=False).make_session()
+    try:
+        for _ in range(2):
+            release_body.clear()
+            async with session.get(server.make_url("/")) as response:
+                transport = response.connection.transport
+                sock = transport.get_extra_info("socket")
+                assert not sock.getsockopt(
+                    socket.IPPROTO_TCP, socket.TCP_NODELAY
+                )
+                release_body.set()
+                await response.read()
+        assert session.connector.statistics.opened == 1
+    finally:
+        await session.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_retry_policy():
+    statuses = iter([503] + [200] * 7)
+    vk_errors = iter([10, 10, None, 10, 10, 10, 10])
+
+    async def method(request):
+        status = next(statuses)
+        if status != 200:
+            return aiohttp.web.Response(status=status)
+        error_code = next(vk_errors)
+        if error_code is None:
+            return aiohttp.web.json_response({"response": 1})
+        return aiohttp.web.json_response(
+            {
+                "error": {
+                    "error_code": error_code,
+                    "error_msg": "Internal server error",
+                    "request_params": [],
+                }
+            }
+        )
+
+    server = aiohttp.test_utils.TestServer(aiohttp.web.Application())
+    server.app.router.add_post("/users.get", method)
+    await server.start_server()
+    api = vq.API(
+        "token",
+        requests_url=str(server.make_url("/")),
+        retry_policy=vq.RetryPolicy(max_attempts=4, base_delay=0.001),
+        rate_limiter=vq.TokenBucketRateLimiter(100),
+        deduplicate_requests=False,
+    )
+    try:
+        async with api:
+            assert await api.users.get() == 1
+            # Попытки кончились на ошибке 10, и она пробрасывается
+            with pytest.raises(vq.APIError[10]):
+                await api.users.get()
+    finally:
+        await server.close()
+
+    assert api.retry_statistics.retries == 6
+    assert api.retry_statistics.exhausted == 1
+    assert api.retry_statistics.reasons == {"http_503": 1, "error_10": 5}
+
+
+@pytest.mark.asyncio
+async def test_retries_acquire_rate_limiter():
+    class CountingRateLimiter(vq.BaseRateLimiter):
+        acquisitions = 0
+
+        async def acquire(self):
+            self.acquisitions += 1
+
+        @property
+        def headroom(self):
+            return float("inf")
+
+    statuses = iter([503, 503, 200])
+
+    async def method(request):
+        status = next(statuses)
+        if status != 200:
+            return aiohttp.web.Response(status=status)
+        return aiohttp.web.json_response({"response": 1})
+
+    server = aiohttp.test_utils.TestServer(aiohttp.web.Application())
+    server.app.router.add_post("/users.get", method)
+    await server.start_server()
+    rate_limiter = CountingRateLimiter()
+    api = vq.API(
+        "token",
+        requests_url=str(server.make_url("/")),
+        retry_policy=vq.RetryPolicy(max_attempts=3, base_delay=0.001),
+        rate_limiter=rate_limiter,
+        deduplicate_requests=False,
+    )
+    try:
+        async with api:
+            assert await api.users.get() == 1
+    finally:
+        await server.close()
+
+    assert api.retry_statistics.retries == 2
+    assert rate_limiter.acquisitions == 3
+
+
+def test_retry_deadline_is_opt_in():
+    assert vq.RetryPolicy().deadline is None
+
+
+def test_retry_delays_are_capped():
+    policy = vq.RetryPolicy(
+        base_delay=1, max_delay=5, jitter=0, max_attempts=None, deadline=10
+    )
+    assert [policy.compute_delay(attempt) for attempt in range(1, 5)] == [
+        1,
+        2,
+        4,
+        5,
+    ]
+    assert policy.allows_retry(100, 9.5)
+    assert not policy.allows_retry(1, 10)
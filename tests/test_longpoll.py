@@ -0,0 +1,229 @@
+import asyncio
+import contextlib
+
+import aiohttp.test_utils
+import aiohttp.web
+import pytest
+
+import vkquick as vq
+
+
+class FakeLongPoll(vq.BaseLongPoll):
+    async def _setup(self) -> None:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_pipeline_parses_and_dispatches_updates():
+    received_events = []
+
+    async def callback(event):
+        received_events.append(event)
+
+    lp = FakeLongPoll(
+        api=vq.API("token"),
+        event_wrapper=vq.GroupEvent,
+        new_event_callbacks=[callback],
+    )
+    lp._responses_queue = asyncio.Queue(2)
+    lp._events_queue = asyncio.Queue(2)
+    stages = [
+        asyncio.create_task(lp._run_parsing_stage()),
+        asyncio.create_task(lp._run_dispatching_stage()),
+    ]
+    updates = [
+        {"type": "message_new", "object": {}, "group_id": 1}
+        for _ in range(5)
+    ]
+    await lp._responses_queue.put(
+        vq.json_parser_policy.dumps({"ts": 1, "updates": updates})
+    )
+    await asyncio.sleep(0.05)
+    for stage in stages:
+        stage.cancel()
+
+    assert len(received_events) == 5
+    assert lp.pipeline_statistics.parsed_events == 5
+    assert lp.pipeline_statistics.dispatched_events == 5
+    assert lp.pipeline_statistics.events_queue_size == 0
+
+
+@pytest.mark.asyncio
+async def test_failed_response_with_next_ts_resets_server():
+    release_stale_requests = asyncio.Event()
+
+    async def long_poll(request):
+        if request.query["key"] == "expired":
+            if request.query["ts"] == "1":
+                return aiohttp.web.json_response(
+                    {"failed": 2}, headers={"X-Next-Ts": "2"}
+                )
+        elif request.query["ts"] == "1":
+            updates = [{"type": "message_new", "object": {}, "group_id": 1}]
+            return aiohttp.web.json_response(
+                {"ts": 2, "updates": updates}, headers={"X-Next-Ts": "2"}
+            )
+        await release_stale_requests.wait()
+        return aiohttp.web.json_response({"ts": 2, "updates": []})
+
+    server = aiohttp.test_utils.TestServer(aiohttp.web.Application())
+    server.app.router.add_get("/", long_poll)
+    await server.start_server()
+
+    keys = iter(["expired", "fresh"])
+
+    class ResettableLongPoll(vq.BaseLongPoll):
+        async def _setup(self) -> None:
+            self._server_url = str(server.make_url("/"))
+            self._requests_query_params = dict(key=next(keys), ts=1)
+
+    received_events = []
+
+    async def callback(event):
+        received_events.append(event)
+
+    lp = ResettableLongPoll(
+        api=vq.API("token"),
+        event_wrapper=vq.GroupEvent,
+        new_event_callbacks=[callback],
+    )
+    polling = asyncio.create_task(lp._coroutine_run_polling())
+    try:
+        await asyncio.sleep(0.2)
+        assert lp._requests_query_params["key"] == "fresh"
+        assert len(received_events) == 1
+    finally:
+        polling.cancel()
+        release_stale_requests.set()
+        await lp.close_session()
+        await server.close()
+
+
+@contextlib.asynccontextmanager
+async def run_long_poll_server():
+    """
+    Локальный LongPoll сервер: на каждый запрос
+    сразу отвечает одним событием
+    """
+    server = aiohttp.test_utils.TestServer(aiohttp.web.Application())
+    server.requests_count = 0
+
+    async def long_poll(request):
+        server.requests_count += 1
+        updates = [{"type": "message_new", "object": {}, "group_id": 1}]
+        return aiohttp.web.json_response(
+            {"ts": server.requests_count, "updates": updates},
+            headers={"X-Next-Ts": str(server.requests_count)},
+        )
+
+    server.app.router.add_get("/", long_poll)
+    await server.start_server()
+    try:
+        yield server
+    finally:
+        await server.close()
+
+
+def make_local_long_poll(server, **kwargs):
+    class LocalLongPoll(vq.BaseLongPoll):
+        async def _setup(self) -> None:
+            self._server_url = str(server.make_url("/"))
+            self._requests_query_params = dict(ts=0)
+
+    return LocalLongPoll(
+        api=vq.API("token"), event_wrapper=vq.GroupEvent, **kwargs
+    )
+
+
+@pytest.mark.asyncio
+async def test_failing_callback_does_not_stop_dispatching():
+    received_events = []
+
+    async def broken_callback(event):
+        raise RuntimeError("boom")
+
+    async def callback(event):
+        received_events.append(event)
+
+    lp = FakeLongPoll(
+        api=vq.API("token"),
+        event_wrapper=vq.GroupEvent,
+        new_event_callbacks=[broken_callback, callback],
+    )
+    lp._events_queue = asyncio.Queue(2)
+    dispatching = asyncio.create_task(lp._run_dispatching_stage())
+    for _ in range(3):
+        await lp._events_queue.put(
+            vq.GroupEvent({"type": "message_new", "object": {}})
+        )
+    await asyncio.sleep(0.01)
+    assert not dispatching.done()
+    dispatching.cancel()
+    assert len(received_events) == 3
+
+
+@pytest.mark.asyncio
+async def test_dead_stage_stops_polling():
+    async with run_long_poll_server() as server:
+        lp = make_local_long_poll(server)
+
+        async def broken_stage():
+            raise RuntimeError("boom")
+
+        lp._run_parsing_stage = broken_stage
+        try:
+            with pytest.raises(RuntimeError, match="boom"):
+                await asyncio.wait_for(lp._coroutine_run_polling(), 1)
+        finally:
+            await lp.close_session()
+
+
+@pytest.mark.asyncio
+async def test_abandoned_listener_does_not_stop_polling():
+    async with run_long_poll_server() as server:
+        lp = make_local_long_poll(server, pipeline_queue_size=2)
+        # Вспомогательный слушатель, который больше не читают
+        abandoned_listener = lp.listen()
+        await abandoned_listener.__anext__()
+        received_events = 0
+
+        async def consume():
+            nonlocal received_events
+            async for _ in lp.listen(bounded=True):
+                received_events += 1
+                if received_events == 10:
+                    return
+
+        try:
+            await asyncio.wait_for(consume(), 1)
+        finally:
+            lp.stop()
+            await abandoned_listener.aclose()
+            await lp.close_session()
+
+
+@pytest.mark.asyncio
+async def test_blocked_dispatcher_stops_polling():
+    async with run_long_poll_server() as server:
+        lp = make_local_long_poll(server, pipeline_queue_size=2)
+        dispatcher = vq.EventDispatcher(max_in_flight=1)
+        release = asyncio.Event()
+
+        async def consume():
+            async for event in lp.listen(bounded=True):
+                await dispatcher.dispatch(event.type, release.wait)
+
+        consuming = asyncio.create_task(consume())
+        try:
+            await asyncio.sleep(0.2)
+            stalled_requests_count = server.requests_count
+            await asyncio.sleep(0.2)
+            # Все очереди заполнены, и новые запросы не отправляются
+            assert server.requests_count == stalled_requests_count
+            assert server.requests_count < 15
+            assert dispatcher.statistics.in_flight == 1
+        finally:
+            consuming.cancel()
+            release.set()
+            lp.stop()
+            await lp.close_session()
@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+import pytest
+
+import vkquick as vq
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_burst():
+    limiter = vq.TokenBucketRateLimiter(per_second=20, burst=5)
+    started_at = time.monotonic()
+    await asyncio.gather(*(limiter.acquire() for _ in range(5)))
+    assert time.monotonic() - started_at < 0.05
+    assert limiter.delayed_count == 0
+    assert limiter.headroom < 1
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_waiting_is_fifo():
+    limiter = vq.TokenBucketRateLimiter(per_second=50, burst=1)
+    order = []
+
+    async def request(number):
+        await limiter.acquire()
+        order.append(number)
+
+    started_at = time.monotonic()
+    await asyncio.gather(*(request(number) for number in range(5)))
+    assert order == [0, 1, 2, 3, 4]
+    assert time.monotonic() - started_at >= 4 / 50 * 0.9
+    assert limiter.acquired_count == 5
+    assert limiter.delayed_count == 4
+    assert limiter.waiting_time > 0
+
+
+def test_api_rate_limiter_by_token_owner():
+    assert vq.API("token").rate_limiter.per_second == 3
+    group_api = vq.API("token", token_owner=vq.TokenOwner.GROUP)
+    assert group_api.rate_limiter.per_second == 20
+
+    limiter = vq.TokenBucketRateLimiter(per_second=1)
+    assert vq.API("token", rate_limiter=limiter).rate_limiter is limiter
@@ -1,10 +1,27 @@
 import importlib.metadata
 
-from .api import API, CallMethod, TokenOwner
+from .api import (
+    API,
+    CachePolicy,
+    CacheStatistics,
+    CallMethod,
+    MethodProxy,
+    RetryPolicy,
+    RetryStatistics,
+    TokenOwner,
+)
+from .api_pool import APIPool, PooledTokenStatistics
 from .base.api_serializable import APISerializableMixin
+from .base.cache_backend import BaseCacheBackend, CacheEntry
 from .base.event import BaseEvent
-from .base.event_factories import BaseEventFactory, BaseLongPoll
+from .base.event_factories import (
+    BaseEventFactory,
+    BaseLongPoll,
+    LongPollPipelineStatistics,
+)
 from .base.json_parser import BaseJSONParser
+from .base.rate_limiter import BaseRateLimiter
+from .cache_backends import MemoryCacheBackend, SQLiteCacheBackend
 from .chatbot.application import App, Bot
 from .chatbot.base.cutter import (
     Argument,
@@ -12,6 +29,8 @@ from .chatbot.base.cutter import (
     Cutter,
     CutterParsingResponse,
     InvalidArgumentConfig,
+    RegexArgumentPlan,
+    SyncCutter,
     cut_part_via_regex,
 )
 from .chatbot.base.filter import AndFilter, BaseFilter, OrFilter
@@ -41,7 +60,14 @@ from .chatbot.command.cutters import (
     UserID,
     WordCutter,
 )
+from .chatbot.command.index import CommandsIndex
 from .chatbot.dependency import DependencyMixin, Depends
+from .chatbot.dispatcher import (
+    DispatcherStatistics,
+    EventDispatcher,
+    OverflowPolicy,
+    peer_id_lane_key,
+)
 from .chatbot.exceptions import (
     BadArgumentError,
     StopCurrentHandling,
@@ -57,15 +83,30 @@ from .chatbot.ui_builders.button import (
 from .chatbot.ui_builders.carousel import Carousel, Element
 from .chatbot.ui_builders.keyboard import Keyboard
 from .chatbot.utils import (
+    ByteBudget,
+    close_shared_sessions,
     download_file,
     get_origin_typing,
+    get_shared_session,
     get_user_registration_date,
+    iter_file_chunks,
     peer,
     random_id,
+    save_file,
+    save_files,
+    set_shared_transport,
 )
 from .chatbot.wrappers.attachment import Document, Photo
 from .chatbot.wrappers.message import Message, SentMessage, TruncatedMessage
-from .chatbot.wrappers.page import Group, IDType, Page, User
+from .chatbot.wrappers.page import (
+    Group,
+    IDType,
+    Page,
+    PagesCache,
+    PagesCacheStatistics,
+    PagesLoader,
+    User,
+)
 from .error_codes import *
 from .event import GroupEvent, UserEvent
 from .exceptions import APIError
@@ -78,6 +119,12 @@ from .json_parsers import (
 from .logger import LoggingLevel, format_mapping, update_logging_level
 from .longpoll import GroupLongPoll, UserLongPoll
 from .pretty_view import pretty_view
+from .rate_limiters import TokenBucketRateLimiter
+from .transport import (
+    TransportConfig,
+    TransportConnector,
+    TransportStatistics,
+)
 from .types import DecoratorFunction
 
 __all__ = [var for var in locals().keys() if not var.startswith("_")]
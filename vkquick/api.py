@@ -1,17 +1,20 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import dataclasses
 import enum
+import functools
+import hashlib
 import io
-import itertools
 import os
+import random
 import re
 import time
 import traceback
 import typing
 import urllib.parse
 
-import aiofiles
 import aiohttp
 import aiohttp.client_exceptions
 import cachetools
@@ -19,19 +22,44 @@ from loguru import logger
 
 from vkquick import error_codes
 from vkquick.base.api_serializable import APISerializableMixin
+from vkquick.base.cache_backend import BaseCacheBackend, CacheEntry
+from vkquick.base.rate_limiter import BaseRateLimiter
 from vkquick.base.session_container import SessionContainerMixin
-from vkquick.chatbot.utils import download_file
+from vkquick.cache_backends import MemoryCacheBackend
+from vkquick.chatbot.utils import ByteBudget, download_file
 from vkquick.chatbot.wrappers.attachment import Document, Photo
-from vkquick.chatbot.wrappers.page import Group, Page, User
+from vkquick.chatbot.wrappers.page import (
+    Group,
+    Page,
+    PagesCache,
+    PagesLoader,
+    User,
+)
 from vkquick.exceptions import APIError
 from vkquick.json_parsers import json_parser_policy
 from vkquick.logger import format_mapping
 from vkquick.pretty_view import pretty_view
+from vkquick.rate_limiters import TokenBucketRateLimiter
+from vkquick.transport import TransportConfig
 
 if typing.TYPE_CHECKING:  # pragma: no cover
+    from vkquick.api_pool import APIPool
     from vkquick.base.json_parser import BaseJSONParser
 
-    PhotoEntityTyping = typing.Union[str, bytes, typing.BinaryIO, os.PathLike]
+    PhotoEntityTyping = typing.Union[
+        str,
+        bytes,
+        typing.BinaryIO,
+        os.PathLike,
+        typing.AsyncIterable[bytes],
+    ]
+    DocumentContentTyping = typing.Union[
+        str,
+        bytes,
+        typing.BinaryIO,
+        os.PathLike,
+        typing.AsyncIterable[bytes],
+    ]
 
 
 @enum.unique
@@ -45,6 +73,120 @@ class TokenOwner(enum.Enum):
     UNKNOWN = enum.auto()
 
 
+@dataclasses.dataclass(frozen=True)
+class CachePolicy:
+    """
+    Как кэшировать ответы метода API
+
+    Arguments:
+        ttl: Сколько секунд ответ считается свежим
+        stale_ttl: Сколько секунд после этого устаревший ответ
+            еще отдается сразу, а новый запрашивается в фоне
+            (stale-while-revalidate)
+    """
+
+    ttl: float = 7200
+    stale_ttl: float = 0
+
+
+@dataclasses.dataclass(frozen=True)
+class RetryPolicy:
+    """
+    Как повторять API запросы, завершившиеся временной ошибкой.
+    Задержка между попытками растет экспоненциально
+    (`base_delay * multiplier ** (attempt - 1)`, но не больше `max_delay`)
+    и случайно уменьшается на долю до `jitter`, чтобы одновременно
+    упавшие запросы не повторялись все разом
+
+    Arguments:
+        max_attempts: Сколько всего попыток (вместе с первой).
+            `None` -- без ограничения
+        deadline: Сколько секунд может занять вызов со всеми
+            повторами. Ограничивает и время ожидания самого запроса,
+            поэтому включается явно. `None` -- без ограничения
+        base_delay: Задержка перед первым повтором
+        max_delay: Максимальная задержка между попытками
+        multiplier: Во сколько раз растет задержка с каждой попыткой
+        jitter: Доля задержки, на которую она может быть
+            случайно уменьшена (от 0 до 1)
+        retry_error_codes: Коды ошибок API, при которых запрос повторяется
+        retry_server_errors: Повторять ли запрос при HTTP 5xx
+        retry_disconnects: Повторять ли запрос, если сервер
+            разорвал соединение (сессия при этом пересоздается)
+    """
+
+    max_attempts: typing.Optional[int] = 5
+    deadline: typing.Optional[float] = None
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+    multiplier: float = 2.0
+    jitter: float = 0.5
+    retry_error_codes: typing.FrozenSet[int] = frozenset({6, 9, 10})
+    retry_server_errors: bool = True
+    retry_disconnects: bool = True
+
+    def compute_delay(self, attempt: int) -> float:
+        """
+        Задержка перед повтором после неудачной попытки номер `attempt`
+        """
+        delay = min(
+            self.max_delay, self.base_delay * self.multiplier ** (attempt - 1)
+        )
+        return random.uniform(delay * (1 - self.jitter), delay)
+
+    def allows_retry(self, attempt: int, elapsed: float) -> bool:
+        """
+        Можно ли сделать еще одну попытку после неудачной попытки
+        номер `attempt`, если с начала вызова (с учетом задержки
+        перед повтором) пройдет `elapsed` секунд
+        """
+        if self.max_attempts is not None and attempt >= self.max_attempts:
+            return False
+        if self.deadline is not None and elapsed >= self.deadline:
+            return False
+        return True
+
+
+@dataclasses.dataclass
+class RetryStatistics:
+    """
+    Счетчики повторов API запросов
+
+    Arguments:
+        retries: Сколько повторов было сделано
+        exhausted: Сколько вызовов завершились ошибкой,
+            исчерпав попытки или время
+        reasons: Сколько повторов было по каждой причине
+            (`error_10`, `http_503`, `server_disconnected`, ...)
+    """
+
+    retries: int = 0
+    exhausted: int = 0
+    reasons: typing.Dict[str, int] = dataclasses.field(default_factory=dict)
+
+
+@dataclasses.dataclass
+class CacheStatistics:
+    """
+    Счетчики кэширования ответов метода
+
+    Arguments:
+        hits: Сколько ответов было отдано из кэша
+        stale_hits: Сколько из них были устаревшими
+            и обновлялись в фоне
+        misses: Сколько раз ответа в кэше не было
+    """
+
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        requests = self.hits + self.misses
+        return self.hits / requests if requests else 0.0
+
+
 class API(SessionContainerMixin):
     def __init__(
         self,
@@ -56,9 +198,26 @@ class API(SessionContainerMixin):
         json_parser: typing.Optional[BaseJSONParser] = None,
         cache_table: typing.Optional[cachetools.Cache] = None,
         proxies: typing.Optional[typing.List[str]] = None,
+        rate_limiter: typing.Optional[BaseRateLimiter] = None,
+        batch_requests: bool = False,
+        batch_delay: float = 0.01,
+        deduplicate_requests: bool = True,
+        pages_cache: typing.Optional[PagesCache] = None,
+        pages_loader_delay: float = 0.0,
+        cache_backend: typing.Optional[BaseCacheBackend] = None,
+        cache_policies: typing.Optional[
+            typing.Dict[str, CachePolicy]
+        ] = None,
+        default_cache_policy: CachePolicy = CachePolicy(),
+        max_upload_bytes: int = 2 ** 26,
+        transport: typing.Optional[TransportConfig] = None,
+        retry_policy: RetryPolicy = RetryPolicy(),
     ):
         SessionContainerMixin.__init__(
-            self, requests_session=requests_session, json_parser=json_parser
+            self,
+            requests_session=requests_session,
+            json_parser=json_parser,
+            transport=transport,
         )
         if token.startswith("$"):
             self._token = os.environ[token[1:]]
@@ -69,26 +228,118 @@ class API(SessionContainerMixin):
         self._owner_schema = None
         self._requests_url = requests_url
         self._proxies = proxies
-        self._cache_table = cache_table or cachetools.TTLCache(
-            ttl=7200, maxsize=2 ** 12
+        self._cache_backend = cache_backend or MemoryCacheBackend(
+            cache_table
         )
+        self._cache_policies = {
+            _convert_method_name(method_name): policy
+            for method_name, policy in (cache_policies or {}).items()
+        }
+        self._default_cache_policy = default_cache_policy
+        # Кэш может быть общим для нескольких токенов
+        # (и процессов), а ответы у токенов разные
+        self._cache_key_prefix = hashlib.sha1(
+            self._token.encode()
+        ).hexdigest()[:16]
+        self._revalidating_requests: typing.Dict[str, asyncio.Task] = {}
+        self._cache_statistics: typing.Dict[str, CacheStatistics] = {}
 
-        self._method_name = ""
-        self._last_request_timestamp = 0.0
-        self._use_cache = False
         self._stable_request_params = {
             "access_token": self._token,
             "v": self._version,
         }
 
-        self._update_requests_delay()
+        # Ограничитель, переданный вручную, не подменяется
+        # после определения владельца токена
+        self._custom_rate_limiter = rate_limiter is not None
+        self._rate_limiter = rate_limiter
+        self._update_rate_limiter()
+
+        self._deduplicate_requests = deduplicate_requests
+        self._in_flight_requests: typing.Dict[str, asyncio.Future] = {}
+
+        self._requests_batcher = (
+            _RequestsBatcher(self, delay=batch_delay)
+            if batch_requests
+            else None
+        )
+
+        self._pages_cache = pages_cache or PagesCache()
+        self._pages_loader = PagesLoader(self, delay=pages_loader_delay)
+        self._upload_budget = ByteBudget(max_upload_bytes)
+        self._retry_policy = retry_policy
+        self._retry_statistics = RetryStatistics()
+
+    @property
+    def rate_limiter(self) -> BaseRateLimiter:
+        """
+        Ограничитель частоты запросов, через который проходит
+        каждый API запрос. Содержит статистику ожидания
+        """
+        return self._rate_limiter
+
+    @property
+    def cache_statistics(self) -> typing.Dict[str, CacheStatistics]:
+        """
+        Попадания в кэш и промахи по каждому методу
+        """
+        return self._cache_statistics
+
+    @property
+    def cache_backend(self) -> BaseCacheBackend:
+        """
+        Хранилище кэшированных ответов
+        """
+        return self._cache_backend
+
+    @property
+    def pages_cache(self) -> PagesCache:
+        """
+        Кэш полей пользователей и групп, через который
+        работают `User.fetch_one`, `Group.fetch_many` и т.п.
+        """
+        return self._pages_cache
+
+    @property
+    def pages_loader(self) -> PagesLoader:
+        """
+        Объединяет одновременные `User.fetch_one`/`Group.fetch_one`
+        в общие запросы
+        """
+        return self._pages_loader
+
+    @property
+    def retry_policy(self) -> RetryPolicy:
+        return self._retry_policy
+
+    @property
+    def retry_statistics(self) -> RetryStatistics:
+        """
+        Счетчики повторов запросов, например, для алертов
+        """
+        return self._retry_statistics
+
+    @property
+    def upload_budget(self) -> ByteBudget:
+        """
+        Ограничитель суммарного размера одновременно загружаемых файлов
+        """
+        return self._upload_budget
+
+    @property
+    def cached(self) -> MethodProxy:
+        """
+        Построитель кэшируемых запросов: `api.cached.users.get(...)`
+        или `api.cached.method("users.get", ...)` (см. `use_cache`)
+        """
+        return MethodProxy(self, use_cache=True)
 
-    def use_cache(self) -> API:
+    def use_cache(self) -> MethodProxy:
         """
-        Включает кэширование для следующего запроса.
-        Кэширование выключается автоматически, т.е.
-        кэширование будет использовано только для первого следующего
-        выполняемого API запроса.
+        Включает кэширование для запроса, вызванного через
+        возвращаемый объект: `api.use_cache().method(...)`.
+        Сам инстанс API не меняет своего состояния, поэтому
+        его можно безопасно использовать из конкурентных корутин.
 
         Включение кэширования подразумевает, что следующий запрос
         будет занесен в специальную кэш-таблицу. Ключ кэша
@@ -99,13 +350,18 @@ class API(SessionContainerMixin):
 
         Если необходимо передать свою собственную имплементацию
         кэш-таблицы, укажите соответствующий инстанс при инициализации объекта
-        в поле `cache_table`. По умолчанию используется TTL-алгоритм.
+        в поле `cache_table`, а для кэша вне процесса (например,
+        общего для нескольких воркеров) -- хранилище в поле `cache_backend`.
+        Время жизни ответов задается для каждого метода
+        через `cache_policies`. Методы оттуда кэшируются и без
+        `use_cache`, а методы, изменяющие данные (`messages.send`,
+        `execute`...), не кэшируются вовсе, если их нет
+        в `cache_policies`
 
         Returns:
-            Тот же самый инстанс API, готовый к кэшированному запросу
+            Неизменяемый построитель запроса с включенным кэшированием
         """
-        self._use_cache = True
-        return self
+        return self.cached
 
     async def define_token_owner(self) -> typing.Tuple[TokenOwner, Page]:
         """
@@ -140,20 +396,43 @@ class API(SessionContainerMixin):
             self._owner_schema = Group(owner_schema[0])
             self._token_owner = TokenOwner.GROUP
 
-        self._update_requests_delay()
+        self._update_rate_limiter()
         return self._token_owner, self._owner_schema
 
-    def _update_requests_delay(self) -> None:
+    async def prewarm_connections(
+        self, connections: typing.Optional[int] = None
+    ) -> None:
         """
-        Устанавливает необходимую задержку в секундах между
-        исполняемыми запросами
+        Заранее открывает соединения к серверу API, чтобы первые
+        запросы бота не ждали TCP и TLS рукопожатий
+
+        Arguments:
+            connections: Сколько соединений открыть. По умолчанию --
+                `TransportConfig.prewarm_connections`
         """
+        await self.transport.prewarm(
+            self.requests_session, self._requests_url, connections
+        )
+
+    def _update_rate_limiter(self) -> None:
+        """
+        Устанавливает ограничитель частоты запросов по правилам API:
+        для групп -- 20 запросов в секунду, для пользователей/сервисных
+        токенов -- 3 запроса в секунду
+        """
+        if self._custom_rate_limiter:
+            return
         if self._token_owner in {TokenOwner.USER, TokenOwner.UNKNOWN}:
-            self._requests_delay = 1 / 3
+            per_second = 3
         else:
-            self._requests_delay = 1 / 20
+            per_second = 20
+        if (
+            self._rate_limiter is None
+            or self._rate_limiter.per_second != per_second
+        ):
+            self._rate_limiter = TokenBucketRateLimiter(per_second)
 
-    def __getattr__(self, attribute: str) -> API:
+    def __getattr__(self, attribute: str) -> MethodProxy:
         """
         Используя `__getattr__`, класс предоставляет возможность
         вызывать методы API, как будто бы обращаясь к атрибутам.
@@ -161,39 +440,20 @@ class API(SessionContainerMixin):
         Arguments:
             attribute: Имя/заголовок названия метода
         Returns:
-            Собственный инстанс класса для того,
-            чтобы была возможность продолжить выстроить имя метода через точку
-        """
-        if self._method_name:
-            self._method_name += f".{attribute}"
-        else:
-            self._method_name = attribute
-        return self
-
-    async def __call__(
-        self,
-        **request_params,
-    ) -> typing.Any:
-        """
-        Вызывает метод `method` после обращения к имени метода через `__getattr__`
-
-        Arguments:
-            request_params: Параметры, принимаемые методом, которые описаны в документации API
-
-        Returns:
-            Пришедший от API ответ
+            Неизменяемый построитель запроса, через который
+            можно продолжить выстраивать имя метода через точку
         """
-        method_name = self._method_name
-        self._method_name = ""
-        return await self.method(method_name, **request_params)
+        if attribute.startswith("__"):
+            raise AttributeError(attribute)
+        return MethodProxy(self, attribute)
 
     async def method(self, method_name: str, **request_params) -> typing.Any:
         """
         Выполняет необходимый API запрос с нужным методом и параметрами.
         Вызов метода поддерживает конвертацию из snake_case в camelCase.
 
-        Перед вызовом этого метода может быть вызван `.use_cache()` для
-        включения возможности кэш-логики запроса
+        Для кэширования запроса вызывайте метод через `.use_cache()`
+        (или `.cached`): `api.use_cache().method(...)`
 
         Каждый передаваемый параметр проходит специальный этап конвертации перед
         передачей в запрос по следующему принципу:
@@ -222,12 +482,10 @@ class API(SessionContainerMixin):
         Raises:
             VKAPIError: В случае ошибки, пришедшей от некорректного вызова запроса.
         """
-        use_cache = self._use_cache
-        self._use_cache = False
         return await self._make_api_request(
             method_name=method_name,
             request_params=request_params,
-            use_cache=use_cache,
+            use_cache=False,
         )
 
     async def execute(
@@ -271,30 +529,166 @@ class API(SessionContainerMixin):
         # Конвертация параметров запроса под особенности API и имени метода
         real_method_name = _convert_method_name(method_name)
         real_request_params = _convert_params_for_api(request_params)
-        extra_request_params = self._stable_request_params.copy()
-        extra_request_params.update(real_request_params)
 
         # Определение владельца токена нужно
         # для определения задержки между запросами
         if self._token_owner is None:
             await self.fetch_token_owner_entity()
 
+        # Ключ кэш-таблицы и таблицы выполняющихся запросов
+        request_hash = urllib.parse.urlencode(real_request_params)
+        request_hash = f"{real_method_name}#{request_hash}"
+
+        # Методы из `cache_policies` кэшируются всегда, а остальные --
+        # по запросу и только если метод ничего не изменяет
+        cache_policy = self._cache_policies.get(real_method_name)
+        if cache_policy is None and use_cache:
+            use_cache = _is_read_method(real_method_name)
+            cache_policy = self._default_cache_policy
+        else:
+            use_cache = cache_policy is not None
+
         # Кэширование запросов по их методу и переданным параметрам
-        # `cache_hash` -- ключ кэш-таблицы
         if use_cache:
-            cache_hash = urllib.parse.urlencode(real_request_params)
-            cache_hash = f"{method_name}#{cache_hash}"
-            if cache_hash in self._cache_table:
-                return self._cache_table[cache_hash]
-
-        # Задержка между запросами необходима по правилам API
-        api_request_delay = self._get_waiting_time()
-        await asyncio.sleep(api_request_delay)
-
-        # Отправка запроса с последующей проверкой ответа
-        response = await self._send_api_request(
-            real_method_name, extra_request_params
+            cache_key = f"{self._cache_key_prefix}:{request_hash}"
+            cache_statistics = self._cache_statistics.get(real_method_name)
+            if cache_statistics is None:
+                cache_statistics = self._cache_statistics[
+                    real_method_name
+                ] = CacheStatistics()
+            cache_entry = await self._cache_backend.get(cache_key)
+            if cache_entry is None:
+                cache_statistics.misses += 1
+            else:
+                cache_statistics.hits += 1
+                if not cache_entry.is_fresh():
+                    cache_statistics.stale_hits += 1
+                    self._revalidate_cache_entry(
+                        cache_key,
+                        cache_policy,
+                        real_method_name,
+                        real_request_params,
+                        request_params,
+                    )
+                return cache_entry.value
+
+        # Одинаковые конкурентные запросы на чтение
+        # разделяют один выполняющийся запрос
+        if self._deduplicate_requests and _is_read_method(real_method_name):
+            in_flight_request = self._in_flight_requests.get(request_hash)
+            if in_flight_request is None:
+                in_flight_request = asyncio.ensure_future(
+                    self._call_api(
+                        real_method_name, real_request_params, request_params
+                    )
+                )
+                self._in_flight_requests[request_hash] = in_flight_request
+                in_flight_request.add_done_callback(
+                    functools.partial(
+                        self._forget_in_flight_request, request_hash
+                    )
+                )
+            response = await asyncio.shield(in_flight_request)
+        else:
+            response = await self._call_api(
+                real_method_name, real_request_params, request_params
+            )
+
+        # Если кэширование включено -- запрос добавится в таблицу
+        if use_cache:
+            await self._store_in_cache(cache_key, cache_policy, response)
+
+        return response
+
+    async def _store_in_cache(
+        self, cache_key: str, cache_policy: CachePolicy, response: typing.Any
+    ) -> None:
+        await self._cache_backend.set(
+            cache_key,
+            CacheEntry(
+                value=response,
+                stored_at=time.time(),
+                ttl=cache_policy.ttl,
+                stale_ttl=cache_policy.stale_ttl,
+            ),
+        )
+
+    def _revalidate_cache_entry(
+        self,
+        cache_key: str,
+        cache_policy: CachePolicy,
+        real_method_name: str,
+        real_request_params: typing.Dict[str, typing.Any],
+        request_params: typing.Dict[str, typing.Any],
+    ) -> None:
+        """
+        Обновляет устаревший ответ в фоне, пока
+        вызывающие получают его старую версию
+        """
+        if cache_key in self._revalidating_requests:
+            return
+
+        async def revalidate():
+            try:
+                response = await self._call_api(
+                    real_method_name, real_request_params, request_params
+                )
+                await self._store_in_cache(cache_key, cache_policy, response)
+            except Exception:  # noqa
+                logger.exception(
+                    "Can't revalidate cached response of {method_name}",
+                    method_name=real_method_name,
+                )
+            finally:
+                del self._revalidating_requests[cache_key]
+
+        self._revalidating_requests[cache_key] = asyncio.create_task(
+            revalidate()
         )
+
+    def _forget_in_flight_request(
+        self, request_hash: str, request: asyncio.Future
+    ) -> None:
+        if self._in_flight_requests.get(request_hash) is request:
+            del self._in_flight_requests[request_hash]
+        # Ошибку получают все ожидающие, но если их не осталось,
+        # asyncio не должен ругаться на непрочитанное исключение
+        if not request.cancelled():
+            request.exception()
+
+    async def _call_api(
+        self,
+        real_method_name: str,
+        real_request_params: typing.Dict[str, typing.Any],
+        request_params: typing.Dict[str, typing.Any],
+    ) -> typing.Any:
+        """
+        Отправляет уже сконвертированный запрос и проверяет ответ
+
+        Arguments:
+            real_method_name: Имя метода API в camelCase
+            real_request_params: Сконвертированные параметры метода
+            request_params: Параметры в том виде, в каком их передали
+
+        Raises:
+            VKAPIError: В случае ошибки, пришедшей от некорректного вызова запроса.
+        """
+        # Отправка запроса с последующей проверкой ответа. При включенной
+        # пакетной обработке запрос может уйти в составе `execute`
+        if self._requests_batcher is not None and _is_batchable(
+            real_method_name, request_params
+        ):
+            response = await self._requests_batcher.call(
+                real_method_name, real_request_params
+            )
+        else:
+            extra_request_params = self._stable_request_params.copy()
+            extra_request_params.update(real_request_params)
+            # Ограничение частоты запросов необходимо по правилам API
+            await self._rate_limiter.acquire()
+            response = await self._send_api_request(
+                real_method_name, extra_request_params
+            )
         logger.opt(colors=True).info(
             **format_mapping(
                 "Called method <m>{method_name}</m>({params})",
@@ -314,17 +708,11 @@ class API(SessionContainerMixin):
             raise exception_class(
                 status_code=error.pop("error_code"),  # noqa
                 description=error.pop("error_msg"),  # noqa
-                request_params=error.pop("request_params"),  # noqa
+                request_params=error.pop("request_params", []),  # noqa
                 extra_fields=error,  # noqa
             )
         else:
-            response = response["response"]
-
-        # Если кэширование включено -- запрос добавится в таблицу
-        if use_cache:
-            self._cache_table[cache_hash] = response  # noqa
-
-        return response
+            return response["response"]
 
     async def _send_api_request(self, method_name: str, params: dict) -> dict:
         """
@@ -343,110 +731,213 @@ class API(SessionContainerMixin):
         else:
             current_proxy = None
 
+        retry_policy = self._retry_policy
+        started_at = time.monotonic()
+        attempt = 0
         while True:
+            attempt += 1
+            request_kwargs = {}
+            if retry_policy.deadline is not None:
+                request_kwargs["timeout"] = aiohttp.ClientTimeout(
+                    total=retry_policy.deadline
+                    - (time.monotonic() - started_at)
+                )
             try:
                 async with self.requests_session.post(
-                    self._requests_url + method_name, data=params, proxy=current_proxy
+                    self._requests_url + method_name,
+                    data=params,
+                    proxy=current_proxy,
+                    **request_kwargs,
                 ) as response:
                     response = await self.parse_json_body(response)
-                    if "error" in response and response["error"]["error_code"] == 10:
-                        logger.opt(colors=True).warning(
-                            **format_mapping(
-                                "VK Internal server error occured while calling <m>{method_name}</m>({params}): {error_message}. Retrying in 10 seconds...",
-                                "<c>{key}</c>=<y>{value!r}</y>",
-                                params,
-                            ),
-                            method_name=method_name,
-                            error_message=response["error"]["error_msg"]
-                        )
-                        await asyncio.sleep(10)
-                    else:
-                        return response
             except aiohttp.ClientResponseError as error:
-                if error.status >= 500:
-                    logger.opt(colors=True).warning(
-                        **format_mapping(
-                            "Server error occured while calling <m>{method_name}</m>({params}): {error_message}. Retrying in 10 seconds...",
-                            "<c>{key}</c>=<y>{value!r}</y>",
-                            params,
-                        ),
-                        method_name=method_name,
-                        error_message=error.message
-                    )
-                    await asyncio.sleep(10)
-                else:
+                if error.status < 500 or not retry_policy.retry_server_errors:
+                    raise error
+                failure = error
+                retry_reason = f"http_{error.status}"
+                error_message = error.message
+            except aiohttp.ServerDisconnectedError as error:
+                if not retry_policy.retry_disconnects:
                     raise error
-            except aiohttp.ServerDisconnectedError:
                 await self.refresh_session()
+                failure = error
+                retry_reason = "server_disconnected"
+                error_message = str(error)
+            else:
+                if (
+                    "error" not in response
+                    or response["error"]["error_code"]
+                    not in retry_policy.retry_error_codes
+                ):
+                    return response
+                failure = response
+                retry_reason = f"error_{response['error']['error_code']}"
+                error_message = response["error"]["error_msg"]
+
+            delay = retry_policy.compute_delay(attempt)
+            if not retry_policy.allows_retry(
+                attempt, time.monotonic() - started_at + delay
+            ):
+                self._retry_statistics.exhausted += 1
+                logger.opt(colors=True).warning(
+                    "Giving up calling <m>{method_name}</m> "
+                    "after {attempt} attempts: {error_message}",
+                    method_name=method_name,
+                    attempt=attempt,
+                    error_message=error_message,
+                )
+                # Ответ с ошибкой API обрабатывается как обычно
+                if isinstance(failure, dict):
+                    return failure
+                raise failure
+
+            self._retry_statistics.retries += 1
+            self._retry_statistics.reasons[retry_reason] = (
+                self._retry_statistics.reasons.get(retry_reason, 0) + 1
+            )
+            logger.opt(colors=True).warning(
+                **format_mapping(
+                    "Temporary error occurred while calling <m>{method_name}</m>({params}): {error_message}. Retrying in {delay} seconds (attempt {attempt})...",
+                    "<c>{key}</c>=<y>{value!r}</y>",
+                    params,
+                ),
+                method_name=method_name,
+                error_message=error_message,
+                delay=round(delay, 2),
+                attempt=attempt,
+            )
+            await asyncio.sleep(delay)
+            # Повтор -- такой же запрос к API, и он тоже
+            # должен уложиться в ограничение частоты
+            await self._rate_limiter.acquire()
 
-    async def _fetch_photo_entity(self, photo: PhotoEntityTyping) -> bytes:
+    async def _make_upload_payload(
+        self,
+        entity: typing.Union[PhotoEntityTyping, DocumentContentTyping],
+        exit_stack: contextlib.ExitStack,
+    ) -> typing.Tuple[typing.Any, int]:
         """
-        Получает байты фотографии через IO-хранилища/ссылку/путь до файла
+        Превращает загружаемый объект в значение для multipart тела.
+        Файлы и итераторы не читаются целиком: aiohttp отправляет их
+        частями прямо во время запроса. Открытые здесь файлы
+        закрываются вместе с `exit_stack`
+
+        Returns:
+            Значение поля и его размер для `upload_budget`. Размер
+            асинхронных итераторов заранее неизвестен, поэтому они
+            не учитываются в бюджете (в памяти все равно держится
+            только одна их часть)
         """
-        if isinstance(photo, bytes):
-            return photo
-        elif isinstance(photo, io.BytesIO):
-            return photo.getvalue()
-        elif isinstance(photo, str) and photo.startswith("http"):
-            return await download_file(photo, session=self.requests_session)
-        elif isinstance(photo, (str, os.PathLike)):
-            async with aiofiles.open(photo, "rb") as file:
-                return await file.read()
+        if isinstance(entity, (bytes, bytearray)):
+            return entity, len(entity)
+        elif isinstance(entity, str) and entity.startswith("http"):
+            content = await download_file(
+                entity, session=self.requests_session
+            )
+            return content, len(content)
+        elif isinstance(entity, (str, os.PathLike)):
+            loop = asyncio.get_running_loop()
+            file = await loop.run_in_executor(None, open, entity, "rb")
+            exit_stack.callback(file.close)
+            return file, os.fstat(file.fileno()).st_size
+        elif isinstance(entity, io.BytesIO):
+            # Содержимое отправляется целиком, как и раньше, даже если
+            # позиция потока после записи стоит в конце
+            buffer = entity.getbuffer()
+            return buffer, buffer.nbytes
+        elif isinstance(entity, io.IOBase):
+            if not entity.seekable():
+                return entity, 0
+            position = entity.tell()
+            size = entity.seek(0, io.SEEK_END) - position
+            entity.seek(position)
+            return entity, size
+        elif hasattr(entity, "__aiter__"):
+            return entity, 0
         else:
             raise TypeError(
-                "Can't recognize photo entity. "
-                "Accept only bytes, BytesIO, "
+                "Can't recognize upload entity. "
+                "Accept only bytes, IO-objects, async iterators of bytes, "
                 "URL-like string and Path-like object or string"
             )
 
     async def upload_photos_to_message(
-        self, *photos: PhotoEntityTyping, peer_id: int = 0
+        self,
+        *photos: PhotoEntityTyping,
+        peer_id: int = 0,
+        max_parallel_batches: int = 4,
     ) -> typing.List[Photo]:
         """
-        Загружает фотографию в сообщения
+        Загружает фотографию в сообщения. Фотографии не читаются
+        в память заранее: файлы, IO-объекты и асинхронные итераторы
+        отправляются частями во время загрузки своей пачки
 
         Arguments:
             photos: Фотографии в виде ссылки/пути до файла/сырых байтов/
-                IO-хранилища/Path-like объекта
+                IO-хранилища/Path-like объекта/асинхронного итератора байтов
             peer_id: ID диалога или беседы, куда загружаются фотографии. Если
                 не передавать, то фотографии загрузятся в скрытый альбом. Рекомендуется
                 исключительно для тестирования, т.к. такой альбом имеет лимиты
+            max_parallel_batches: Сколько пачек (по 5 фотографий)
+                загружается одновременно
         Returns:
             Список врапперов загруженных фотографий, который можно напрямую
             передать в поле `attachment` при отправке сообщения
         """
-        photo_bytes_coroutines = [
-            self._fetch_photo_entity(photo) for photo in photos
+        if not photos:
+            return []
+
+        # За один раз можно загрузить только 5 фотографий,
+        # поэтому необходимо разбить фотографии на части
+        batches = [
+            photos[start_step : start_step + 5]
+            for start_step in range(0, len(photos), 5)
         ]
-        photo_bytes = await asyncio.gather(*photo_bytes_coroutines)
-        result_photos = []
-        # TODO: concurrency between uploading
-        for loading_step in itertools.count(0):
-            data_storage = aiohttp.FormData()
-
-            # За один раз можно загрузить только 5 фотографий,
-            # поэтому необходимо разбить фотографии на части
-            start_step = loading_step * 5
-            end_step = start_step + 5
-            if len(photo_bytes) <= start_step and result_photos:
-                break
-
-            for ind, photo in enumerate(photo_bytes[start_step:end_step]):
-                data_storage.add_field(
-                    f"file{ind}",
-                    photo,
-                    content_type="multipart/form-data",
-                    filename=f"a.png",  # Расширение не играет роли
+        # Адрес сервера загрузки многоразовый,
+        # поэтому он запрашивается один раз для всех пачек
+        uploading_info = await self.method(
+            "photos.get_messages_upload_server", peer_id=peer_id
+        )
+        batches_semaphore = asyncio.Semaphore(max_parallel_batches)
+        uploaded_batches = await asyncio.gather(
+            *(
+                self._upload_photos_batch(
+                    batch, uploading_info["upload_url"], batches_semaphore
                 )
-            uploading_info = await self.method(
-                "photos.get_messages_upload_server", peer_id=peer_id
+                for batch in batches
             )
-            async with self.requests_session.post(
-                uploading_info["upload_url"], data=data_storage
-            ) as response:
-                response = await self.parse_json_body(
-                    response, content_type=None
-                )
+        )
+        # `gather` сохраняет порядок пачек
+        return [photo for batch in uploaded_batches for photo in batch]
+
+    async def _upload_photos_batch(
+        self,
+        batch: typing.Sequence[PhotoEntityTyping],
+        upload_url: str,
+        batches_semaphore: asyncio.Semaphore,
+    ) -> typing.List[Photo]:
+        async with batches_semaphore:
+            with contextlib.ExitStack() as exit_stack:
+                data_storage = aiohttp.FormData()
+                batch_size = 0
+                for ind, photo in enumerate(batch):
+                    payload, payload_size = await self._make_upload_payload(
+                        photo, exit_stack
+                    )
+                    batch_size += payload_size
+                    data_storage.add_field(
+                        f"file{ind}",
+                        payload,
+                        content_type="multipart/form-data",
+                        filename=f"a.png",  # Расширение не играет роли
+                    )
+                async with self._upload_budget.reserve(batch_size):
+                    async with self.requests_session.post(
+                        upload_url, data=data_storage
+                    ) as response:
+                        response = await self.parse_json_body(
+                            response, content_type=None
+                        )
 
             try:
                 uploaded_photos = await self.method(
@@ -459,16 +950,12 @@ class API(SessionContainerMixin):
                     "фотографии в беседу сообщества, "
                     "что и является причиной ошибки)"
                 )
-            else:
-                result_photos.extend(
-                    Photo(uploaded_photo)
-                    for uploaded_photo in uploaded_photos
-                )
-        return result_photos
+                return []
+        return [Photo(uploaded_photo) for uploaded_photo in uploaded_photos]
 
     async def upload_doc_to_message(
         self,
-        content: typing.Union[str, bytes],
+        content: DocumentContentTyping,
         filename: str,
         *,
         tags: typing.Optional[str] = None,
@@ -480,8 +967,10 @@ class API(SessionContainerMixin):
         Загружает документ для отправки в сообщение
 
         Arguments:
-            content: Содержимое документа. Документ может быть
-                как текстовым, так и содержать сырые байты
+            content: Содержимое документа: текст, сырые байты, Path-like
+                объект, открытый файл или асинхронный итератор байтов.
+                Файлы и итераторы не читаются в память целиком,
+                а отправляются частями
             filename: Имя файла
             tags: Теги для файла, используемые при поиске
             return_tags: Возвращать переданные теги при запросе
@@ -494,23 +983,34 @@ class API(SessionContainerMixin):
         """
         if "." not in filename:
             filename = f"{filename}.txt"
-        data_storage = aiohttp.FormData()
-        data_storage.add_field(
-            f"file",
-            content,
-            content_type="multipart/form-data",
-            filename=filename,
-        )
 
         uploading_info = await self.method(
             "docs.get_messages_upload_server",
             peer_id=peer_id,
             type=type
         )
-        async with self.requests_session.post(
-            uploading_info["upload_url"], data=data_storage
-        ) as response:
-            response = await self.parse_json_body(response, content_type=None)
+        with contextlib.ExitStack() as exit_stack:
+            # Строка -- это текст документа, а не путь до файла
+            if isinstance(content, str):
+                payload, payload_size = content, len(content.encode())
+            else:
+                payload, payload_size = await self._make_upload_payload(
+                    content, exit_stack
+                )
+            data_storage = aiohttp.FormData()
+            data_storage.add_field(
+                f"file",
+                payload,
+                content_type="multipart/form-data",
+                filename=filename,
+            )
+            async with self._upload_budget.reserve(payload_size):
+                async with self.requests_session.post(
+                    uploading_info["upload_url"], data=data_storage
+                ) as response:
+                    response = await self.parse_json_body(
+                        response, content_type=None
+                    )
 
         document = await self.method(
             "docs.save",
@@ -521,24 +1021,8 @@ class API(SessionContainerMixin):
         )
         return Document(document[type])
 
-    def _get_waiting_time(self) -> float:
-        """
-        Рассчитывает обязательное время задержки после
-        последнего API запроса. Для групп -- 0.05s,
-        для пользователей/сервисных токенов -- 0.333s
 
-        Returns:
-            Время, необходимое для ожидания.
-        """
-        now = time.time()
-        diff = now - self._last_request_timestamp
-        if diff < self._requests_delay:
-            wait_time = self._requests_delay - diff
-            self._last_request_timestamp += wait_time
-            return wait_time
-        else:
-            self._last_request_timestamp = now
-            return 0.0
+_SEQUENCE_TYPES = frozenset({list, set, tuple})
 
 
 def _convert_param_value(value, /):
@@ -553,6 +1037,21 @@ def _convert_param_value(value, /):
         Новое значение параметра
 
     """
+    # Быстрый путь для самых частых типов. Сравнение `type(...) is`
+    # дешевле цепочки `isinstance` (особенно с ABC) и не пропускает `bool`
+    value_type = type(value)
+    if value_type is str:
+        return value
+    elif value_type is int:
+        return str(value)
+    elif value_type in _SEQUENCE_TYPES:
+        return ",".join(
+            [
+                item if type(item) is str else _convert_param_value(item)
+                for item in value
+            ]
+        )
+
     # Для всех перечислений функция вызывается рекурсивно.
     # Массивы в запросе распознаются вк только если записать их как строку,
     # перечисляя значения через запятую
@@ -591,11 +1090,16 @@ def _convert_params_for_api(params: dict, /):
         в запрос и получить ожидаемый результат
 
     """
-    updated_params = {
-        key: _convert_param_value(value)
-        for key, value in params.items()
-        if value is not None
-    }
+    updated_params = {}
+    for key, value in params.items():
+        # Строки и числа обрабатываются на месте, без вызова функции
+        value_type = type(value)
+        if value_type is str:
+            updated_params[key] = value
+        elif value_type is int:
+            updated_params[key] = str(value)
+        elif value is not None:
+            updated_params[key] = _convert_param_value(value)
     return updated_params
 
 
@@ -615,9 +1119,14 @@ def _upper_zero_group(match: typing.Match, /) -> str:
     return match.group("let").upper()
 
 
+_snake_case_regex = re.compile(r"_(?P<let>[a-z])")
+
+
+@functools.lru_cache(maxsize=1024)
 def _convert_method_name(name: str, /) -> str:
     """
-    Конвертирует snake_case в camelCase.
+    Конвертирует snake_case в camelCase. Результат запоминается,
+    т.к. набор вызываемых методов у бота обычно невелик.
 
     Arguments:
       name: Имя метода, который необходимо перевести в camelCase
@@ -626,7 +1135,59 @@ def _convert_method_name(name: str, /) -> str:
         Новое имя метода в camelCase
 
     """
-    return re.sub(r"_(?P<let>[a-z])", _upper_zero_group, name)
+    return _snake_case_regex.sub(_upper_zero_group, name)
+
+
+class MethodProxy:
+    """
+    Неизменяемый построитель вызова API метода. Каждое обращение
+    к атрибуту возвращает новый объект, поэтому имя метода и флаг
+    кэширования не делятся между конкурентными корутинами,
+    использующими один и тот же инстанс API
+    """
+
+    __slots__ = ("_api", "_method_name", "_use_cache")
+
+    def __init__(
+        self,
+        api: typing.Union[API, APIPool],
+        method_name: str = "",
+        *,
+        use_cache: bool = False,
+    ) -> None:
+        self._api = api
+        self._method_name = method_name
+        self._use_cache = use_cache
+
+    def __getattr__(self, attribute: str) -> MethodProxy:
+        if attribute.startswith("__"):
+            raise AttributeError(attribute)
+        if self._method_name:
+            attribute = f"{self._method_name}.{attribute}"
+        return MethodProxy(self._api, attribute, use_cache=self._use_cache)
+
+    async def __call__(self, **request_params) -> typing.Any:
+        """
+        Вызывает выстроенный через точку метод (см. `API.method`)
+        """
+        return await self.method(self._method_name, **request_params)
+
+    async def method(self, method_name: str, **request_params) -> typing.Any:
+        """
+        Вызывает метод с переданным именем (см. `API.method`)
+        """
+        return await self._api._make_api_request(  # noqa
+            method_name=method_name,
+            request_params=request_params,
+            use_cache=self._use_cache,
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"<vkquick.{self.__class__.__name__} "
+            f"method_name={self._method_name!r} "
+            f"use_cache={self._use_cache!r}>"
+        )
 
 
 class CallMethod:
@@ -646,3 +1207,165 @@ class CallMethod:
             for key, value in self.params.items()
         )
         return self.pattern.format(name=self.name, params=params_string)
+
+
+def _is_read_method(method_name: str, /) -> bool:
+    """
+    Определяет по имени метода, только ли читает он данные.
+    Такие запросы безопасно объединять и кэшировать, в отличие
+    от, например, `messages.send`
+    """
+    action = method_name.rpartition(".")[2]
+    return action.startswith(("get", "search", "resolve", "is"))
+
+
+def _is_batchable(method_name: str, request_params: dict, /) -> bool:
+    """
+    Проверяет, может ли запрос быть выполнен в составе `execute`.
+    Запросы с собственным токеном или версией API отправляются отдельно
+    """
+    return (
+        method_name != "execute"
+        and "access_token" not in request_params
+        and "v" not in request_params
+    )
+
+
+class _RequestsBatcher:
+    """
+    Объединяет конкурентные API запросы в один вызов `execute`.
+    Запросы копятся в течение `delay` секунд (или пока их не станет 25),
+    после чего отправляются одним VKScript-кодом. Каждый вызывающий
+    получает свой ответ или свою ошибку из `execute_errors`
+    """
+
+    max_batch_size = 25
+
+    def __init__(self, api: API, *, delay: float) -> None:
+        self._api = api
+        self._delay = delay
+        self._pending_calls: typing.List[
+            typing.Tuple[str, dict, asyncio.Future]
+        ] = []
+        self._flush_handle: typing.Optional[asyncio.TimerHandle] = None
+        # Цикл событий держит только слабые ссылки на таски,
+        # поэтому отправляемые пачки нужно хранить до завершения
+        self._sending_tasks: typing.Set[asyncio.Task] = set()
+
+    async def call(self, method_name: str, request_params: dict) -> dict:
+        """
+        Добавляет запрос в текущую пачку
+
+        Returns:
+            Сырой ответ API для конкретного запроса:
+            `{"response": ...}` или `{"error": ...}`
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending_calls.append((method_name, request_params, future))
+        if len(self._pending_calls) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._delay, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        calls = self._pending_calls
+        self._pending_calls = []
+        if calls:
+            sending_task = asyncio.create_task(self._send_batch(calls))
+            self._sending_tasks.add(sending_task)
+            sending_task.add_done_callback(self._sending_tasks.discard)
+
+    async def _send_batch(
+        self, calls: typing.List[typing.Tuple[str, dict, asyncio.Future]]
+    ) -> None:
+        try:
+            responses = await self._execute_calls(calls)
+        except Exception as error:
+            for *_, future in calls:
+                if not future.done():
+                    future.set_exception(error)
+        else:
+            for (*_, future), response in zip(calls, responses):
+                if not future.done():
+                    future.set_result(response)
+
+    @staticmethod
+    def _make_vkscript_call(method_name: str, request_params: dict) -> str:
+        # `CallMethod.to_execute` записывает значения через `repr`,
+        # экранирование которого (например, `\U000e0067`) VKScript
+        # не понимает. JSON он разбирает так же, как JavaScript
+        params = {
+            key: _convert_param_value(value)
+            for key, value in request_params.items()
+        }
+        return f"API.{method_name}({json_parser_policy.dumps(params)})"
+
+    async def _execute_calls(
+        self, calls: typing.List[typing.Tuple[str, dict, asyncio.Future]]
+    ) -> typing.List[dict]:
+        await self._api._rate_limiter.acquire()  # noqa
+
+        # Одиночный запрос нет смысла оборачивать в `execute`
+        if len(calls) == 1:
+            method_name, request_params, _ = calls[0]
+            params = self._api._stable_request_params.copy()  # noqa
+            params.update(request_params)
+            return [await self._api._send_api_request(method_name, params)]
+
+        code = "return [{}];".format(
+            ", ".join(
+                self._make_vkscript_call(method_name, request_params)
+                for method_name, request_params, _ in calls
+            )
+        )
+        params = self._api._stable_request_params.copy()  # noqa
+        params.update(code=code)
+        response = await self._api._send_api_request("execute", params)
+
+        # Ошибка всего `execute` -- ошибка каждого запроса
+        if "error" in response:
+            return [response] * len(calls)
+
+        # Вызовы выполняются по порядку: упавший возвращает `false`,
+        # а его ошибка добавляется в конец `execute_errors`. Поэтому
+        # ошибки сопоставляются с `false` по позиции, но только если
+        # их поровну и методы совпадают. Иначе какой-то метод вернул
+        # `false` сам по себе, и чья это ошибка, узнать нельзя
+        execute_errors = response.get("execute_errors", [])
+        failed_indexes = [
+            index
+            for index, result in enumerate(response["response"])
+            if result is False
+        ]
+        responses = [{"response": result} for result in response["response"]]
+        if not execute_errors:
+            return responses
+        if len(failed_indexes) == len(execute_errors) and all(
+            error.get("method") == calls[index][0]
+            for index, error in zip(failed_indexes, execute_errors)
+        ):
+            for index, error in zip(failed_indexes, execute_errors):
+                responses[index] = {"error": error}
+            return responses
+
+        # Читающие методы безопасно отправить заново по одному,
+        # а пишущие могли и выполниться, поэтому их `false` остается
+        logger.warning(
+            "Can't match execute errors with calls: {execute_errors}",
+            execute_errors=execute_errors,
+        )
+        for index in failed_indexes:
+            method_name, request_params, _ = calls[index]
+            if _is_read_method(method_name):
+                params = self._api._stable_request_params.copy()  # noqa
+                params.update(request_params)
+                await self._api._rate_limiter.acquire()  # noqa
+                responses[index] = await self._api._send_api_request(
+                    method_name, params
+                )
+        return responses
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import dataclasses
+import time
+import typing
+
+from loguru import logger
+
+from vkquick.api import API, CallMethod, MethodProxy, RetryPolicy, TokenOwner
+from vkquick.chatbot.wrappers.page import PagesCache, PagesLoader
+from vkquick.exceptions import APIError
+
+# Too many requests per second / Flood control
+_RATE_LIMIT_ERROR_CODES = frozenset({6, 9})
+_RATE_LIMIT_ERRORS = APIError[tuple(_RATE_LIMIT_ERROR_CODES)]
+
+
+@dataclasses.dataclass
+class PooledTokenStatistics:
+    """
+    Счетчики запросов, отправленных через конкретный токен пула
+
+    Arguments:
+        requests: Сколько запросов было отправлено
+        errors: Сколько запросов завершилось ошибкой API
+        rate_limit_errors: Сколько из них -- ошибки 6 и 9
+        in_flight: Сколько запросов выполняется прямо сейчас
+        cooldown_until: До какого момента (`time.monotonic()`)
+            токен не используется после ошибки 6 или 9
+    """
+
+    requests: int = 0
+    errors: int = 0
+    rate_limit_errors: int = 0
+    in_flight: int = 0
+    cooldown_until: float = 0.0
+
+
+class APIPool:
+    """
+    Пул из нескольких токенов с тем же интерфейсом вызова
+    методов, что и у `API`. Каждый запрос уходит через токен с наибольшим
+    запасом по ограничению частоты запросов. Токен, получивший ошибку
+    6 или 9, на время `cooldown` исключается из выбора, а сам
+    запрос повторяется через другой токен.
+    """
+
+    def __init__(
+        self,
+        *tokens: typing.Union[str, API],
+        token_owner: TokenOwner = TokenOwner.UNKNOWN,
+        cooldown: float = 1.0,
+        **api_kwargs,
+    ) -> None:
+        """
+        Arguments:
+            tokens: Токены или уже созданные инстансы `API`. Из политики
+                повторов переданных инстансов убираются ошибки 6 и 9:
+                их пул обрабатывает сам
+            token_owner: Владелец токенов, переданных строками
+            cooldown: На сколько секунд токен исключается из выбора
+                после ошибки 6 или 9
+            api_kwargs: Параметры для `API`, создаваемых из строк
+        """
+        if not tokens:
+            raise ValueError("Pass at least one token")
+        # Токены пула отдают одни и те же страницы
+        self._pages_cache = api_kwargs.setdefault(
+            "pages_cache", PagesCache()
+        )
+        self._pages_loader = PagesLoader(self)
+        # Ошибки 6 и 9 пул обрабатывает сам, переключаясь на другой
+        # токен, поэтому токены пула не ждут повторов при этих ошибках
+        api_kwargs.setdefault(
+            "retry_policy", RetryPolicy(retry_error_codes=frozenset({10}))
+        )
+        self._apis = [
+            token
+            if isinstance(token, API)
+            else API(token, token_owner=token_owner, **api_kwargs)
+            for token in tokens
+        ]
+        for api in self._apis:
+            retry_policy = api.retry_policy
+            if retry_policy.retry_error_codes & _RATE_LIMIT_ERROR_CODES:
+                api._retry_policy = dataclasses.replace(  # noqa
+                    retry_policy,
+                    retry_error_codes=(
+                        retry_policy.retry_error_codes
+                        - _RATE_LIMIT_ERROR_CODES
+                    ),
+                )
+        self._cooldown = cooldown
+        self._statistics = {
+            api: PooledTokenStatistics() for api in self._apis
+        }
+
+    @property
+    def apis(self) -> typing.List[API]:
+        return self._apis
+
+    @property
+    def statistics(self) -> typing.Dict[API, PooledTokenStatistics]:
+        """
+        Счетчики запросов по каждому токену пула
+        """
+        return self._statistics
+
+    @property
+    def pages_cache(self) -> PagesCache:
+        """
+        Кэш страниц, общий для токенов, переданных строками
+        """
+        return self._pages_cache
+
+    @property
+    def pages_loader(self) -> PagesLoader:
+        """
+        Объединяет одновременные `fetch_one` (см. `API.pages_loader`)
+        """
+        return self._pages_loader
+
+    @property
+    def cached(self) -> MethodProxy:
+        """
+        Построитель кэшируемых запросов (см. `API.cached`)
+        """
+        return MethodProxy(self, use_cache=True)
+
+    def use_cache(self) -> MethodProxy:
+        """
+        Включает кэширование для запроса, вызванного
+        через возвращаемый объект (см. `API.use_cache`)
+        """
+        return self.cached
+
+    def __getattr__(self, attribute: str) -> MethodProxy:
+        if attribute.startswith("__"):
+            raise AttributeError(attribute)
+        return MethodProxy(self, attribute)
+
+    async def method(self, method_name: str, **request_params) -> typing.Any:
+        """
+        Выполняет API запрос через наиболее свободный токен пула
+        (см. `API.method`)
+        """
+        return await self._make_api_request(
+            method_name=method_name,
+            request_params=request_params,
+            use_cache=False,
+        )
+
+    async def execute(
+        self, *code: typing.Union[str, CallMethod]
+    ) -> typing.Any:
+        """
+        Исполняет `execute` через наиболее свободный токен пула
+        (см. `API.execute`)
+        """
+        if not isinstance(code[0], str):
+            code = "return [{}];".format(
+                ", ".join(call.to_execute() for call in code)
+            )
+        return await self.method("execute", code=code)
+
+    async def _make_api_request(
+        self,
+        method_name: str,
+        request_params: typing.Dict[str, typing.Any],
+        use_cache: bool,
+    ) -> typing.Any:
+        tried_apis: typing.Set[API] = set()
+        while True:
+            api = self._choose_api(exclude=tried_apis)
+            tried_apis.add(api)
+            statistics = self._statistics[api]
+            statistics.requests += 1
+            statistics.in_flight += 1
+            try:
+                return await api._make_api_request(  # noqa
+                    method_name=method_name,
+                    request_params=request_params,
+                    use_cache=use_cache,
+                )
+            except _RATE_LIMIT_ERRORS as error:
+                statistics.errors += 1
+                statistics.rate_limit_errors += 1
+                statistics.cooldown_until = time.monotonic() + self._cooldown
+                logger.warning(
+                    "Token #{index} of the pool hit the rate limit "
+                    "(error {code}), cooling down for {cooldown}s",
+                    index=self._apis.index(api),
+                    code=error.status_code,
+                    cooldown=self._cooldown,
+                )
+                if len(tried_apis) == len(self._apis):
+                    raise
+            except APIError:
+                statistics.errors += 1
+                raise
+            finally:
+                statistics.in_flight -= 1
+
+    def _choose_api(self, *, exclude: typing.Set[API]) -> API:
+        """
+        Выбирает токен с наибольшим запасом по частоте запросов.
+        Остывающие после ошибок 6/9 токены выбираются, только если
+        свободных не осталось
+        """
+        now = time.monotonic()
+        candidates = [api for api in self._apis if api not in exclude]
+        return max(
+            candidates,
+            key=lambda api: (
+                self._statistics[api].cooldown_until <= now,
+                api.rate_limiter.headroom,
+                -self._statistics[api].in_flight,
+                -self._statistics[api].cooldown_until,
+            ),
+        )
+
+    async def close_session(self) -> None:
+        for api in self._apis:
+            await api.close_session()
+
+    async def __aenter__(self) -> APIPool:
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close_session()
+
+    def __repr__(self) -> str:
+        return f"<vkquick.{self.__class__.__name__} tokens={len(self._apis)}>"
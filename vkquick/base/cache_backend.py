@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import abc
+import dataclasses
+import time
+import typing
+
+
+@dataclasses.dataclass
+class CacheEntry:
+    """
+    Закэшированный ответ API
+
+    Arguments:
+        value: Ответ API
+        stored_at: Когда ответ был сохранен (`time.time()`, чтобы
+            время было общим для нескольких процессов)
+        ttl: Сколько секунд ответ считается свежим
+        stale_ttl: Сколько секунд после этого ответ еще можно
+            отдавать, параллельно обновляя его
+    """
+
+    value: typing.Any
+    stored_at: float
+    ttl: float
+    stale_ttl: float = 0.0
+
+    @property
+    def expires_at(self) -> float:
+        """
+        Момент, после которого ответ нельзя отдавать даже устаревшим
+        """
+        return self.stored_at + self.ttl + self.stale_ttl
+
+    def is_fresh(self, now: typing.Optional[float] = None) -> bool:
+        if now is None:
+            now = time.time()
+        return now < self.stored_at + self.ttl
+
+    def is_expired(self, now: typing.Optional[float] = None) -> bool:
+        if now is None:
+            now = time.time()
+        return now >= self.expires_at
+
+
+class BaseCacheBackend(abc.ABC):
+    """
+    Протокол хранилища кэшированных ответов API. Хранилище может
+    находиться вне процесса (файл, база данных), поэтому методы асинхронные.
+
+    Имплементации можно найти в [cache_backends.py](../cache_backends.py)
+    """
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> typing.Optional[CacheEntry]:
+        """
+        Возвращает запись по ключу, если она еще не истекла
+        (см. `CacheEntry.expires_at`)
+        """
+
+    @abc.abstractmethod
+    async def set(self, key: str, entry: CacheEntry) -> None:
+        """
+        Сохраняет запись. Хранилище может удалить ее
+        после `CacheEntry.expires_at`
+        """
+
+    async def close(self) -> None:
+        """
+        Освобождает ресурсы хранилища
+        """
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import abc
 import asyncio
+import dataclasses
 import typing
 
 import aiohttp
@@ -15,6 +16,7 @@ from vkquick.pretty_view import pretty_view
 
 if typing.TYPE_CHECKING:  # pragma: no cover
     from vkquick.api import API
+    from vkquick.transport import TransportConfig
 
 
 EventsCallback = typing.Callable[[BaseEvent], typing.Awaitable[None]]
@@ -24,6 +26,10 @@ class BaseEventFactory(SessionContainerMixin, abc.ABC):
 
     api: API
     _new_event_callbacks: typing.List[EventsCallback]
+    # Размер очереди `listen(bounded=True)`. Заполненная очередь
+    # останавливает получение событий, пока слушатель их не разберет.
+    # 0 -- без ограничения
+    _listen_queue_size: int = 0
 
     def __init__(
         self,
@@ -34,12 +40,16 @@ class BaseEventFactory(SessionContainerMixin, abc.ABC):
         ] = None,
         requests_session: typing.Optional[aiohttp.ClientSession] = None,
         json_parser: typing.Optional[BaseJSONParser] = None,
+        transport: typing.Optional[TransportConfig] = None,
     ):
         self.api = api
         self._run = False
         self._new_event_callbacks = new_event_callbacks or []
         SessionContainerMixin.__init__(
-            self, requests_session=requests_session, json_parser=json_parser
+            self,
+            requests_session=requests_session,
+            json_parser=json_parser,
+            transport=transport,
         )
         self._waiting_new_event_extra_task: typing.Optional[
             asyncio.Task
@@ -49,8 +59,20 @@ class BaseEventFactory(SessionContainerMixin, abc.ABC):
     async def _coroutine_run_polling(self):
         ...
 
-    async def listen(self) -> typing.AsyncGenerator[BaseEvent, None]:
-        events_queue: asyncio.Queue[BaseEvent] = asyncio.Queue()
+    async def listen(
+        self, *, bounded: bool = False
+    ) -> typing.AsyncGenerator[BaseEvent, None]:
+        """
+        Arguments:
+            bounded: Ограничить очередь слушателя. Пока она заполнена,
+                новые события не получаются, поэтому ограничивать
+                стоит только основного слушателя (`Bot.run_polling`):
+                забытый вспомогательный слушатель иначе остановил бы
+                получение событий для всех
+        """
+        events_queue: asyncio.Queue[BaseEvent] = asyncio.Queue(
+            self._listen_queue_size if bounded else 0
+        )
         logger.debug("Run events listening")
         try:
             self.add_event_callback(events_queue.put)
@@ -103,8 +125,18 @@ class BaseEventFactory(SessionContainerMixin, abc.ABC):
             "Event content: {event_content}",
             event_content=lambda: pretty_view(event.content),
         )
-        updates = [callback(event) for callback in self._new_event_callbacks]
-        await asyncio.gather(*updates)
+        callbacks = list(self._new_event_callbacks)
+        results = await asyncio.gather(
+            *(callback(event) for callback in callbacks),
+            return_exceptions=True,
+        )
+        # Ошибка одного колбэка не должна мешать остальным
+        # и следующим событиям
+        for callback, result in zip(callbacks, results):
+            if isinstance(result, Exception):
+                logger.opt(exception=result).error(
+                    "Event callback {callback} failed", callback=callback
+                )
 
     def run_polling(self):
         asyncio.run(self.coroutine_run_polling())
@@ -114,7 +146,37 @@ class BaseEventFactory(SessionContainerMixin, abc.ABC):
         ...
 
 
+@dataclasses.dataclass
+class LongPollPipelineStatistics:
+    """
+    Состояние конвейера получения событий LongPoll
+
+    Arguments:
+        responses_queue_size: Сколько ответов сервера ожидают декодирования
+        events_queue_size: Сколько событий ожидают передачи в колбэки
+        fetched_responses: Сколько ответов с событиями было получено
+        parsed_events: Сколько событий было декодировано
+        dispatched_events: Сколько событий было передано в колбэки
+    """
+
+    responses_queue_size: int = 0
+    events_queue_size: int = 0
+    fetched_responses: int = 0
+    parsed_events: int = 0
+    dispatched_events: int = 0
+
+
 class BaseLongPoll(BaseEventFactory):
+    """
+    LongPoll, работающий конвейером из трех стадий, связанных
+    ограниченными очередями: получение ответов сервера, их декодирование
+    в события и передача событий в колбэки. Следующий запрос к серверу
+    отправляется сразу после получения ответа, поэтому ни огромный
+    список `updates`, ни медленные колбэки не задерживают его
+    (пока очереди не заполнены). Когда очереди заполнены,
+    новые запросы не отправляются.
+    """
+
     def __init__(
         self,
         *,
@@ -125,18 +187,28 @@ class BaseLongPoll(BaseEventFactory):
         ] = None,
         requests_session: typing.Optional[aiohttp.ClientSession] = None,
         json_parser: typing.Optional[BaseJSONParser] = None,
+        pipeline_queue_size: int = 64,
+        transport: typing.Optional[TransportConfig] = None,
     ):
         self._event_wrapper = event_wrapper
         self._baked_request: typing.Optional[asyncio.Task] = None
         self._requests_query_params: typing.Optional[dict] = None
         self._server_url: typing.Optional[str] = None
 
+        self._pipeline_queue_size = pipeline_queue_size
+        self._listen_queue_size = pipeline_queue_size
+        self._responses_queue: typing.Optional[asyncio.Queue] = None
+        self._events_queue: typing.Optional[asyncio.Queue] = None
+        self._stages: typing.List[asyncio.Task] = []
+        self._pipeline_statistics = LongPollPipelineStatistics()
+
         BaseEventFactory.__init__(
             self,
             api=api,
             new_event_callbacks=new_event_callbacks,
             requests_session=requests_session,
             json_parser=json_parser,
+            transport=transport,
         )
 
     @abc.abstractmethod
@@ -146,13 +218,56 @@ class BaseLongPoll(BaseEventFactory):
         и открывает соединение
         """
 
+    @property
+    def pipeline_statistics(self) -> LongPollPipelineStatistics:
+        """
+        Текущие размеры очередей конвейера и счетчики его стадий
+        """
+        statistics = self._pipeline_statistics
+        statistics.responses_queue_size = (
+            self._responses_queue.qsize() if self._responses_queue else 0
+        )
+        statistics.events_queue_size = (
+            self._events_queue.qsize() if self._events_queue else 0
+        )
+        return statistics
+
     async def _coroutine_run_polling(self) -> None:
         await self._setup()
         self._requests_query_params = typing.cast(
             dict, self._requests_query_params
         )
+        self._responses_queue = asyncio.Queue(self._pipeline_queue_size)
+        self._events_queue = asyncio.Queue(self._pipeline_queue_size)
         self._update_baked_request()
+        self._stages = [
+            asyncio.create_task(self._run_fetching_stage()),
+            asyncio.create_task(self._run_parsing_stage()),
+            asyncio.create_task(self._run_dispatching_stage()),
+        ]
+        try:
+            finished_stages, _ = await asyncio.wait(
+                self._stages, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            for stage in self._stages:
+                stage.cancel()
+            await asyncio.gather(*self._stages, return_exceptions=True)
+            self._discard_baked_request()
+        # Стадии работают бесконечно, поэтому завершение любой из них
+        # останавливает весь конвейер: иначе ответы получались бы
+        # в очереди, которые никто не разбирает
+        for stage in finished_stages:
+            # Стадии отменяет `stop()`
+            if stage.cancelled():
+                raise StopAsyncIteration()
+            stage.result()
 
+    async def _run_fetching_stage(self) -> None:
+        """
+        Первая стадия: получает ответы сервера и сразу же
+        отправляет следующий запрос, если сервер сообщил новый `ts`
+        """
         while True:
             try:
                 response = await self._baked_request
@@ -175,21 +290,83 @@ class BaseLongPoll(BaseEventFactory):
                             ts=response.headers["X-Next-Ts"]
                         )
                         self._update_baked_request()
-                        response = await self.parse_json_body(response)
-                        if "updates" not in response:
-                            await self._resolve_faileds(response)
-                            continue
+                        raw_response = await response.read()
                     else:
                         response = await self.parse_json_body(response)
                         await self._resolve_faileds(response)
                         continue
 
-                if not response["updates"]:
+                # Ошибка (`failed`) может прийти и с `X-Next-Ts`, а следующий
+                # запрос тогда уже отправлен с устаревшими параметрами
+                failed_response = self._find_failed_response(raw_response)
+                if failed_response is not None:
+                    self._discard_baked_request()
+                    await self._resolve_faileds(failed_response)
                     continue
 
-                for update in response["updates"]:
+                self._pipeline_statistics.fetched_responses += 1
+                await self._responses_queue.put(raw_response)
+
+    def _find_failed_response(
+        self, raw_response: bytes
+    ) -> typing.Optional[dict]:
+        """
+        Возвращает декодированный ответ, если это ошибка LongPoll.
+        Ответ декодируется только если в нем есть ключ `failed`,
+        остальные ответы разбирает вторая стадия
+        """
+        if b'"failed"' not in raw_response:
+            return None
+        response = self.parse_json(raw_response)
+        if "failed" not in response:
+            return None
+        return response
+
+    def _discard_baked_request(self) -> None:
+        if not self._baked_request.done():
+            self._baked_request.cancel()
+        elif (
+            not self._baked_request.cancelled()
+            and self._baked_request.exception() is None
+        ):
+            self._baked_request.result().release()
+
+    async def _run_parsing_stage(self) -> None:
+        """
+        Вторая стадия: декодирует ответы и оборачивает `updates` в события
+        """
+        while True:
+            raw_response = await self._responses_queue.get()
+            try:
+                response = self.parse_json(raw_response)
+                updates = response.get("updates")
+                # Ответы с `failed` сюда не попадают: их разбирает
+                # первая стадия
+                if updates is None:
+                    logger.warning(
+                        "LongPoll response without updates: {response}",
+                        response=response,
+                    )
+                    continue
+                for update in updates:
                     event = self._event_wrapper(update)
-                    asyncio.create_task(self._run_through_callbacks(event))
+                    self._pipeline_statistics.parsed_events += 1
+                    await self._events_queue.put(event)
+            except Exception:  # noqa
+                logger.exception("Can't parse LongPoll response")
+
+    async def _run_dispatching_stage(self) -> None:
+        """
+        Третья стадия: передает события в колбэки и дожидается их.
+        Колбэк `listen(bounded=True)` только кладет событие в ограниченную
+        очередь, поэтому медленный основной слушатель (например,
+        `EventDispatcher` с политикой `BLOCK`) по цепочке заполненных
+        очередей останавливает и получение новых ответов
+        """
+        while True:
+            event = await self._events_queue.get()
+            self._pipeline_statistics.dispatched_events += 1
+            await self._run_through_callbacks(event)
 
     async def _resolve_faileds(self, response: dict):
         self._requests_query_params = typing.cast(
@@ -217,5 +394,8 @@ class BaseLongPoll(BaseEventFactory):
 
     def stop(self) -> None:
         self._baked_request.cancel()
+        # Стадия получения может ждать места в очереди, а не ответа
+        for stage in self._stages:
+            stage.cancel()
         if self._waiting_new_event_extra_task is not None:
             self._waiting_new_event_extra_task.cancel()
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import abc
+
+
+class BaseRateLimiter(abc.ABC):
+    """
+    Протокол ограничителя частоты API запросов. Перед отправкой
+    каждого запроса `API` ожидает `acquire`, поэтому имплементация
+    сама решает, сколько запросов можно выполнить сразу, а какие
+    должны подождать.
+
+    Имплементации можно найти в [rate_limiters.py](../rate_limiters.py)
+    """
+
+    @abc.abstractmethod
+    async def acquire(self) -> None:
+        """
+        Ожидает, пока запрос можно будет отправить,
+        не нарушив ограничений
+        """
+
+    @property
+    @abc.abstractmethod
+    def headroom(self) -> float:
+        """
+        Сколько запросов можно отправить прямо сейчас без ожидания
+        """
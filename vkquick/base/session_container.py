@@ -1,12 +1,16 @@
 from __future__ import annotations
 
 import contextlib
-import ssl
 import typing
 
 import aiohttp
 
 from vkquick.json_parsers import BaseJSONParser, json_parser_policy
+from vkquick.transport import (
+    TransportConfig,
+    TransportConnector,
+    TransportStatistics,
+)
 
 
 class SessionContainerMixin:
@@ -27,16 +31,20 @@ class SessionContainerMixin:
         self,
         *,
         requests_session: typing.Optional[aiohttp.ClientSession] = None,
-        json_parser: typing.Optional[BaseJSONParser] = None
+        json_parser: typing.Optional[BaseJSONParser] = None,
+        transport: typing.Optional[TransportConfig] = None,
     ) -> None:
         """
         Arguments:
             requests_session: Кастомная `aiohttp`-сессия для HTTP запросов.
             json_parser: Кастомный парсер, имплементирующий методы
                 сериализации/десериализации JSON.
+            transport: Настройки пула соединений для сессии,
+                создаваемой по умолчанию.
         """
         self.__session = requests_session
         self.__json_parser = json_parser or json_parser_policy
+        self.__transport = transport or TransportConfig()
 
     @property
     def requests_session(self) -> aiohttp.ClientSession:
@@ -51,6 +59,25 @@ class SessionContainerMixin:
 
         return self.__session
 
+    @property
+    def transport(self) -> TransportConfig:
+        """
+        Настройки пула соединений сессии
+        """
+        return self.__transport
+
+    @property
+    def transport_statistics(self) -> typing.Optional[TransportStatistics]:
+        """
+        Состояние пула соединений сессии. `None`, если сессия
+        еще не создана или использует сторонний коннектор
+        """
+        if self.__session is None or not isinstance(
+            self.__session.connector, TransportConnector
+        ):
+            return None
+        return self.__session.connector.statistics
+
     async def __aenter__(self) -> SessionContainerMixin:
         """
         Позволяет автоматически закрыть сессию
@@ -88,6 +115,19 @@ class SessionContainerMixin:
         """
         return await response.json(loads=self.__json_parser.loads, **kwargs)
 
+    def parse_json(self, data: typing.Union[str, bytes]) -> dict:
+        """
+        Декодирует уже прочитанное тело ответа
+        переданным JSON парсером.
+
+        Arguments:
+            data: JSON-строка или байты
+
+        Returns:
+            Словарь, полученный при декодировании.
+        """
+        return self.__json_parser.loads(data)
+
     def _init_aiohttp_session(self) -> aiohttp.ClientSession:
         """
         Инициализирует `aiohttp`-сессию. Переопределяйте этот метод
@@ -96,8 +136,7 @@ class SessionContainerMixin:
         Returns:
             Новую `aiohttp`-сессию
         """
-        return aiohttp.ClientSession(
-            connector=aiohttp.TCPConnector(ssl=ssl.SSLContext()),
+        return self.__transport.make_session(
             skip_auto_headers={"User-Agent"},
             raise_for_status=True,
             json_serialize=self.__json_parser.dumps,
@@ -0,0 +1,177 @@
+"""
+Имплементации хранилищ кэша API запросов
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import os
+import sqlite3
+import typing
+
+import cachetools
+
+from vkquick.base.cache_backend import BaseCacheBackend, CacheEntry
+from vkquick.base.json_parser import BaseJSONParser
+from vkquick.json_parsers import json_parser_policy
+
+
+class MemoryCacheBackend(BaseCacheBackend):
+    """
+    Кэш в памяти процесса поверх любой таблицы из `cachetools`.
+    По умолчанию -- LRU на 4096 записей
+    """
+
+    def __init__(
+        self, cache_table: typing.Optional[cachetools.Cache] = None
+    ) -> None:
+        self._cache_table = (
+            cache_table
+            if cache_table is not None
+            else cachetools.LRUCache(maxsize=2 ** 12)
+        )
+
+    async def get(self, key: str) -> typing.Optional[CacheEntry]:
+        entry = self._cache_table.get(key)
+        if entry is None:
+            return None
+        if entry.is_expired():
+            self._cache_table.pop(key, None)
+            return None
+        return entry
+
+    async def set(self, key: str, entry: CacheEntry) -> None:
+        self._cache_table[key] = entry
+
+
+class SQLiteCacheBackend(BaseCacheBackend):
+    """
+    Кэш в файле SQLite, который могут разделять несколько процессов
+    на одной машине. База открывается в WAL режиме, поэтому чтения
+    не блокируются записью из соседних процессов. Запросы
+    к базе выполняются в отдельном потоке, не блокируя цикл событий.
+
+    Ответы сериализуются установленным JSON парсером
+    (`json_parser_policy`), поэтому в кэш попадают только
+    JSON-совместимые ответы
+    """
+
+    # Как часто (в записях) удалять истекшие записи
+    cleanup_every: int = 1000
+
+    def __init__(
+        self,
+        path: typing.Union[str, os.PathLike],
+        *,
+        json_parser: typing.Optional[typing.Type[BaseJSONParser]] = None,
+        timeout: float = 5.0,
+    ) -> None:
+        """
+        Arguments:
+            path: Путь до файла базы
+            json_parser: Парсер для сериализации ответов
+            timeout: Сколько секунд ждать блокировки базы другим процессом
+        """
+        self._path = os.fspath(path)
+        self._json_parser = json_parser or json_parser_policy
+        self._timeout = timeout
+        # Один поток: соединение SQLite нельзя использовать
+        # из нескольких потоков одновременно
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="vkquick-sqlite-cache"
+        )
+        self._connection: typing.Optional[sqlite3.Connection] = None
+        self._sets_count = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(
+                self._path,
+                timeout=self._timeout,
+                isolation_level=None,
+                check_same_thread=False,
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS api_cache (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    stored_at REAL NOT NULL,
+                    ttl REAL NOT NULL,
+                    stale_ttl REAL NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+                """
+            )
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, func: typing.Callable, *args) -> typing.Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _get_sync(self, key: str) -> typing.Optional[CacheEntry]:
+        row = (
+            self._connect()
+            .execute(
+                "SELECT value, stored_at, ttl, stale_ttl "
+                "FROM api_cache WHERE key = ?",
+                (key,),
+            )
+            .fetchone()
+        )
+        if row is None:
+            return None
+        value, stored_at, ttl, stale_ttl = row
+        entry = CacheEntry(
+            value=self._json_parser.loads(value)["value"],
+            stored_at=stored_at,
+            ttl=ttl,
+            stale_ttl=stale_ttl,
+        )
+        if entry.is_expired():
+            return None
+        return entry
+
+    def _set_sync(self, key: str, entry: CacheEntry) -> None:
+        # Ответ заворачивается в объект: парсеры обещают
+        # сериализовать только словари
+        value = self._json_parser.dumps({"value": entry.value})
+        connection = self._connect()
+        connection.execute(
+            "INSERT OR REPLACE INTO api_cache VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                key,
+                value,
+                entry.stored_at,
+                entry.ttl,
+                entry.stale_ttl,
+                entry.expires_at,
+            ),
+        )
+        self._sets_count += 1
+        if self._sets_count % self.cleanup_every == 0:
+            connection.execute(
+                "DELETE FROM api_cache WHERE expires_at <= ?",
+                (entry.stored_at,),
+            )
+
+    async def get(self, key: str) -> typing.Optional[CacheEntry]:
+        return await self._run(self._get_sync, key)
+
+    async def set(self, key: str, entry: CacheEntry) -> None:
+        await self._run(self._set_sync, key, entry)
+
+    def _close_sync(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def close(self) -> None:
+        await self._run(self._close_sync)
+        self._executor.shutdown(wait=False)
+
+    def __repr__(self) -> str:
+        return f"<vkquick.{self.__class__.__name__} path={self._path!r}>"
@@ -11,15 +11,18 @@ import jinja2
 from loguru import logger
 
 from vkquick.api import API, TokenOwner
-from vkquick.base.event import BaseEvent
+from vkquick.base.event import BaseEvent, EventType
 from vkquick.base.event_factories import BaseEventFactory
+from vkquick.chatbot.command.index import CommandsIndex
+from vkquick.chatbot.dispatcher import EventDispatcher, LaneKey
 from vkquick.chatbot.exceptions import StopCurrentHandling, StopStateHandling
-from vkquick.chatbot.package import Package
+from vkquick.chatbot.package import EventHandler, Package
 from vkquick.chatbot.storages import (
     CallbackButtonPressed,
     NewEvent,
     NewMessage,
 )
+from vkquick.chatbot.utils import close_shared_sessions
 from vkquick.event import GroupEvent
 from vkquick.logger import update_logging_level
 from vkquick.longpoll import GroupLongPoll, UserLongPoll
@@ -39,6 +42,13 @@ class App(Package, typing.Generic[AppPayloadFieldTypevar]):
     payload_factory: typing.Type[AppPayloadFieldTypevar] = dataclasses.field(
         default=None
     )
+    # Ограничивает число одновременно обрабатываемых событий всех ботов
+    dispatcher: EventDispatcher = dataclasses.field(
+        default_factory=EventDispatcher
+    )
+    # Ключ очереди, в пределах которой события обрабатываются по порядку
+    # (например, `peer_id_lane_key`). `None` -- без упорядочивания
+    lane_key: typing.Optional[LaneKey] = None
 
     def __post_init__(self):
         if self.debug:
@@ -50,17 +60,35 @@ class App(Package, typing.Generic[AppPayloadFieldTypevar]):
                 command.update_prefix(*self.prefixes)
 
         self.packages.append(self)
+        self._commands_index: typing.Optional[CommandsIndex] = None
+        self._event_handlers_index: typing.Optional[
+            typing.Dict[EventType, typing.List[EventHandler]]
+        ] = None
 
     @functools.cached_property
     def payload(self) -> AppPayloadFieldTypevar:
         return self.payload_factory()
 
     async def route_event(self, new_event_storage) -> None:
-        routing_coroutines = [
-            package.handle_event(new_event_storage)
-            for package in self.packages
-        ]
-        await asyncio.gather(*routing_coroutines)
+        handlers = self.get_event_handlers(new_event_storage.event.type)
+        if not handlers:
+            return
+        if len(handlers) == 1:
+            await handlers[0].handler(new_event_storage)
+        else:
+            await asyncio.gather(
+                *(handler.handler(new_event_storage) for handler in handlers)
+            )
+
+    def get_event_handlers(
+        self, event_type: EventType
+    ) -> typing.Sequence[EventHandler]:
+        """
+        Обработчики событий типа `event_type` из всех пакетов приложения
+        """
+        if self._event_handlers_index is None:
+            self.rebuild_routing_indexes()
+        return self._event_handlers_index.get(event_type, ())
 
     async def route_message(self, ctx: NewMessage):
         try:
@@ -69,8 +97,14 @@ class App(Package, typing.Generic[AppPayloadFieldTypevar]):
         except StopCurrentHandling:
             return
         else:
+            if self._commands_index is None:
+                self.rebuild_routing_indexes()
+            candidates = self._commands_index.find_candidates(ctx.msg.text)
             routing_coroutines = [
-                package.handle_message(ctx) for package in self.packages
+                package.handle_message(
+                    ctx, commands=candidates.get(id(package), ())
+                )
+                for package in self.packages
             ]
             await asyncio.gather(*routing_coroutines)
 
@@ -87,6 +121,26 @@ class App(Package, typing.Generic[AppPayloadFieldTypevar]):
         self.packages.append(package)
         for command in package.commands:
             command.update_prefix(*self.prefixes)
+        self.rebuild_routing_indexes()
+
+    def rebuild_routing_indexes(self) -> None:
+        """
+        Перестраивает индексы, по которым сообщения и события
+        направляются в обработчики пакетов. Индексы строятся при запуске
+        приложения и добавлении пакета, поэтому вызывайте метод вручную,
+        только если добавляете обработчики в уже запущенное приложение
+        """
+        self._commands_index = CommandsIndex(self.packages)
+        event_handlers_index: typing.Dict[
+            EventType, typing.List[EventHandler]
+        ] = {}
+        for package in self.packages:
+            for event_type, handlers in package.event_handlers.items():
+                if handlers:
+                    event_handlers_index.setdefault(event_type, []).extend(
+                        handlers
+                    )
+        self._event_handlers_index = event_handlers_index
 
     def run(
         self,
@@ -119,6 +173,7 @@ class App(Package, typing.Generic[AppPayloadFieldTypevar]):
         docs_directory: str = "autodocs",
         docs_filename: str = "index.html"
     ) -> None:
+        self.rebuild_routing_indexes()
         if build_autodoc:
             self.render_autodoc(
                 directory=docs_directory, filename=docs_filename
@@ -136,6 +191,9 @@ class App(Package, typing.Generic[AppPayloadFieldTypevar]):
             for token in tokens
         ]
         bots = await asyncio.gather(*bots_init_coroutines)
+        await asyncio.gather(
+            *(bot.api.prewarm_connections() for bot in bots)
+        )
         await self._call_startup(*bots)
         run_coroutines = [bot.run_polling() for bot in bots]
         try:
@@ -144,6 +202,7 @@ class App(Package, typing.Generic[AppPayloadFieldTypevar]):
             await self._call_shutdown(*bots)
             for bot in bots:
                 await bot.close_sessions()
+            await close_shared_sessions()
 
     async def _call_startup(self, *bots: Bot) -> None:
         startup_coroutines = []
@@ -228,10 +287,12 @@ class Bot(typing.Generic[AppPayloadFieldTypevar, BotPayloadFieldTypevar]):
             api = API(token)
         token_owner, _ = await api.define_token_owner()
         events_factory: BaseEventFactory
+        # Long poll использует те же настройки транспорта,
+        # а значит и общий коннектор, если он включен
         if token_owner == TokenOwner.USER:
-            events_factory = UserLongPoll(api)
+            events_factory = UserLongPoll(api, transport=api.transport)
         else:
-            events_factory = GroupLongPoll(api)
+            events_factory = GroupLongPoll(api, transport=api.transport)
         return cls(
             app=app,
             api=api,
@@ -240,53 +301,92 @@ class Bot(typing.Generic[AppPayloadFieldTypevar, BotPayloadFieldTypevar]):
         )
 
     async def run_polling(self):
-        async for event in self.events_factory.listen():
+        # Только эта очередь ограничена: полный диспетчер останавливает
+        # получение событий, а вспомогательные слушатели -- нет
+        async for event in self.events_factory.listen(bounded=True):
             logger.opt(colors=True).info(
                 "New event: <y>{event_type}</y>",
                 event_type=event.type,
             )
             new_event_storage = NewEvent(event=event, bot=self)
-            asyncio.create_task(self.handle_event(new_event_storage))
+            # Все этапы обработки события выполняются в одной таске,
+            # чтобы диспетчер мог ограничить их общее количество
+            lane_key = (
+                self.app.lane_key(new_event_storage)
+                if self.app.lane_key is not None
+                else None
+            )
+            await self.app.dispatcher.dispatch(
+                event.type,
+                functools.partial(
+                    self.handle_event, new_event_storage, wrap_to_task=False
+                ),
+                lane_key=lane_key,
+            )
 
     @logger.catch(exclude=StopStateHandling)
     async def handle_event(
         self, new_event_storage: NewEvent, wrap_to_task: bool = True
     ):
-        route_event_coroutine = self.app.route_event(new_event_storage)
-        if wrap_to_task:
-            asyncio.create_task(route_event_coroutine)
-        else:
-            await route_event_coroutine
+        # События без подписчиков (набор текста, прочтение, онлайн)
+        # не порождают ни корутины, ни таски
+        routing_coroutines = []
+        if self.app.get_event_handlers(new_event_storage.event.type):
+            routing_coroutines.append(
+                self.app.route_event(new_event_storage)
+            )
 
         if new_event_storage.event.type in {
             "message_new",
             "message_reply",
             4,
-        } and (len(new_event_storage.event.content) > 3 or isinstance(new_event_storage.event, GroupEvent)):
-            ctx = await NewMessage.from_event(
-                event=new_event_storage.event,
-                bot=new_event_storage.bot,
-                payload_factory=new_event_storage.payload_factory,
+        } and (
+            len(new_event_storage.event.content) > 3
+            or isinstance(new_event_storage.event, GroupEvent)
+        ):
+            routing_coroutines.append(self._route_message(new_event_storage))
+        elif new_event_storage.event.type == "message_event":
+            routing_coroutines.append(
+                self._route_callback_button_pressing(new_event_storage)
             )
 
-            route_message_coroutine = self.app.route_message(ctx)
-            if wrap_to_task:
-                asyncio.create_task(route_message_coroutine)
-            else:
-                await route_message_coroutine
+        if wrap_to_task:
+            for routing_coroutine in routing_coroutines:
+                asyncio.create_task(routing_coroutine)
+            return
 
-        elif new_event_storage.event.type == "message_event":
-            context = await CallbackButtonPressed.from_event(
-                event=new_event_storage.event, bot=new_event_storage.bot
-            )
-            route_callback_button_pressing_coroutine = (
-                self.app.route_callback_button_pressing(context)
-            )
-            if wrap_to_task:
-                asyncio.create_task(route_callback_button_pressing_coroutine)
-            else:
-                await route_callback_button_pressing_coroutine
+        # Маршруты выполняются одновременно, как и в отдельных тасках:
+        # ошибка обработчика события не отменяет разбор команды
+        results = await asyncio.gather(
+            *routing_coroutines, return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, StopStateHandling):
+                raise result
+            elif isinstance(result, Exception):
+                logger.opt(exception=result).error(
+                    "Error while routing {event_type} event",
+                    event_type=new_event_storage.event.type,
+                )
+
+    async def _route_message(self, new_event_storage: NewEvent) -> None:
+        ctx = await NewMessage.from_event(
+            event=new_event_storage.event,
+            bot=new_event_storage.bot,
+            payload_factory=new_event_storage.payload_factory,
+        )
+        await self.app.route_message(ctx)
+
+    async def _route_callback_button_pressing(
+        self, new_event_storage: NewEvent
+    ) -> None:
+        context = await CallbackButtonPressed.from_event(
+            event=new_event_storage.event, bot=new_event_storage.bot
+        )
+        await self.app.route_callback_button_pressing(context)
 
     async def close_sessions(self):
         await self.events_factory.close_session()
         await self.api.close_session()
+        await self.events_factory.transport.close()
+        await self.api.transport.close()
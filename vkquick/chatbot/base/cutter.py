@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import abc
 import dataclasses
+import functools
 import typing
 
 from vkquick.chatbot.exceptions import BadArgumentError
@@ -37,6 +38,17 @@ class CutterParsingResponse(typing.Generic[T]):
     extra: dict = dataclasses.field(default_factory=dict)
 
 
+class RegexArgumentPlan(typing.NamedTuple):
+    """
+    Описание аргумента, который целиком разбирается одним
+    регулярным выражением: команда может собрать такие аргументы
+    в общее выражение и разобрать их все за один вызов `match`
+    """
+
+    pattern: typing.Pattern
+    factory: typing.Optional[typing.Callable[[str], typing.Any]] = None
+
+
 class Cutter(abc.ABC):
     @abc.abstractmethod
     async def cut_part(
@@ -44,6 +56,54 @@ class Cutter(abc.ABC):
     ) -> CutterParsingResponse:
         ...
 
+    @property
+    def regex_plan(self) -> typing.Optional[RegexArgumentPlan]:
+        """
+        Регулярное выражение, которым аргумент разбирается без
+        обращения к `cut_part`. `None` -- только через `cut_part`.
+
+        План из `_make_regex_plan` не используется, если подкласс
+        переопределил `cut_part` или `cut_part_sync`, но не сам план:
+        иначе логика подкласса была бы пропущена
+        """
+        if not _implemented_after(
+            type(self), "_make_regex_plan", "cut_part", "cut_part_sync"
+        ):
+            return None
+        return self._make_regex_plan()
+
+    def _make_regex_plan(self) -> typing.Optional[RegexArgumentPlan]:
+        return None
+
+    @property
+    def is_sync(self) -> bool:
+        """
+        Может ли резчик разобрать аргумент синхронно,
+        через `cut_part_sync`, не создавая корутину.
+
+        Если подкласс переопределил `cut_part`, но не `cut_part_sync`,
+        разбор идет только через `cut_part`: иначе логика подкласса
+        была бы пропущена
+        """
+        return (
+            _implemented_after(type(self), "cut_part_sync", "cut_part")
+            and self._typevars_are_sync()
+        )
+
+    def _typevars_are_sync(self) -> bool:
+        """
+        Могут ли вложенные резчики разобрать свои части синхронно
+        """
+        return True
+
+    def cut_part_sync(
+        self, ctx: NewMessage, arguments_string: str
+    ) -> CutterParsingResponse:
+        """
+        Синхронный вариант `cut_part`. Вызывается, только если `is_sync`
+        """
+        raise NotImplementedError
+
     @abc.abstractmethod
     def gen_doc(self) -> str:
         ...
@@ -54,6 +114,46 @@ class Cutter(abc.ABC):
         return message
 
 
+class SyncCutter(Cutter, abc.ABC):
+    """
+    Резчик, которому для разбора не нужны ни API, ни другие
+    асинхронные операции. Реализует только `cut_part_sync`
+    """
+
+    async def cut_part(
+        self, ctx: NewMessage, arguments_string: str
+    ) -> CutterParsingResponse:
+        return self.cut_part_sync(ctx, arguments_string)
+
+    @abc.abstractmethod
+    def cut_part_sync(
+        self, ctx: NewMessage, arguments_string: str
+    ) -> CutterParsingResponse:
+        ...
+
+
+def _defining_class(cls: type, attribute: str) -> type:
+    for klass in cls.__mro__:
+        if attribute in vars(klass):
+            return klass
+    raise AttributeError(attribute)
+
+
+@functools.lru_cache(maxsize=None)
+def _implemented_after(cls: type, implementation: str, *methods: str) -> bool:
+    """
+    Определен ли `implementation` в том же классе, что и каждый
+    из `methods`, или в его подклассе. Если подкласс переопределил
+    один из `methods`, а `implementation` унаследовал, то
+    `implementation` ничего не знает о новой логике
+    """
+    implementing_class = _defining_class(cls, implementation)
+    return all(
+        issubclass(implementing_class, _defining_class(cls, method))
+        for method in methods
+    )
+
+
 def cut_part_via_regex(
     regex: typing.Pattern,
     arguments_string: str,
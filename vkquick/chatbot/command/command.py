@@ -15,6 +15,7 @@ from vkquick.chatbot.base.cutter import (
 from vkquick.chatbot.base.filter import BaseFilter
 from vkquick.chatbot.base.handler_container import HandlerMixin
 from vkquick.chatbot.command.adapters import resolve_typing
+from vkquick.chatbot.command.cutters import EntitiesResolver
 from vkquick.chatbot.dependency import DependencyMixin, Depends
 from vkquick.chatbot.exceptions import BadArgumentError, StopCurrentHandling
 from vkquick.chatbot.storages import NewMessage
@@ -25,6 +26,23 @@ Handler = typing.TypeVar(
     "Handler", bound=typing.Callable[..., typing.Awaitable]
 )
 
+# Флаги, которые можно задать для части выражения через `(?flags:...)`
+_SCOPED_RE_FLAGS = (
+    (re.IGNORECASE, "i"),
+    (re.MULTILINE, "m"),
+    (re.DOTALL, "s"),
+    (re.VERBOSE, "x"),
+)
+
+
+def _atomic_group(pattern: str, group_name: str) -> str:
+    """
+    Эмуляция атомарной группы: совпадение, захваченное в опережающей
+    проверке, уже не пересматривается при откате. Так каждая часть
+    общего выражения ведет себя как отдельный `match` у резчика
+    """
+    return f"(?=(?P<{group_name}>{pattern}))(?P={group_name})"
+
 
 @dataclasses.dataclass
 class Command(HandlerMixin[Handler]):
@@ -49,6 +67,15 @@ class Command(HandlerMixin[Handler]):
         self._ctx_argument_name: str
         self._parse_handler_arguments()
 
+        self._arguments_regex: typing.Optional[typing.Pattern] = None
+        self._arguments_factories: typing.List[
+            typing.Optional[typing.Callable[[str], typing.Any]]
+        ] = []
+        self._build_arguments_regex()
+        self._arguments_are_sync = all(
+            argtype.cutter.is_sync for argtype in self._text_arguments
+        )
+
         self._routing_regex: typing.Pattern
         self._build_routing_regex()
 
@@ -70,18 +97,38 @@ class Command(HandlerMixin[Handler]):
             self.prefixes = list(set(prefixes))
             self._build_routing_regex()
 
+    def match_routing(self, text: str) -> typing.Optional[typing.Match]:
+        """
+        Синхронно проверяет, вызывает ли текст сообщения эту команду
+
+        Arguments:
+            text: Текст сообщения
+
+        Returns:
+            Совпадение регулярного выражения команды или `None`
+        """
+        return self._routing_regex.match(text)
+
     async def handle_message(self, ctx: NewMessage) -> None:
-        is_routing_matched = self._routing_regex.match(ctx.msg.text)
-        if is_routing_matched:
-            arguments = await self._make_arguments(
-                ctx,
-                ctx.msg.text[is_routing_matched.end() :],
-            )
-            if arguments is not None:
-                passed_filter = await self._run_through_filters(ctx)
-                # Were built correctly
-                if passed_filter:
-                    await self._call_handler(ctx, arguments)
+        routing_match = self.match_routing(ctx.msg.text)
+        if routing_match:
+            await self.handle_routed_message(ctx, routing_match)
+
+    async def handle_routed_message(
+        self, ctx: NewMessage, routing_match: typing.Match
+    ) -> None:
+        """
+        Обрабатывает сообщение, уже совпавшее с командой через `match_routing`
+        """
+        arguments = await self._make_arguments(
+            ctx,
+            ctx.msg.text[routing_match.end() :],
+        )
+        if arguments is not None:
+            passed_filter = await self._run_through_filters(ctx)
+            # Were built correctly
+            if passed_filter:
+                await self._call_handler(ctx, arguments)
 
     async def _run_through_filters(self, ctx: NewMessage) -> bool:
         if self.filter is not None:
@@ -95,19 +142,71 @@ class Command(HandlerMixin[Handler]):
 
     async def _make_arguments(
         self, ctx: NewMessage, arguments_string: str
+    ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        if self._arguments_regex is not None:
+            arguments = self._make_arguments_via_regex(ctx, arguments_string)
+            if arguments is not None:
+                return arguments
+            # Если общее выражение не совпало, то разбор по одному
+            # аргументу найдет, какой из них некорректен, и сообщит об этом
+
+        if self._arguments_are_sync:
+            return await self._cut_arguments(ctx, arguments_string)
+
+        # Страницы, упомянутые в аргументах, запрашиваются
+        # не каждым резчиком по отдельности, а разом после разбора
+        payload = ctx.argument_processing_payload
+        payload_before_cutting = payload.copy()
+        resolver = EntitiesResolver()
+        payload[EntitiesResolver.payload_key] = resolver
+        try:
+            arguments = await self._cut_arguments(
+                ctx, arguments_string, resolver=resolver
+            )
+        finally:
+            del payload[EntitiesResolver.payload_key]
+        if not resolver.has_deferred:
+            return arguments
+        if arguments is not None and await resolver.resolve(ctx.api):
+            return {
+                name: resolver.substitute(value)
+                for name, value in arguments.items()
+            }
+
+        # Заглушка могла забрать текст, который без нее разобрал бы
+        # другой аргумент (например, `Optional[User]` перед словом),
+        # или какую-то страницу не удалось получить. Повторный разбор
+        # запрашивает страницы по одной, поэтому аргументы будут
+        # разобраны и ошибки обработаны так же, как и раньше
+        payload.clear()
+        payload.update(payload_before_cutting)
+        return await self._cut_arguments(ctx, arguments_string)
+
+    async def _cut_arguments(
+        self,
+        ctx: NewMessage,
+        arguments_string: str,
+        *,
+        resolver: typing.Optional[EntitiesResolver] = None,
     ) -> typing.Optional[typing.Dict[str, typing.Any]]:
         arguments = {}
         remain_string = arguments_string.lstrip()
         # argtype is None после обработки, если у команды не было аргументов вовсе
         argtype = None
         for argtype in self._text_arguments:
-            remain_string = remain_string.lstrip()
             try:
-                parsing_response = await argtype.cutter.cut_part(
-                    ctx, remain_string
-                )
+                # Синхронные резчики (и цепочки из них) вызываются
+                # напрямую, без создания корутины
+                if argtype.cutter.is_sync:
+                    parsing_response = argtype.cutter.cut_part_sync(
+                        ctx, remain_string
+                    )
+                else:
+                    parsing_response = await argtype.cutter.cut_part(
+                        ctx, remain_string
+                    )
             except BadArgumentError:
-                if self.invalid_argument_config is not None:
+                if self._reports_invalid_argument(resolver):
                     await self.invalid_argument_config.on_invalid_argument(
                         remain_string=remain_string,
                         ctx=ctx,
@@ -121,9 +220,8 @@ class Command(HandlerMixin[Handler]):
                 ] = parsing_response.parsed_part
 
         if remain_string:
-            if (
-                argtype is not None
-                and self.invalid_argument_config is not None
+            if argtype is not None and self._reports_invalid_argument(
+                resolver
             ):
                 await self.invalid_argument_config.on_invalid_argument(
                     remain_string=remain_string,
@@ -135,6 +233,33 @@ class Command(HandlerMixin[Handler]):
             arguments[self._ctx_argument_name] = ctx
         return arguments
 
+    def _reports_invalid_argument(
+        self, resolver: typing.Optional[EntitiesResolver]
+    ) -> bool:
+        # Если разбор с отложенными страницами не удался, его повторят
+        # без резолвера, и о некорректном аргументе сообщит повтор
+        return self.invalid_argument_config is not None and (
+            resolver is None or not resolver.has_deferred
+        )
+
+    def _make_arguments_via_regex(
+        self, ctx: NewMessage, arguments_string: str
+    ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        matched = self._arguments_regex.match(arguments_string)
+        if matched is None:
+            return None
+        arguments = {}
+        for index, (argtype, factory) in enumerate(
+            zip(self._text_arguments, self._arguments_factories)
+        ):
+            parsed_part = matched.group(f"argument{index}")
+            if factory is not None:
+                parsed_part = factory(parsed_part)
+            arguments[argtype.argument_name] = parsed_part
+        if self._ctx_argument_name is not None:
+            arguments[self._ctx_argument_name] = ctx
+        return arguments
+
     async def _call_handler(self, ctx: NewMessage, arguments: dict) -> None:
         logger.opt(colors=True).success(
             **format_mapping(
@@ -173,6 +298,42 @@ class Command(HandlerMixin[Handler]):
 
         self._dependency_mixin.parse_dependency_arguments(self.handler)
 
+    def _build_arguments_regex(self) -> None:
+        """
+        Если все аргументы команды разбираются регулярными выражениями
+        (`Cutter.regex_plan`), собирает их в одно выражение с именованной
+        группой на каждый аргумент. Такие команды разбирают аргументы
+        одним `match` без вызова корутин резчиков
+        """
+        if not self._text_arguments:
+            return
+        regex_parts = []
+        factories = []
+        for index, argtype in enumerate(self._text_arguments):
+            plan = argtype.cutter.regex_plan
+            # Собственные группы выражения сбили бы нумерацию общего
+            if plan is None or plan.pattern.groups:
+                return
+            flags = plan.pattern.flags & ~re.UNICODE
+            scoped_flags = "".join(
+                letter for flag, letter in _SCOPED_RE_FLAGS if flags & flag
+            )
+            if flags & ~sum(flag for flag, _ in _SCOPED_RE_FLAGS):
+                return
+            # В verbose режиме выражение может заканчиваться комментарием
+            closing = "\n)" if flags & re.VERBOSE else ")"
+            argument_pattern = (
+                f"(?{scoped_flags}:{plan.pattern.pattern}{closing}"
+            )
+            regex_parts.append(_atomic_group(r"\s*", f"spaces{index}"))
+            regex_parts.append(
+                _atomic_group(argument_pattern, f"argument{index}")
+            )
+            factories.append(plan.factory)
+        regex_parts.append(r"\s*\Z")
+        self._arguments_regex = re.compile("".join(regex_parts))
+        self._arguments_factories = factories
+
     def _build_routing_regex(self) -> None:
         """
         Выстраивает регулярное выражение, по которому
@@ -1,25 +1,32 @@
+import asyncio
 import dataclasses
 import enum
 import re
 import typing
 
+from vkquick.api import CallMethod
 from vkquick.chatbot.base.cutter import (
     Cutter,
     CutterParsingResponse,
+    RegexArgumentPlan,
+    SyncCutter,
     cut_part_via_regex,
     html_list_to_message,
 )
 from vkquick.chatbot.exceptions import BadArgumentError
 from vkquick.chatbot.storages import NewMessage
 from vkquick.chatbot.utils import get_origin_typing
-from vkquick.chatbot.wrappers.page import Group, Page, User
+from vkquick.chatbot.wrappers.page import Group, IDType, Page, User
 from vkquick.exceptions import APIError
 
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from vkquick.api import API
 
-class IntegerCutter(Cutter):
+
+class IntegerCutter(SyncCutter):
     _pattern = re.compile(r"[+-]?\d+")
 
-    async def cut_part(
+    def cut_part_sync(
         self, ctx: NewMessage, arguments_string: str
     ) -> CutterParsingResponse[int]:
         return cut_part_via_regex(
@@ -29,11 +36,14 @@ class IntegerCutter(Cutter):
             error_description=self.gen_message_doc(),
         )
 
+    def _make_regex_plan(self) -> RegexArgumentPlan:
+        return RegexArgumentPlan(self._pattern, int)
+
     def gen_doc(self):
         return "целое положительное или отрицательное число"
 
 
-class FloatCutter(Cutter):
+class FloatCutter(SyncCutter):
     _pattern = re.compile(
         r"""
         [-+]?  # optional sign
@@ -48,7 +58,7 @@ class FloatCutter(Cutter):
         flags=re.X,
     )
 
-    async def cut_part(
+    def cut_part_sync(
         self, ctx: NewMessage, arguments_string: str
     ) -> CutterParsingResponse[float]:
         return cut_part_via_regex(
@@ -58,6 +68,9 @@ class FloatCutter(Cutter):
             error_description=self.gen_message_doc(),
         )
 
+    def _make_regex_plan(self) -> RegexArgumentPlan:
+        return RegexArgumentPlan(self._pattern, float)
+
     def gen_doc(self):
         return (
             "дробное положительное или отрицательное число "
@@ -69,10 +82,10 @@ class FloatCutter(Cutter):
         )
 
 
-class WordCutter(Cutter):
+class WordCutter(SyncCutter):
     _pattern = re.compile(r"\S+")
 
-    async def cut_part(
+    def cut_part_sync(
         self, ctx: NewMessage, arguments_string: str
     ) -> CutterParsingResponse[str]:
         return cut_part_via_regex(
@@ -81,14 +94,17 @@ class WordCutter(Cutter):
             error_description=self.gen_message_doc(),
         )
 
+    def _make_regex_plan(self) -> RegexArgumentPlan:
+        return RegexArgumentPlan(self._pattern)
+
     def gen_doc(self):
         return "любое слово (последовательность непробельных символов)"
 
 
-class StringCutter(Cutter):
+class StringCutter(SyncCutter):
     _pattern = re.compile(r".+", flags=re.DOTALL)
 
-    async def cut_part(
+    def cut_part_sync(
         self, ctx: NewMessage, arguments_string: str
     ) -> CutterParsingResponse[str]:
         return cut_part_via_regex(
@@ -97,6 +113,9 @@ class StringCutter(Cutter):
             error_description=self.gen_message_doc(),
         )
 
+    def _make_regex_plan(self) -> RegexArgumentPlan:
+        return RegexArgumentPlan(self._pattern)
+
     def gen_doc(self):
         return "абсолютно любой текст"
 
@@ -116,23 +135,39 @@ class OptionalCutter(Cutter):
         self._default_factory = default_factory
         self._typevar = typevar
 
+    def _typevars_are_sync(self) -> bool:
+        return self._typevar.is_sync
+
     async def cut_part(
         self, ctx: NewMessage, arguments_string: str
     ) -> CutterParsingResponse:
         try:
             return await self._typevar.cut_part(ctx, arguments_string)
         except BadArgumentError:
-            if self._default_factory is not None:
-                return CutterParsingResponse(
-                    parsed_part=self._default_factory(),
-                    new_arguments_string=arguments_string,
-                )
-            else:
-                # `None` или установленное значение
-                return CutterParsingResponse(
-                    parsed_part=self._default,
-                    new_arguments_string=arguments_string,
-                )
+            return self._make_default_response(arguments_string)
+
+    def cut_part_sync(
+        self, ctx: NewMessage, arguments_string: str
+    ) -> CutterParsingResponse:
+        try:
+            return self._typevar.cut_part_sync(ctx, arguments_string)
+        except BadArgumentError:
+            return self._make_default_response(arguments_string)
+
+    def _make_default_response(
+        self, arguments_string: str
+    ) -> CutterParsingResponse:
+        if self._default_factory is not None:
+            return CutterParsingResponse(
+                parsed_part=self._default_factory(),
+                new_arguments_string=arguments_string,
+            )
+        else:
+            # `None` или установленное значение
+            return CutterParsingResponse(
+                parsed_part=self._default,
+                new_arguments_string=arguments_string,
+            )
 
     def gen_doc(self):
         typevar_docstring = self._typevar.gen_doc()
@@ -151,6 +186,10 @@ class UnionCutter(Cutter):
 
     def __init__(self, *typevars: Cutter):
         self._typevars = typevars
+        self._is_sync = all(typevar.is_sync for typevar in typevars)
+
+    def _typevars_are_sync(self) -> bool:
+        return self._is_sync
 
     async def cut_part(
         self, ctx: NewMessage, arguments_string: str
@@ -165,6 +204,17 @@ class UnionCutter(Cutter):
 
         raise BadArgumentError(self.gen_message_doc())
 
+    def cut_part_sync(
+        self, ctx: NewMessage, arguments_string: str
+    ) -> CutterParsingResponse:
+        for typevar in self._typevars:
+            try:
+                return typevar.cut_part_sync(ctx, arguments_string)
+            except BadArgumentError:
+                continue
+
+        raise BadArgumentError(self.gen_message_doc())
+
     def gen_doc(self):
         header = "одно из следующих значений:<br><ol>{elements}</ol>"
         elements_docs = [
@@ -178,6 +228,10 @@ class UnionCutter(Cutter):
 class GroupCutter(Cutter):
     def __init__(self, *typevars: Cutter):
         self._typevars = typevars
+        self._is_sync = all(typevar.is_sync for typevar in typevars)
+
+    def _typevars_are_sync(self) -> bool:
+        return self._is_sync
 
     async def cut_part(
         self, ctx: NewMessage, arguments_string: str
@@ -198,6 +252,23 @@ class GroupCutter(Cutter):
             new_arguments_string=arguments_string,
         )
 
+    def cut_part_sync(
+        self, ctx: NewMessage, arguments_string: str
+    ) -> CutterParsingResponse:
+        parsed_parts = []
+        for typevar in self._typevars:
+            try:
+                parsed_value = typevar.cut_part_sync(ctx, arguments_string)
+            except BadArgumentError as err:
+                raise BadArgumentError(self.gen_message_doc()) from err
+            arguments_string = parsed_value.new_arguments_string
+            parsed_parts.append(parsed_value.parsed_part)
+
+        return CutterParsingResponse(
+            parsed_part=tuple(parsed_parts),
+            new_arguments_string=arguments_string,
+        )
+
     def gen_doc(self):
         header = "последовательность следующих аргументов без пробелов:<br><ol>{elements}</ol>"
         elements_docs = [
@@ -213,6 +284,9 @@ class _SequenceCutter(Cutter):
     def __init__(self, typevar: Cutter):
         self._typevar = typevar
 
+    def _typevars_are_sync(self) -> bool:
+        return self._typevar.is_sync
+
     async def cut_part(
         self, ctx: NewMessage, arguments_string: str
     ) -> CutterParsingResponse:
@@ -237,6 +311,28 @@ class _SequenceCutter(Cutter):
                 parsed_values.append(parsing_response.parsed_part)
                 continue
 
+    def cut_part_sync(
+        self, ctx: NewMessage, arguments_string: str
+    ) -> CutterParsingResponse:
+        typevar = self._typevar
+        parsed_values = []
+        while True:
+            try:
+                parsing_response = typevar.cut_part_sync(
+                    ctx, arguments_string
+                )
+            except BadArgumentError:
+                return CutterParsingResponse(
+                    parsed_part=self._factory(parsed_values),
+                    new_arguments_string=arguments_string,
+                )
+            arguments_string = (
+                parsing_response.new_arguments_string.lstrip()
+                .lstrip(",")
+                .lstrip()
+            )
+            parsed_values.append(parsing_response.parsed_part)
+
     def gen_doc(self):
         typevar_docstring = self._typevar.gen_doc()
         return (
@@ -261,12 +357,12 @@ class UniqueImmutableSequenceCutter(_SequenceCutter):
     _factory = frozenset
 
 
-class LiteralCutter(Cutter):
+class LiteralCutter(SyncCutter):
 
     def __init__(self, *container_values: str):
         self._container_values = tuple(map(re.compile, container_values))
 
-    async def cut_part(
+    def cut_part_sync(
         self, ctx: NewMessage, arguments_string: str
     ) -> CutterParsingResponse:
         for typevar in self._container_values:
@@ -311,6 +407,218 @@ class PageType(enum.Enum):
     GROUP = enum.auto()
 
 
+class _DeferredEntity:
+    """
+    Заглушка на месте страницы, которую `EntitiesResolver`
+    получит после разбора всех аргументов команды
+    """
+
+    __slots__ = (
+        "page_class",
+        "page_id",
+        "fields",
+        "screen_name",
+        "cutter",
+        "value",
+    )
+
+    def __init__(
+        self,
+        *,
+        page_class: typing.Optional[typing.Type[Page]] = None,
+        page_id: typing.Optional[int] = None,
+        fields: typing.Optional[typing.Tuple[str, ...]] = None,
+        screen_name: typing.Optional[str] = None,
+        cutter: typing.Optional["MentionCutter"] = None,
+    ) -> None:
+        self.page_class = page_class
+        self.page_id = page_id
+        self.fields = fields
+        self.screen_name = screen_name
+        self.cutter = cutter
+        self.value = None
+
+
+class EntitiesResolver:
+    """
+    Откладывает получение страниц, упомянутых в аргументах команды,
+    до конца разбора, чтобы получить их все разом: короткие имена --
+    пачками через `execute`, затем пользователей одним `users.get`
+    и группы одним `groups.getById` на каждый набор полей.
+
+    Пока резолвер лежит в `ctx.argument_processing_payload`,
+    `MentionCutter` и `EntityCutter` возвращают заглушки,
+    а `substitute` заменяет их на полученные значения
+    """
+
+    payload_key = "_entities_resolver"
+
+    def __init__(self) -> None:
+        self._deferred_entities: typing.List[_DeferredEntity] = []
+
+    @property
+    def has_deferred(self) -> bool:
+        return bool(self._deferred_entities)
+
+    def defer_page(
+        self,
+        page_class: typing.Type[Page],
+        page_id: IDType,
+        fields: typing.Optional[typing.Tuple[str, ...]],
+    ) -> _DeferredEntity:
+        deferred_entity = _DeferredEntity(
+            page_class=page_class, page_id=int(page_id), fields=fields
+        )
+        self._deferred_entities.append(deferred_entity)
+        return deferred_entity
+
+    def defer_screen_name(
+        self, cutter: "MentionCutter", screen_name: str
+    ) -> _DeferredEntity:
+        deferred_entity = _DeferredEntity(
+            screen_name=screen_name, cutter=cutter
+        )
+        self._deferred_entities.append(deferred_entity)
+        return deferred_entity
+
+    async def resolve(self, api: "API") -> bool:
+        """
+        Получает все отложенные страницы
+
+        Returns:
+            `False`, если какую-то из страниц получить не удалось
+            (несуществующее короткое имя, неверное ID, страница не того
+            типа). Тогда аргументы нужно разобрать заново без резолвера,
+            чтобы ошибка была обработана так же, как и раньше
+        """
+        try:
+            await self._resolve_screen_names(api)
+            await self._fetch_pages(api)
+        except (APIError, BadArgumentError):
+            return False
+        return True
+
+    async def _resolve_screen_names(self, api: "API") -> None:
+        deferred_entities = [
+            deferred_entity
+            for deferred_entity in self._deferred_entities
+            if deferred_entity.screen_name is not None
+        ]
+        if not deferred_entities:
+            return
+        screen_names = list(
+            dict.fromkeys(
+                deferred_entity.screen_name
+                for deferred_entity in deferred_entities
+            )
+        )
+        if len(screen_names) == 1:
+            resolved_screen_names = [
+                await api.use_cache().method(
+                    "utils.resolve_screen_name", screen_name=screen_names[0]
+                )
+            ]
+        else:
+            # Внутри одного `execute` может быть не больше 25 вызовов
+            chunks = await asyncio.gather(
+                *(
+                    api.execute(
+                        *(
+                            CallMethod(
+                                "utils.resolveScreenName",
+                                screen_name=screen_name,
+                            )
+                            for screen_name in screen_names[
+                                offset : offset + 25
+                            ]
+                        )
+                    )
+                    for offset in range(0, len(screen_names), 25)
+                )
+            )
+            resolved_screen_names = [
+                resolved for chunk in chunks for resolved in chunk
+            ]
+
+        resolved_by_name = dict(zip(screen_names, resolved_screen_names))
+        for deferred_entity in deferred_entities:
+            resolved = resolved_by_name[deferred_entity.screen_name]
+            if not resolved or resolved["type"] not in {"user", "group"}:
+                raise BadArgumentError("Invalid screen name")
+            page_type = (
+                PageType.USER
+                if resolved["type"] == "user"
+                else PageType.GROUP
+            )
+            cutter = deferred_entity.cutter
+            deferred_entity.page_id = resolved["object_id"]
+            deferred_entity.page_class = cutter._choose_page_class(  # noqa
+                page_type
+            )
+            deferred_entity.fields = cutter._fields  # noqa
+            # Аргументу нужно только ID страницы
+            if deferred_entity.page_class is None:
+                deferred_entity.value = deferred_entity.page_id
+
+    async def _fetch_pages(self, api: "API") -> None:
+        pages_requests: typing.Dict[
+            typing.Tuple[typing.Type[Page], typing.Optional[tuple]],
+            typing.Set[int],
+        ] = {}
+        for deferred_entity in self._deferred_entities:
+            if deferred_entity.page_class is not None:
+                pages_requests.setdefault(
+                    (deferred_entity.page_class, deferred_entity.fields),
+                    set(),
+                ).add(deferred_entity.page_id)
+
+        requests_keys = list(pages_requests)
+        fetched_pages = await asyncio.gather(
+            *(
+                page_class.fetch_many(api, *sorted(page_ids), fields=fields)
+                for (page_class, fields), page_ids in pages_requests.items()
+            )
+        )
+        pages_by_id = {
+            (*key, page.id): page
+            for key, pages in zip(requests_keys, fetched_pages)
+            for page in pages
+        }
+        for deferred_entity in self._deferred_entities:
+            if deferred_entity.page_class is not None:
+                try:
+                    deferred_entity.value = pages_by_id[
+                        deferred_entity.page_class,
+                        deferred_entity.fields,
+                        deferred_entity.page_id,
+                    ]
+                except KeyError as err:
+                    raise BadArgumentError("Invalid id") from err
+
+    def substitute(self, value: typing.Any) -> typing.Any:
+        """
+        Заменяет заглушки в разобранном значении аргумента
+        (в том числе внутри коллекций и упоминаний) на полученные страницы
+        """
+        if isinstance(value, _DeferredEntity):
+            return value.value
+        elif isinstance(value, Mention):
+            value.entity = self.substitute(value.entity)
+            return value
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            return type(value)(map(self.substitute, value))
+        return value
+
+
+def _get_entities_resolver(
+    ctx: NewMessage,
+) -> typing.Optional[EntitiesResolver]:
+    payload = getattr(ctx, "argument_processing_payload", None)
+    if not isinstance(payload, dict):
+        return None
+    return payload.get(EntitiesResolver.payload_key)
+
+
 @dataclasses.dataclass
 class Mention(typing.Generic[T]):
     alias: str
@@ -348,9 +656,13 @@ class MentionCutter(Cutter):
     async def _make_group(self, ctx: NewMessage, page_id: int):
         return await Group.fetch_one(ctx.api, page_id, fields=self._fields)
 
-    async def _cast_type(
-        self, ctx: NewMessage, page_id: int, page_type: PageType
-    ) -> T:
+    def _choose_page_class(
+        self, page_type: PageType
+    ) -> typing.Optional[typing.Type[Page]]:
+        """
+        Определяет, какой обертки требует аргумент для страницы типа
+        `page_type`. `None` -- аргументом будет само ID страницы
+        """
         if (
             self._page_type is UserID
             and page_type == PageType.USER
@@ -358,23 +670,37 @@ class MentionCutter(Cutter):
             and page_type == PageType.GROUP
             or self._page_type is PageID
         ):
-            return page_id
+            return None
 
         elif self._page_type is User and page_type == PageType.USER:
-            return await self._make_user(ctx, page_id)
+            return User
 
         elif self._page_type is Group and page_type == PageType.GROUP:
-            return await self._make_group(ctx, page_id)
+            return Group
 
         elif self._page_type is Page:
             if page_type == PageType.USER:
-                return await self._make_user(ctx, page_id)
+                return User
             else:
-                return await self._make_group(ctx, page_id)
+                return Group
 
         else:
             raise BadArgumentError(self.gen_doc())
 
+    async def _cast_type(
+        self, ctx: NewMessage, page_id: int, page_type: PageType
+    ) -> T:
+        page_class = self._choose_page_class(page_type)
+        if page_class is None:
+            return page_id
+        resolver = _get_entities_resolver(ctx)
+        if resolver is not None:
+            return resolver.defer_page(page_class, page_id, self._fields)
+        elif page_class is User:
+            return await self._make_user(ctx, page_id)
+        else:
+            return await self._make_group(ctx, page_id)
+
     async def cut_part(
         self, ctx: NewMessage, arguments_string: str
     ) -> CutterParsingResponse[Mention[T]]:
@@ -525,6 +851,13 @@ class EntityCutter(MentionCutter):
             self.screen_name_regex, arguments_string, group="screen_name"
         )
 
+        resolver = _get_entities_resolver(ctx)
+        if resolver is not None:
+            parsing_response.parsed_part = resolver.defer_screen_name(
+                self, parsing_response.parsed_part
+            )
+            return parsing_response
+
         resolved_screen_name = await ctx.api.use_cache().method(
             "utils.resolve_screen_name",
             screen_name=parsing_response.parsed_part,
@@ -606,11 +939,11 @@ class EntityCutter(MentionCutter):
         )
 
 
-class BoolCutter(Cutter):
+class BoolCutter(SyncCutter):
     true_values = ["1", "да", "+", "on", "вкл"]
     false_values = ["0", "no", "-", "off", "выкл"]
 
-    async def cut_part(
+    def cut_part_sync(
         self, ctx: NewMessage, arguments_string: str
     ) -> CutterParsingResponse[bool]:
         for true_value in self.true_values:
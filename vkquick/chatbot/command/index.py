@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import itertools
+import re
+import typing
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from vkquick.chatbot.command.command import Command
+    from vkquick.chatbot.package import Package
+
+    IndexedCommand = typing.Tuple[int, Command]
+
+
+class _TrieNode:
+    __slots__ = ("children", "commands")
+
+    def __init__(self) -> None:
+        self.children: typing.Dict[str, _TrieNode] = {}
+        self.commands: typing.List[IndexedCommand] = []
+
+
+class CommandsIndex:
+    """
+    Индекс команд всех пакетов приложения: префиксы и имена
+    команд (их сочетания) складываются в префиксное дерево, поэтому
+    команды-кандидаты находятся за один проход по тексту сообщения,
+    а не запуском регулярного выражения каждой команды.
+
+    Индекс только отбирает кандидатов -- окончательную проверку
+    выполняет регулярное выражение самой команды. Команды без имен
+    и префиксов подходят под любой текст и всегда попадают в кандидаты
+    """
+
+    def __init__(self, packages: typing.Sequence[Package]) -> None:
+        self._sensitive_root = _TrieNode()
+        # Ключи регистронезависимых команд приведены к нижнему регистру
+        # посимвольно, так же, как и текст при поиске
+        self._insensitive_root = _TrieNode()
+        self._always_candidates: typing.List[IndexedCommand] = []
+        for package in packages:
+            for command in package.commands:
+                self._add_command(id(package), command)
+
+    def _add_command(self, package_id: int, command: Command) -> None:
+        routing_keys = {
+            prefix + name
+            for prefix, name in itertools.product(
+                command.prefixes or [""], command.names or [""]
+            )
+        }
+        if "" in routing_keys:
+            self._always_candidates.append((package_id, command))
+            return
+
+        ignore_case = command.routing_re_flags & re.IGNORECASE
+        root = self._insensitive_root if ignore_case else self._sensitive_root
+        for routing_key in routing_keys:
+            node = root
+            for char in routing_key:
+                if ignore_case:
+                    char = char.lower()
+                node = node.children.setdefault(char, _TrieNode())
+            node.commands.append((package_id, command))
+
+    def find_candidates(
+        self, text: str
+    ) -> typing.Dict[int, typing.List[Command]]:
+        """
+        Находит команды, префикс и имя которых стоят в начале текста
+
+        Arguments:
+            text: Текст сообщения
+
+        Returns:
+            Команды-кандидаты, сгруппированные по `id()` их пакета
+        """
+        candidates: typing.Dict[int, typing.List[Command]] = {}
+        found_commands = list(self._always_candidates)
+        for root, ignore_case in (
+            (self._sensitive_root, False),
+            (self._insensitive_root, True),
+        ):
+            node = root
+            for char in text:
+                if ignore_case:
+                    char = char.lower()
+                node = node.children.get(char)
+                if node is None:
+                    break
+                found_commands.extend(node.commands)
+
+        for package_id, command in found_commands:
+            package_candidates = candidates.setdefault(package_id, [])
+            # Одна команда может совпасть по нескольким ключам
+            if all(
+                candidate is not command for candidate in package_candidates
+            ):
+                package_candidates.append(command)
+        return candidates
@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import dataclasses
+import enum
+import itertools
+import typing
+
+from loguru import logger
+
+from vkquick.base.event import EventType
+from vkquick.event import GroupEvent
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from vkquick.chatbot.storages import NewEvent
+
+Job = typing.Callable[[], typing.Awaitable[typing.Any]]
+LaneKey = typing.Callable[["NewEvent"], typing.Optional[typing.Hashable]]
+
+
+def peer_id_lane_key(new_event_storage: NewEvent) -> typing.Optional[int]:
+    """
+    Ключ очереди для `App.lane_key`: сообщения одного диалога
+    обрабатываются строго по порядку, остальные события -- без очереди
+    """
+    event = new_event_storage.event
+    if isinstance(event, GroupEvent):
+        if event.type not in {"message_new", "message_reply", "message_edit"}:
+            return None
+        return event.object.get("message", event.object).get("peer_id")
+    elif event.type == 4 and len(event.content) > 3:
+        return event.content[3]
+    return None
+
+
+@enum.unique
+class OverflowPolicy(enum.Enum):
+    """
+    Что делать с новым событием, если все слоты обработки заняты
+    """
+
+    #: Ждать освобождения слота. Получение новых событий при этом стоит
+    BLOCK = enum.auto()
+    #: Положить событие в очередь ожидания, вытесняя самое старое
+    DROP_OLDEST = enum.auto()
+    #: Отбросить событие, если его тип в `shed_event_types`, иначе ждать
+    SHED = enum.auto()
+
+
+@dataclasses.dataclass
+class DispatcherStatistics:
+    """
+    Счетчики обработчиков событий
+
+    Arguments:
+        started: Сколько обработок было запущено
+        finished: Сколько обработок завершилось
+        dropped: Сколько событий было отброшено без обработки
+        dropped_by_type: Сколько событий каждого типа было отброшено
+        in_flight: Сколько обработок выполняется прямо сейчас
+        pending: Сколько событий ждут свободного слота в очереди
+        lanes: Сколько очередей с упорядоченной обработкой активно
+        queued_in_lanes: Сколько событий ждут своей очереди в них
+    """
+
+    started: int = 0
+    finished: int = 0
+    dropped: int = 0
+    dropped_by_type: typing.Dict[EventType, int] = dataclasses.field(
+        default_factory=dict
+    )
+    in_flight: int = 0
+    pending: int = 0
+    lanes: int = 0
+    queued_in_lanes: int = 0
+
+
+class _QueuedJob:
+    """
+    Событие, принятое диспетчером, но еще не обработанное
+    """
+
+    __slots__ = ("event_type", "job", "lane_key", "arrival")
+
+    def __init__(
+        self,
+        event_type: EventType,
+        job: Job,
+        lane_key: typing.Optional[typing.Hashable],
+        arrival: int,
+    ) -> None:
+        self.event_type = event_type
+        self.job = job
+        self.lane_key = lane_key
+        # Порядковый номер поступления, чтобы найти самое старое событие
+        self.arrival = arrival
+
+
+class EventDispatcher:
+    """
+    Запускает обработку событий в отдельных тасках, ограничивая
+    число одновременно выполняющихся обработок. Если все слоты заняты,
+    поступает в соответствии с `overflow_policy`.
+
+    События с одинаковым ключом очереди (`lane_key`) обрабатываются
+    последовательно в порядке поступления, с разными -- параллельно.
+    Пока очередь занята, ее новые события не занимают слотов,
+    но учитываются в `max_pending` вместе с очередью ожидания.
+    Опустевшая очередь сразу удаляется
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = 1000,
+        *,
+        overflow_policy: OverflowPolicy = OverflowPolicy.BLOCK,
+        max_pending: int = 1000,
+        shed_event_types: typing.Collection[EventType] = (),
+    ) -> None:
+        """
+        Arguments:
+            max_in_flight: Максимум одновременно выполняющихся обработок
+            overflow_policy: Поведение при заполнении всех слотов
+            max_pending: Сколько событий могут ждать обработки (в очереди
+                ожидания и в очередях упорядоченной обработки). При
+                переполнении `DROP_OLDEST` отбрасывает самое старое
+                из них, а остальные политики ждут
+            shed_event_types: Типы событий, отбрасываемые при `SHED`
+        """
+        if max_in_flight < 1:
+            raise ValueError("`max_in_flight` should be positive")
+        if max_pending < 1:
+            raise ValueError("`max_pending` should be positive")
+        self._max_in_flight = max_in_flight
+        self._overflow_policy = overflow_policy
+        self._max_pending = max_pending
+        self._pending_jobs: typing.Deque[_QueuedJob] = collections.deque()
+        self._shed_event_types = frozenset(shed_event_types)
+        # Семафор создается лениво, чтобы диспетчер можно
+        # было создать вне запущенного цикла событий
+        self._slots: typing.Optional[asyncio.Semaphore] = None
+        # Очередь существует, пока ее первое событие ждет слота
+        # или обрабатывается, и хранит следующие за ним события
+        self._lanes: typing.Dict[
+            typing.Hashable, typing.Deque[_QueuedJob]
+        ] = {}
+        self._queued_in_lanes = 0
+        self._arrivals = itertools.count()
+        # Ожидающие места в `max_pending` вызовы `dispatch`
+        self._space_waiters: typing.Deque[
+            asyncio.Future
+        ] = collections.deque()
+        self._running_tasks: typing.Set[asyncio.Task] = set()
+        self._statistics = DispatcherStatistics()
+
+    @property
+    def statistics(self) -> DispatcherStatistics:
+        self._statistics.pending = len(self._pending_jobs)
+        self._statistics.lanes = len(self._lanes)
+        self._statistics.queued_in_lanes = self._queued_in_lanes
+        return self._statistics
+
+    @property
+    def _queued_count(self) -> int:
+        return len(self._pending_jobs) + self._queued_in_lanes
+
+    async def dispatch(
+        self,
+        event_type: EventType,
+        job: Job,
+        *,
+        lane_key: typing.Optional[typing.Hashable] = None,
+    ) -> None:
+        """
+        Запускает обработку события, если есть свободный слот
+
+        Arguments:
+            event_type: Тип события (используется политикой `SHED`)
+            job: Функция, возвращающая корутину обработки. Функция
+                не вызывается, если событие будет отброшено
+            lane_key: Ключ очереди упорядоченной обработки. `None` --
+                обработка без очереди
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_in_flight)
+
+        if (
+            self._overflow_policy == OverflowPolicy.SHED
+            and self._slots.locked()
+            and event_type in self._shed_event_types
+        ):
+            self._drop(event_type)
+            return
+
+        queued_job = _QueuedJob(
+            event_type, job, lane_key, next(self._arrivals)
+        )
+        if lane_key is not None:
+            # Событие встает в занятую очередь -- для этого нужно
+            # место в `max_pending`
+            while (
+                lane_key in self._lanes
+                and self._queued_count >= self._max_pending
+            ):
+                if self._overflow_policy == OverflowPolicy.DROP_OLDEST:
+                    self._drop_oldest_pending()
+                elif (
+                    self._overflow_policy == OverflowPolicy.SHED
+                    and event_type in self._shed_event_types
+                ):
+                    self._drop(event_type)
+                    return
+                else:
+                    await self._wait_for_space()
+
+            lane = self._lanes.get(lane_key)
+            # Очередь занята -- событие ждет окончания предыдущих
+            if lane is not None:
+                lane.append(queued_job)
+                self._queued_in_lanes += 1
+                return
+            self._lanes[lane_key] = collections.deque()
+
+        if (
+            self._overflow_policy == OverflowPolicy.DROP_OLDEST
+            and self._slots.locked()
+        ):
+            if self._queued_count >= self._max_pending:
+                self._drop_oldest_pending()
+            self._pending_jobs.append(queued_job)
+            return
+
+        await self._slots.acquire()
+        self._start(queued_job)
+
+    async def _wait_for_space(self) -> None:
+        waiter = asyncio.get_running_loop().create_future()
+        self._space_waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # Освободившееся место передается следующему
+            if waiter.done() and not waiter.cancelled():
+                self._notify_space_waiter()
+            raise
+
+    def _notify_space_waiter(self) -> None:
+        while self._space_waiters:
+            waiter = self._space_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def _drop_oldest_pending(self) -> None:
+        """
+        Отбрасывает одно самое старое событие из очереди
+        ожидания и очередей упорядоченной обработки
+        """
+        oldest_jobs: typing.Optional[typing.Deque[_QueuedJob]] = None
+        if self._pending_jobs:
+            oldest_jobs = self._pending_jobs
+        for lane in self._lanes.values():
+            if lane and (
+                oldest_jobs is None
+                or lane[0].arrival < oldest_jobs[0].arrival
+            ):
+                oldest_jobs = lane
+        if oldest_jobs is None:
+            return
+
+        dropped_job = oldest_jobs.popleft()
+        if oldest_jobs is not self._pending_jobs:
+            self._queued_in_lanes -= 1
+        elif dropped_job.lane_key is not None:
+            # Если отброшено первое событие очереди, ее
+            # следующее событие становится в ожидание вместо него
+            lane = self._lanes[dropped_job.lane_key]
+            if lane:
+                self._queued_in_lanes -= 1
+                self._pending_jobs.append(lane.popleft())
+            else:
+                del self._lanes[dropped_job.lane_key]
+        self._drop(dropped_job.event_type)
+        self._notify_space_waiter()
+
+    def _drop(self, event_type: EventType) -> None:
+        self._statistics.dropped += 1
+        self._statistics.dropped_by_type[event_type] = (
+            self._statistics.dropped_by_type.get(event_type, 0) + 1
+        )
+        logger.warning(
+            "All handling slots are busy, an event was dropped "
+            "(dropped event type is {event_type!r})",
+            event_type=event_type,
+        )
+
+    def _start(self, queued_job: _QueuedJob) -> None:
+        self._statistics.in_flight += 1
+        running_task = asyncio.create_task(self._run_slot(queued_job))
+        self._running_tasks.add(running_task)
+        running_task.add_done_callback(self._running_tasks.discard)
+
+    async def _run_slot(self, queued_job: _QueuedJob) -> None:
+        try:
+            if queued_job.lane_key is None:
+                await self._run_job(queued_job)
+            else:
+                await self._run_lane(queued_job)
+        finally:
+            self._statistics.in_flight -= 1
+            # Слот сразу передается событию из очереди ожидания
+            if self._pending_jobs:
+                self._start(self._pending_jobs.popleft())
+                self._notify_space_waiter()
+            else:
+                self._slots.release()
+
+    async def _run_lane(self, queued_job: _QueuedJob) -> None:
+        lane_key = queued_job.lane_key
+        lane = self._lanes[lane_key]
+        try:
+            while True:
+                await self._run_job(queued_job)
+                if not lane:
+                    break
+                queued_job = lane.popleft()
+                self._queued_in_lanes -= 1
+                self._notify_space_waiter()
+        finally:
+            del self._lanes[lane_key]
+
+    async def _run_job(self, queued_job: _QueuedJob) -> None:
+        self._statistics.started += 1
+        try:
+            await queued_job.job()
+        except Exception:  # noqa
+            logger.exception("Event handling failed")
+        finally:
+            self._statistics.finished += 1
@@ -41,26 +41,31 @@ class MessageHandler(
         await self.handler(ctx)
 
 
+def _invited_member_id(ctx: NewMessage) -> int:
+    return int(
+        ctx.msg.action.get("member_id") or ctx.msg.action.get("source_mid")
+    )
+
+
 class UserAddedHandler(
     HandlerMixin[
         # Context, New member, Inviter,
         typing.Callable[[NewMessage, PageID, UserID], typing.Awaitable]
     ]
 ):
-    async def run_handling(self, ctx: NewMessage):
-        if (
+    def is_matched(self, ctx: NewMessage) -> bool:
+        return (
             ctx.msg.action is not None
             and ctx.msg.action["type"] == "chat_invite_user"
-            and ctx.msg.from_id
-            != int(
-                invited_user := (
-                    ctx.msg.action.get("member_id")
-                    or ctx.msg.action.get("source_mid")
-                )
-            )
-        ):
+            and ctx.msg.from_id != _invited_member_id(ctx)
+        )
+
+    async def run_handling(self, ctx: NewMessage):
+        if self.is_matched(ctx):
             await self.handler(
-                ctx, PageID(invited_user), UserID(ctx.msg.from_id)
+                ctx,
+                PageID(_invited_member_id(ctx)),
+                UserID(ctx.msg.from_id),
             )
 
 
@@ -69,11 +74,14 @@ class UserJoinedByLinkHandler(
         typing.Callable[[NewMessage, UserID], typing.Awaitable]
     ]
 ):
-    async def run_handling(self, ctx: NewMessage):
-        if (
+    def is_matched(self, ctx: NewMessage) -> bool:
+        return (
             ctx.msg.action is not None
             and ctx.msg.action["type"] == "chat_invite_user_by_link"
-        ):
+        )
+
+    async def run_handling(self, ctx: NewMessage):
+        if self.is_matched(ctx):
             await self.handler(ctx, UserID(ctx.msg.from_id))
 
 
@@ -82,20 +90,16 @@ class UserReturnedHandler(
         typing.Callable[[NewMessage, UserID], typing.Awaitable]
     ]
 ):
-    async def run_handling(self, ctx: NewMessage):
-        if (
-                ctx.msg.action is not None
-                and ctx.msg.action["type"] == "chat_invite_user"
-                and ctx.msg.from_id
-                == int(
-                    ctx.msg.action.get("member_id")
-                    or ctx.msg.action.get("source_mid")
-                )
-        ):
+    def is_matched(self, ctx: NewMessage) -> bool:
+        return (
+            ctx.msg.action is not None
+            and ctx.msg.action["type"] == "chat_invite_user"
+            and ctx.msg.from_id == _invited_member_id(ctx)
+        )
 
-            await self.handler(
-                ctx, UserID(ctx.msg.from_id)
-            )
+    async def run_handling(self, ctx: NewMessage):
+        if self.is_matched(ctx):
+            await self.handler(ctx, UserID(ctx.msg.from_id))
 
 
 class SignalHandler(HandlerMixin[typing.Callable[["Bot"], typing.Awaitable]]):
@@ -279,41 +283,85 @@ class Package:
         return wrapper
 
     async def handle_event(self, new_event_storage: NewEvent) -> None:
-        handlers = self.event_handlers[new_event_storage.event.type]
+        # `get`, а не индексация: иначе defaultdict заводит
+        # пустой список под каждый новый тип события
+        handlers = self.event_handlers.get(new_event_storage.event.type, ())
         handle_coroutines = [
             handler.handler(new_event_storage) for handler in handlers
         ]
         await asyncio.gather(*handle_coroutines)
 
-    async def handle_message(self, ctx: NewMessage):
+    async def handle_message(
+        self,
+        ctx: NewMessage,
+        commands: typing.Optional[typing.Sequence[Command]] = None,
+    ):
+        """
+        Arguments:
+            ctx: Контекст нового сообщения
+            commands: Команды-кандидаты, отобранные индексом приложения.
+                По умолчанию проверяются все команды пакета
+        """
+        if commands is None:
+            commands = self.commands
+        # Сначала дешевые синхронные проверки: корутины создаются
+        # только для обработчиков, которые действительно сработают
+        routed_commands = []
+        for command in commands:
+            routing_match = command.match_routing(ctx.msg.text)
+            if routing_match:
+                routed_commands.append((command, routing_match))
+        matched_inviting_handlers = [
+            inviting_handler
+            for inviting_handler in self.inviting_handlers
+            if inviting_handler.is_matched(ctx)
+        ]
+        is_payload_routed = self.is_payload_routed(ctx)
+        if not (
+            routed_commands
+            or self.message_handlers
+            or matched_inviting_handlers
+            or is_payload_routed
+        ):
+            return
+
         if self.filter is not None:
             try:
                 await self.filter.run_making_decision(ctx)
             except StopCurrentHandling:
                 return
-        command_coroutines = [
-            command.handle_message(ctx) for command in self.commands
+
+        handling_coroutines = [
+            command.handle_routed_message(ctx, routing_match)
+            for command, routing_match in routed_commands
         ]
-        message_handler_coroutines = [
+        handling_coroutines.extend(
             message_handler.run_handling(ctx)
             for message_handler in self.message_handlers
-        ]
-        inviting_handler_coroutines = [
+        )
+        handling_coroutines.extend(
             inviting_handler.run_handling(ctx)
-            for inviting_handler in self.inviting_handlers
-        ]
-        await asyncio.gather(
-            self.routing_payload(ctx),
-            *command_coroutines,
-            *message_handler_coroutines,
-            *inviting_handler_coroutines
+            for inviting_handler in matched_inviting_handlers
         )
-
-    async def routing_payload(self, ctx: NewMessage):
-        if (
+        if is_payload_routed:
+            handling_coroutines.append(self.routing_payload(ctx))
+
+        if len(handling_coroutines) == 1:
+            await handling_coroutines[0]
+        else:
+            await asyncio.gather(*handling_coroutines)
+
+    def is_payload_routed(self, ctx: NewMessage) -> bool:
+        """
+        Есть ли в пакете обработчик кнопки из payload сообщения
+        """
+        return (
             isinstance(ctx.msg.payload, dict)
             and ctx.msg.payload.get("command") in self.button_onclick_handlers
-        ):
+        )
+
+    async def routing_payload(self, ctx: NewMessage):
+        if self.is_payload_routed(ctx):
             handler_name = ctx.msg.payload.get("command")
             extra_arguments = {}
             if "args" in ctx.msg.payload:
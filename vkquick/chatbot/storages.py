@@ -3,10 +3,12 @@ from __future__ import annotations
 import asyncio
 import dataclasses
 import functools
+import os
+import pathlib
 import typing
 
 from vkquick.chatbot.exceptions import StopStateHandling
-from vkquick.chatbot.utils import peer
+from vkquick.chatbot.utils import ByteBudget, peer, save_files
 from vkquick.chatbot.wrappers.message import (
     CallbackButtonPressedMessage,
     Message,
@@ -217,29 +219,87 @@ class NewMessage(
     async def fetch_docs(self) -> typing.List[Document]:
         return await self.msg.fetch_docs(self.api)
 
-    async def download_photos(self) -> typing.List[bytes]:
+    async def download_photos(
+        self, *, max_parallel_downloads: int = 4
+    ) -> typing.List[bytes]:
+        """
+        Скачивает все фотографии сообщения в память
+
+        Arguments:
+            max_parallel_downloads: Сколько фотографий
+                скачивается одновременно
+        """
+        photos = await self.fetch_photos()
+        downloads_semaphore = asyncio.Semaphore(max_parallel_downloads)
+
+        async def download(photo: Photo) -> bytes:
+            async with downloads_semaphore:
+                return await photo.download_max_size(
+                    session=self.api.requests_session
+                )
+
+        downloaded_photos = await asyncio.gather(*map(download, photos))
+        return downloaded_photos
+
+    async def save_photos(
+        self,
+        directory: typing.Union[str, os.PathLike],
+        *,
+        max_parallel_downloads: int = 4,
+        budget: typing.Optional[ByteBudget] = None,
+    ) -> typing.List[pathlib.Path]:
+        """
+        Сохраняет все фотографии сообщения в директорию, не держа
+        их в памяти. Файлы называются `<owner_id>_<id>.jpg`
+
+        Arguments:
+            directory: Директория для фотографий
+            max_parallel_downloads: Сколько фотографий
+                скачивается одновременно
+            budget: Ограничение суммарного размера частей
+                фотографий, одновременно находящихся в памяти.
+                Один объект можно передавать во все обработчики
+
+        Returns:
+            Пути до сохраненных фотографий
+        """
         photos = await self.fetch_photos()
-        download_coroutines = [
-            photo.download_max_size(session=self.api.requests_session)
+        paths = [
+            pathlib.Path(directory)
+            / f"{photo.fields['owner_id']}_{photo.fields['id']}.jpg"
             for photo in photos
         ]
-        downloaded_photos = await asyncio.gather(*download_coroutines)
-        return downloaded_photos
+        await save_files(
+            [
+                (photo.fields["sizes"][-1]["url"], path)
+                for photo, path in zip(photos, paths)
+            ],
+            session=self.api.requests_session,
+            max_parallel_downloads=max_parallel_downloads,
+            budget=budget,
+        )
+        return paths
 
     async def fetch_sender(
-        self, typevar: typing.Type[SenderTypevar],
+        self,
+        typevar: typing.Type[SenderTypevar],
         /,
         *,
         fields: typing.Optional[typing.List[str]] = None,
         name_case: typing.Optional[str] = None,
     ) -> SenderTypevar:
         if self.msg.from_id > 0 and typevar in {Page, User}:
-            return await User.fetch_one(self.api, self.msg.from_id, fields=fields, name_case=name_case)
+            return await User.fetch_one(
+                self.api, self.msg.from_id, fields=fields, name_case=name_case
+            )
         elif self.msg.from_id < 0 and typevar in {Page, Group}:
-            return await Group.fetch_one(self.api, self.msg.from_id, fields=fields, name_case=name_case)
+            return await Group.fetch_one(
+                self.api, abs(self.msg.from_id), fields=fields
+            )
         else:
             raise ValueError(
-                f"Can't make wrapper with typevar `{typevar}` and from_id `{self.msg.from_id}`"
+                f"Can't make wrapper with typevar `{typevar}` "
+                f"and from_id `{self.msg.from_id}`"
             )
 
     def __repr__(self):
@@ -1,12 +1,20 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import contextlib
 import datetime
+import os
 import random
 import re
-import ssl
 import typing
+import weakref
 
+import aiofiles
 import aiohttp
 
 from vkquick.json_parsers import json_parser_policy
+from vkquick.transport import TransportConfig
 
 
 def random_id(side: int = 2 ** 31 - 1) -> int:
@@ -28,6 +36,57 @@ def peer(chat_id: int = 0) -> int:
     return 2_000_000_000 + chat_id
 
 
+# Общие сессии вспомогательных функций. Сессия привязана
+# к циклу событий, в котором создана, поэтому у каждого цикла своя
+_shared_sessions: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, aiohttp.ClientSession
+] = weakref.WeakKeyDictionary()
+_shared_transport = TransportConfig(keepalive_timeout=30.0, ttl_dns_cache=300)
+
+
+def set_shared_transport(transport: TransportConfig) -> None:
+    """
+    Устанавливает настройки пула соединений общей сессии
+    вспомогательных функций (см. `get_shared_session`). Уже
+    созданные сессии не меняются
+    """
+    global _shared_transport
+    _shared_transport = transport
+
+
+def get_shared_session() -> aiohttp.ClientSession:
+    """
+    Возвращает общую для всего процесса (в пределах текущего цикла
+    событий) сессию с пулом соединений. Ее используют вспомогательные
+    функции (`download_file`, `save_file`, `get_user_registration_date`
+    и т.д.), если им не передали свою сессию, поэтому повторные
+    скачивания переиспользуют уже открытые TLS соединения.
+
+    Сессию не нужно закрывать вручную: `App` закрывает ее при завершении
+    через `close_shared_sessions`
+    """
+    loop = asyncio.get_running_loop()
+    session = _shared_sessions.get(loop)
+    if session is None or session.closed:
+        session = _shared_transport.make_session(
+            skip_auto_headers={"User-Agent"},
+            raise_for_status=True,
+            json_serialize=json_parser_policy.dumps,
+        )
+        _shared_sessions[loop] = session
+    return session
+
+
+async def close_shared_sessions() -> None:
+    """
+    Закрывает общую сессию текущего цикла событий (см. `get_shared_session`)
+    """
+    session = _shared_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+    await _shared_transport.close()
+
+
 async def download_file(
     url: str,
     *,
@@ -37,19 +96,213 @@ async def download_file(
     """
     Скачивание файлов по их прямой ссылке
     """
-    used_session = session or aiohttp.ClientSession(
-        connector=aiohttp.TCPConnector(ssl=ssl.SSLContext()),
-        skip_auto_headers={"User-Agent"},
-        raise_for_status=True,
-        json_serialize=json_parser_policy.dumps,
-    )
+    used_session = session or get_shared_session()
+    async with used_session.get(url, **kwargs) as response:
+        return await response.read()
+
+
+async def iter_file_chunks(
+    url: str,
+    *,
+    session: typing.Optional[aiohttp.ClientSession] = None,
+    chunk_size: int = 2 ** 16,
+    **kwargs,
+) -> typing.AsyncIterator[bytes]:
+    """
+    Скачивание файла по прямой ссылке частями: в памяти
+    держится только текущая часть, а не весь файл.
+    Итератор можно сразу передать в `upload_doc_to_message`
+    """
+    used_session = session or get_shared_session()
+    async with used_session.get(url, **kwargs) as response:
+        async for chunk in response.content.iter_chunked(chunk_size):
+            yield chunk
+
+
+async def save_file(
+    url: str,
+    path: typing.Union[str, os.PathLike],
+    *,
+    session: typing.Optional[aiohttp.ClientSession] = None,
+    budget: typing.Optional[ByteBudget] = None,
+    chunk_size: int = 2 ** 16,
+    **kwargs,
+) -> int:
+    """
+    Скачивание файла по прямой ссылке сразу на диск, частями.
+    Файл сначала пишется в `<path>.part` и переименовывается
+    только после успешного скачивания, поэтому при ошибке
+    или отмене недокачанный файл не остается
+
+    Arguments:
+        url: Прямая ссылка на файл
+        path: Куда сохранить файл
+        session: Сессия для запроса. Если не передана,
+            используется общая (см. `get_shared_session`)
+        budget: Общий для нескольких скачиваний лимит байтов,
+            одновременно находящихся в памяти. Каждая часть
+            занимает в нем `chunk_size` байтов, пока не будет
+            записана на диск, поэтому учитываются и файлы
+            без `Content-Length`
+        chunk_size: Размер частей, которыми файл пишется на диск
+
+    Returns:
+        Сколько байтов было записано
+    """
+    used_session = session or get_shared_session()
+    part_path = f"{os.fspath(path)}.part"
     async with used_session.get(url, **kwargs) as response:
-        downloaded_file = await response.read()
+        try:
+            written_size = 0
+            async with aiofiles.open(part_path, "wb") as file:
+                while True:
+                    reserved_size = 0
+                    if budget is not None:
+                        reserved_size = await budget.acquire(chunk_size)
+                    try:
+                        chunk = await response.content.read(chunk_size)
+                        if not chunk:
+                            break
+                        await file.write(chunk)
+                    finally:
+                        if budget is not None:
+                            budget.release(reserved_size)
+                    written_size += len(chunk)
+            os.replace(part_path, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(part_path)
+            raise
+        return written_size
+
+
+async def save_files(
+    targets: typing.Iterable[
+        typing.Tuple[str, typing.Union[str, os.PathLike]]
+    ],
+    *,
+    session: typing.Optional[aiohttp.ClientSession] = None,
+    max_parallel_downloads: int = 4,
+    budget: typing.Optional[ByteBudget] = None,
+    chunk_size: int = 2 ** 16,
+) -> typing.List[int]:
+    """
+    Скачивание нескольких файлов на диск (см. `save_file`)
+    с ограничением числа одновременных скачиваний
+
+    Arguments:
+        targets: Пары из прямой ссылки и пути, куда сохранить файл
+        session: Сессия для запросов. Если не передана,
+            используется общая (см. `get_shared_session`)
+        max_parallel_downloads: Сколько файлов скачивается одновременно
+        budget: Ограничение суммарного размера частей файлов,
+            одновременно находящихся в памяти
+        chunk_size: Размер частей, которыми файлы пишутся на диск
+
+    Returns:
+        Размеры записанных файлов в порядке `targets`
+    """
+    downloads_semaphore = asyncio.Semaphore(max_parallel_downloads)
+
+    async def save(url: str, path: typing.Union[str, os.PathLike]) -> int:
+        async with downloads_semaphore:
+            return await save_file(
+                url,
+                path,
+                session=session,
+                budget=budget,
+                chunk_size=chunk_size,
+            )
+
+    return await asyncio.gather(*(save(url, path) for url, path in targets))
+
+
+class ByteBudget:
+    """
+    Ограничивает суммарный размер одновременно передаваемых данных.
+    Передачи получают бюджет в порядке очереди. Передача больше
+    всего лимита не запрещается, но начинается только тогда,
+    когда остальные передачи завершились
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        if max_bytes < 1:
+            raise ValueError("`max_bytes` should be positive")
+        self._max_bytes = max_bytes
+        self._used_bytes = 0
+        self._waiters: typing.Deque[
+            typing.Tuple[int, asyncio.Future]
+        ] = collections.deque()
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
 
-    if session is None:
-        await used_session.close()
+    @property
+    def used_bytes(self) -> int:
+        """
+        Сколько байтов занято передачами прямо сейчас
+        """
+        return self._used_bytes
 
-    return downloaded_file
+    async def acquire(self, size: int) -> int:
+        """
+        Ждет, пока в бюджете освободится `size` байтов, и занимает их
+
+        Returns:
+            Сколько байтов было занято на самом деле. Именно
+            это число нужно передать в `release`
+        """
+        size = min(max(size, 0), self._max_bytes)
+        if not self._waiters and self._used_bytes + size <= self._max_bytes:
+            self._used_bytes += size
+            return size
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((size, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.cancelled():
+                # Отмененная передача могла задерживать очередь
+                self._wake_up_waiters()
+            else:
+                self.release(size)
+            raise
+        return size
+
+    def release(self, size: int) -> None:
+        self._used_bytes -= size
+        self._wake_up_waiters()
+
+    def _wake_up_waiters(self) -> None:
+        while self._waiters:
+            size, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if self._used_bytes + size > self._max_bytes:
+                break
+            self._waiters.popleft()
+            self._used_bytes += size
+            future.set_result(None)
+
+    @contextlib.asynccontextmanager
+    async def reserve(self, size: int) -> typing.AsyncIterator[None]:
+        """
+        Занимает `size` байтов на время блока `async with`
+        """
+        reserved_size = await self.acquire(size)
+        try:
+            yield
+        finally:
+            self.release(reserved_size)
+
+    def __repr__(self) -> str:
+        return (
+            f"<vkquick.{self.__class__.__name__} "
+            f"used_bytes={self._used_bytes} max_bytes={self._max_bytes}>"
+        )
 
 
 _registration_date_regex = re.compile('ya:created dc:date="(?P<date>.*?)"')
@@ -58,25 +311,18 @@ _registration_date_regex = re.compile('ya:created dc:date="(?P<date>.*?)"')
 async def get_user_registration_date(
     id_: int, *, session: typing.Optional[aiohttp.ClientSession] = None
 ) -> datetime.datetime:
-    request_session = session or aiohttp.ClientSession(
-        connector=aiohttp.TCPConnector(ssl=False),
-        skip_auto_headers={"User-Agent"},
-        raise_for_status=True,
-        json_serialize=json_parser_policy.dumps,
-    )
-    async with request_session:
-        async with request_session.get(
-            "https://vk.com/foaf.php", params={"id": id_}
-        ) as response:
-            user_info = await response.text()
-            registration_date = _registration_date_regex.search(user_info)
-            if registration_date is None:
-                raise ValueError(f"No such user with id `{id_}`")
-            registration_date = registration_date.group("date")
-            registration_date = datetime.datetime.fromisoformat(
-                registration_date
-            )
-            return registration_date
+    request_session = session or get_shared_session()
+    # Сертификат foaf.php не проверяется
+    async with request_session.get(
+        "https://vk.com/foaf.php", params={"id": id_}, ssl=False
+    ) as response:
+        user_info = await response.text()
+        registration_date = _registration_date_regex.search(user_info)
+        if registration_date is None:
+            raise ValueError(f"No such user with id `{id_}`")
+        registration_date = registration_date.group("date")
+        registration_date = datetime.datetime.fromisoformat(registration_date)
+        return registration_date
 
 
 def get_origin_typing(type):
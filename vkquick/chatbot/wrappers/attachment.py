@@ -1,12 +1,13 @@
 from __future__ import annotations
 
+import os
 import typing
 
 import aiohttp
 
 from vkquick.base.api_serializable import APISerializableMixin
 from vkquick.chatbot.base.wrapper import Wrapper
-from vkquick.chatbot.utils import download_file
+from vkquick.chatbot.utils import download_file, iter_file_chunks, save_file
 
 
 class Attachment(Wrapper, APISerializableMixin):
@@ -58,6 +59,38 @@ class Photo(Attachment):
             self.fields["sizes"][-1]["url"], session=session
         )
 
+    def iter_max_size(
+        self,
+        *,
+        session: typing.Optional[aiohttp.ClientSession] = None,
+        chunk_size: int = 2 ** 16,
+    ) -> typing.AsyncIterator[bytes]:
+        """
+        Скачивает фотографию максимального размера частями
+        """
+        return iter_file_chunks(
+            self.fields["sizes"][-1]["url"],
+            session=session,
+            chunk_size=chunk_size,
+        )
+
+    async def save_max_size(
+        self,
+        path: typing.Union[str, os.PathLike],
+        *,
+        session: typing.Optional[aiohttp.ClientSession] = None,
+    ) -> int:
+        """
+        Сохраняет фотографию максимального размера на диск, не держа
+        ее в памяти целиком
+
+        Returns:
+            Размер сохраненного файла
+        """
+        return await save_file(
+            self.fields["sizes"][-1]["url"], path, session=session
+        )
+
 
 class Document(Attachment):
     _name = "doc"
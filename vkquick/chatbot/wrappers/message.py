@@ -15,7 +15,7 @@ from vkquick.chatbot.wrappers.attachment import Document, Photo
 from vkquick.json_parsers import json_parser_policy
 
 if typing.TYPE_CHECKING:  # pragma: no cover
-    from vkquick.api import API, PhotoEntityTyping
+    from vkquick.api import API, DocumentContentTyping, PhotoEntityTyping
     from vkquick.chatbot.storages import NewMessage
 
     AttachmentTyping = typing.Union[str, Photo, Document]
@@ -215,7 +215,7 @@ class SentMessage:
 
         Arguments:
             photos: Фотографии в виде ссылки/пути до файла/сырых байтов/
-                IO-хранилища/Path-like объекта
+                IO-хранилища/Path-like объекта/асинхронного итератора байтов
 
         Returns:
             Список врапперов загруженных фотографий, который можно напрямую
@@ -227,7 +227,7 @@ class SentMessage:
 
     async def upload_doc(
         self,
-        content: typing.Union[str, bytes],
+        content: DocumentContentTyping,
         filename: str,
         *,
         tags: typing.Optional[str] = None,
@@ -238,8 +238,8 @@ class SentMessage:
         Загружает документ для отправки в сообщение
 
         Arguments:
-            content: Содержимое документа. Документ может быть
-                как текстовым, так и содержать сырые байты
+            content: Содержимое документа: текст, сырые байты, Path-like
+                объект, открытый файл или асинхронный итератор байтов
             filename: Имя файла
             tags: Теги для файла, используемые при поиске
             return_tags: Возвращать переданные теги при запросе
@@ -1,25 +1,280 @@
 from __future__ import annotations
 
 import abc
+import asyncio
+import collections
+import dataclasses
 import datetime
+import time
 import typing
 
 import aiohttp
 
 from vkquick.chatbot.base.wrapper import Wrapper
 from vkquick.chatbot.utils import get_user_registration_date
+from vkquick.exceptions import APIError
 
 if typing.TYPE_CHECKING:  # pragma: no cover
     from vkquick.api import API
+    from vkquick.api_pool import APIPool
 
 T = typing.TypeVar("T")
 FieldsTypevar = typing.TypeVar("FieldsTypevar")
 IDType: typing.TypeAlias = typing.Union[str, int]
 
 
+@dataclasses.dataclass
+class PagesCacheStatistics:
+    """
+    Счетчики кэша страниц
+
+    Arguments:
+        hits: Сколько страниц было отдано из кэша
+        misses: Сколько страниц пришлось запросить
+        evictions: Сколько записей было вытеснено из-за размера кэша
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+class _CachedPage(typing.NamedTuple):
+    fields: dict
+    # Поля, которые запрашивались. В ответе какого-то из них может
+    # не быть (скрыто настройками приватности), но запрашивать его
+    # повторно все равно бессмысленно
+    requested_fields: typing.FrozenSet[str]
+    expires_at: float
+
+
+class PagesCache:
+    """
+    Кэш полей пользователей и групп. Ключ записи -- тип страницы, ее ID
+    и падеж имени, поэтому запросы той же страницы с другим набором
+    полей не промахиваются: страница отдается из кэша, если у записи уже
+    есть все запрошенные поля, а новые поля дописываются в запись.
+
+    Записи живут `ttl` секунд, при переполнении вытесняются
+    давно не использованные. Один кэш можно передать
+    нескольким `API` через параметр `pages_cache`
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 300.0) -> None:
+        """
+        Arguments:
+            maxsize: Максимальное число записей
+            ttl: Время жизни записи в секундах
+        """
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._pages: typing.OrderedDict[
+            typing.Tuple[type, int, typing.Optional[str]], _CachedPage
+        ] = collections.OrderedDict()
+        self._statistics = PagesCacheStatistics()
+
+    @property
+    def statistics(self) -> PagesCacheStatistics:
+        return self._statistics
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def get(
+        self,
+        page_class: type,
+        page_id: int,
+        fields: typing.Iterable[str],
+        name_case: typing.Optional[str] = None,
+    ) -> typing.Optional[dict]:
+        """
+        Возвращает поля страницы, если в кэше есть
+        непросроченная запись со всеми запрошенными полями
+        """
+        key = (page_class, page_id, name_case)
+        cached_page = self._pages.get(key)
+        if (
+            cached_page is None
+            or cached_page.expires_at <= time.monotonic()
+            or not cached_page.requested_fields.issuperset(fields)
+        ):
+            self._statistics.misses += 1
+            return None
+        self._pages.move_to_end(key)
+        self._statistics.hits += 1
+        return dict(cached_page.fields)
+
+    def put(
+        self,
+        page_class: type,
+        page_fields: dict,
+        fields: typing.Iterable[str],
+        name_case: typing.Optional[str] = None,
+    ) -> None:
+        """
+        Сохраняет поля страницы, полученные с запрошенными `fields`,
+        дополняя ими уже закэшированные поля той же страницы
+        """
+        key = (page_class, page_fields["id"], name_case)
+        now = time.monotonic()
+        cached_page = self._pages.pop(key, None)
+        if cached_page is not None and cached_page.expires_at > now:
+            # Время жизни записи не продлевается: старые
+            # поля не должны жить дольше `ttl`
+            cached_page = _CachedPage(
+                fields={**cached_page.fields, **page_fields},
+                requested_fields=cached_page.requested_fields.union(fields),
+                expires_at=cached_page.expires_at,
+            )
+        else:
+            cached_page = _CachedPage(
+                fields=dict(page_fields),
+                requested_fields=frozenset(fields),
+                expires_at=now + self._ttl,
+            )
+        self._pages[key] = cached_page
+        while len(self._pages) > self._maxsize:
+            self._pages.popitem(last=False)
+            self._statistics.evictions += 1
+
+    def clear(self) -> None:
+        self._pages.clear()
+
+
+_LoaderKey = typing.Tuple[type, typing.Tuple[str, ...], typing.Optional[str]]
+
+
+class PagesLoader:
+    """
+    Объединяет страницы, запрошенные через `fetch_one` из разных
+    корутин за один проход цикла событий (или за `delay` секунд),
+    в один `users.get`/`groups.getById` на каждый набор полей.
+    Каждый вызвавший получает собственную обертку.
+
+    Если страницу получить не удалось (ошибка API или ее нет в ответе),
+    вызвавший запрашивает ее сам, чтобы получить ту же ошибку,
+    что и без объединения
+    """
+
+    def __init__(
+        self, api: typing.Union[API, APIPool], delay: float = 0.0
+    ) -> None:
+        """
+        Arguments:
+            api: Через что отправлять объединенные запросы
+            delay: Сколько секунд собирать запросы. `0` -- только
+                запросы, сделанные за текущий проход цикла событий
+        """
+        self._api = api
+        self._delay = delay
+        self._pending_pages: typing.Dict[
+            _LoaderKey, typing.Dict[int, typing.List[asyncio.Future]]
+        ] = {}
+        self._flushing_tasks: typing.Set[asyncio.Task] = set()
+
+    def load(
+        self,
+        page_class: typing.Type[Page],
+        page_id: int,
+        fields: typing.Iterable[str],
+        name_case: typing.Optional[str] = None,
+    ) -> asyncio.Future:
+        """
+        Ставит страницу в ближайший объединенный запрос
+
+        Returns:
+            Future с полями страницы или `None`, если страницу
+            нужно запросить отдельно
+        """
+        key = (page_class, tuple(fields), name_case)
+        pending_pages = self._pending_pages.get(key)
+        if pending_pages is None:
+            pending_pages = self._pending_pages[key] = {}
+            flushing_task = asyncio.create_task(self._flush(key))
+            self._flushing_tasks.add(flushing_task)
+            flushing_task.add_done_callback(self._flushing_tasks.discard)
+        future = asyncio.get_running_loop().create_future()
+        pending_pages.setdefault(page_id, []).append(future)
+        return future
+
+    async def _flush(self, key: _LoaderKey) -> None:
+        await asyncio.sleep(self._delay)
+        pending_pages = self._pending_pages.pop(key)
+        page_class, fields, name_case = key
+        page_ids = list(pending_pages)
+        batch_size = page_class.max_fetched_pages
+        for offset in range(0, len(page_ids), batch_size):
+            ids_chunk = page_ids[offset : offset + batch_size]
+            try:
+                fetched_pages = await page_class._request_pages(  # noqa
+                    self._api, ids_chunk, fields, name_case
+                )
+            except APIError:
+                fetched_pages = []
+            except Exception as error:
+                for page_id in ids_chunk:
+                    for future in pending_pages[page_id]:
+                        if not future.done():
+                            future.set_exception(error)
+                continue
+
+            pages_fields = {}
+            for page_fields in fetched_pages:
+                self._api.pages_cache.put(
+                    page_class, page_fields, fields, name_case
+                )
+                pages_fields[page_fields["id"]] = page_fields
+            for page_id in ids_chunk:
+                for future in pending_pages[page_id]:
+                    if not future.done():
+                        future.set_result(pages_fields.get(page_id))
+
+
+async def _load_page(
+    page_class: typing.Type[Page],
+    api: API,
+    id: IDType,
+    fields: typing.Iterable[str],
+    name_case: typing.Optional[str] = None,
+) -> typing.Optional[dict]:
+    """
+    Поля страницы из кэша или из объединенного запроса.
+    `None` -- страницу нужно запросить отдельно
+    """
+    page_id = _cacheable_page_id(id)
+    if page_id is None:
+        return None
+    cached_fields = api.pages_cache.get(
+        page_class, page_id, fields, name_case
+    )
+    if cached_fields is not None:
+        return cached_fields
+    page_fields = await api.pages_loader.load(
+        page_class, page_id, fields, name_case
+    )
+    if page_fields is None:
+        return None
+    # Словарь полей общий для всех, кто ждал эту страницу
+    return dict(page_fields)
+
+
+def _cacheable_page_id(page_id: IDType) -> typing.Optional[int]:
+    """
+    ID страницы для ключа кэша. Короткие имена не кэшируются по ключу,
+    так как неизвестно, какому ID они соответствуют
+    """
+    if isinstance(page_id, int):
+        return page_id
+    if page_id.isdecimal():
+        return int(page_id)
+    return None
+
+
 class Page(Wrapper, abc.ABC):
 
     _mention_prefix: str
+    # Сколько страниц можно получить одним запросом
+    max_fetched_pages: int
 
     @property
     @abc.abstractmethod
@@ -57,6 +312,20 @@ class Page(Wrapper, abc.ABC):
     ) -> typing.List[T]:
         pass
 
+    @classmethod
+    @abc.abstractmethod
+    async def _request_pages(
+        cls,
+        api: API,
+        ids: typing.List[int],
+        fields: typing.Iterable[str],
+        name_case: typing.Optional[str],
+    ) -> typing.List[dict]:
+        """
+        Запрашивает поля нескольких страниц одним запросом
+        (используется `PagesLoader`)
+        """
+
     @property
     def id(self) -> int:
         return self.fields["id"]
@@ -93,6 +362,7 @@ class Group(Page):
 
     _mention_prefix = "club"
     default_fields = ()
+    max_fetched_pages = 500
 
     @property
     def fullname(self) -> str:
@@ -113,13 +383,30 @@ class Group(Page):
         *,
         fields: typing.Optional[typing.List[str]] = None,
     ) -> Group:
+        fields = fields or cls.default_fields
+        page_fields = await _load_page(cls, api, id, fields)
+        if page_fields is not None:
+            return cls(page_fields)
         group = await api.use_cache().method(
             "groups.get_by_id",
             group_id=id,
-            fields=fields or cls.default_fields,
+            fields=fields,
         )
+        api.pages_cache.put(cls, group[0], fields)
         return cls(group[0])
 
+    @classmethod
+    async def _request_pages(
+        cls,
+        api: API,
+        ids: typing.List[int],
+        fields: typing.Iterable[str],
+        name_case: typing.Optional[str],
+    ) -> typing.List[dict]:
+        return await api.method(
+            "groups.get_by_id", group_ids=ids, fields=fields
+        )
+
     @classmethod
     async def fetch_many(
         cls: typing.Type[Group],
@@ -128,19 +415,23 @@ class Group(Page):
         *ids: IDType,
         fields: typing.Optional[typing.List[str]] = None,
     ) -> typing.List[Group]:
-        groups = await api.use_cache().method(
-            "groups.get_by_id",
-            group_id=ids,
-            fields=fields or cls.default_fields,
+        fields = fields or cls.default_fields
+        return await _fetch_many_via_cache(
+            cls,
+            api,
+            ids,
+            fields,
+            lambda missed_ids: api.use_cache().method(
+                "groups.get_by_id", group_id=missed_ids, fields=fields
+            ),
         )
-        groups = [cls(group) for group in groups]
-        return groups
 
 
 class User(Page, typing.Generic[FieldsTypevar]):
 
     _mention_prefix = "id"
     default_fields = ("sex",)
+    max_fetched_pages = 1000
 
     def is_group(self) -> bool:
         return False
@@ -203,14 +494,31 @@ class User(Page, typing.Generic[FieldsTypevar]):
         fields: typing.Optional[typing.List[str]] = None,
         name_case: typing.Optional[str] = None,
     ) -> User:
+        fields = fields or cls.default_fields
+        page_fields = await _load_page(cls, api, id, fields, name_case)
+        if page_fields is not None:
+            return cls(page_fields)
         user = await api.use_cache().method(
             "users.get",
             user_ids=id,
-            fields=fields or cls.default_fields,
+            fields=fields,
             name_case=name_case,
         )
+        api.pages_cache.put(cls, user[0], fields, name_case)
         return cls(user[0])
 
+    @classmethod
+    async def _request_pages(
+        cls,
+        api: API,
+        ids: typing.List[int],
+        fields: typing.Iterable[str],
+        name_case: typing.Optional[str],
+    ) -> typing.List[dict]:
+        return await api.method(
+            "users.get", user_ids=ids, fields=fields, name_case=name_case
+        )
+
     @classmethod
     async def fetch_many(
         cls: typing.Type[User],
@@ -220,11 +528,62 @@ class User(Page, typing.Generic[FieldsTypevar]):
         fields: typing.Optional[typing.List[str]] = None,
         name_case: typing.Optional[str] = None,
     ) -> typing.List[User]:
-        users = await api.use_cache().method(
-            "users.get",
-            user_ids=ids,
-            fields=fields or cls.default_fields,
+        fields = fields or cls.default_fields
+        return await _fetch_many_via_cache(
+            cls,
+            api,
+            ids,
+            fields,
+            lambda missed_ids: api.use_cache().method(
+                "users.get",
+                user_ids=missed_ids,
+                fields=fields,
+                name_case=name_case,
+            ),
             name_case=name_case,
         )
-        users = [cls(user) for user in users]
-        return users
+
+
+async def _fetch_many_via_cache(
+    page_class: typing.Type[T],
+    api: API,
+    ids: typing.Sequence[IDType],
+    fields: typing.Iterable[str],
+    fetch: typing.Callable[
+        [typing.Sequence[IDType]], typing.Awaitable[typing.List[dict]]
+    ],
+    *,
+    name_case: typing.Optional[str] = None,
+) -> typing.List[T]:
+    """
+    Запрашивает через `fetch` только те страницы, которых нет в кэше,
+    и возвращает страницы в порядке `ids`. Если среди `ids` есть
+    короткие имена, запрашиваются все страницы
+    """
+    page_ids = list(map(_cacheable_page_id, ids))
+    if None in page_ids:
+        fetched_pages = await fetch(ids)
+        for page_fields in fetched_pages:
+            api.pages_cache.put(page_class, page_fields, fields, name_case)
+        return [page_class(page_fields) for page_fields in fetched_pages]
+
+    pages_fields = {}
+    missed_ids = []
+    for page_id in page_ids:
+        cached_fields = api.pages_cache.get(
+            page_class, page_id, fields, name_case
+        )
+        if cached_fields is None:
+            missed_ids.append(page_id)
+        else:
+            pages_fields[page_id] = cached_fields
+    if missed_ids:
+        for page_fields in await fetch(missed_ids):
+            api.pages_cache.put(page_class, page_fields, fields, name_case)
+            pages_fields[page_fields["id"]] = page_fields
+    # Несуществующие страницы API пропускает
+    return [
+        page_class(pages_fields[page_id])
+        for page_id in dict.fromkeys(page_ids)
+        if page_id in pages_fields
+    ]
@@ -10,6 +10,7 @@ from vkquick.event import GroupEvent, UserEvent
 
 if typing.TYPE_CHECKING:  # pragma: no cover
     from vkquick.base.json_parser import BaseJSONParser
+    from vkquick.transport import TransportConfig
 
 
 class GroupLongPoll(BaseLongPoll):
@@ -25,6 +26,8 @@ class GroupLongPoll(BaseLongPoll):
         ] = None,
         requests_session: typing.Optional[aiohttp.ClientSession] = None,
         json_parser: typing.Optional[BaseJSONParser] = None,
+        pipeline_queue_size: int = 64,
+        transport: typing.Optional[TransportConfig] = None,
     ) -> None:
         super().__init__(
             api=api,
@@ -32,6 +35,8 @@ class GroupLongPoll(BaseLongPoll):
             new_event_callbacks=new_event_callbacks,
             requests_session=requests_session,
             json_parser=json_parser,
+            pipeline_queue_size=pipeline_queue_size,
+            transport=transport,
         )
         self._group_id = group_id
         self._wait = wait
@@ -71,6 +76,8 @@ class UserLongPoll(BaseLongPoll):
         ] = None,
         requests_session: typing.Optional[aiohttp.ClientSession] = None,
         json_parser: typing.Optional[BaseJSONParser] = None,
+        pipeline_queue_size: int = 64,
+        transport: typing.Optional[TransportConfig] = None,
     ) -> None:
         super().__init__(
             api=api,
@@ -78,6 +85,8 @@ class UserLongPoll(BaseLongPoll):
             new_event_callbacks=new_event_callbacks,
             requests_session=requests_session,
             json_parser=json_parser,
+            pipeline_queue_size=pipeline_queue_size,
+            transport=transport,
         )
         self._version = version
         self._wait = wait
@@ -0,0 +1,87 @@
+"""
+Имплементации ограничителей частоты API запросов
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+import typing
+
+from vkquick.base.rate_limiter import BaseRateLimiter
+
+
+class TokenBucketRateLimiter(BaseRateLimiter):
+    """
+    Ограничитель частоты по алгоритму token bucket: корзина
+    вмещает `burst` токенов и пополняется со скоростью `per_second`
+    токенов в секунду. Пока в корзине есть токены, запросы уходят
+    сразу (пачкой), а когда токены кончаются -- ожидают пополнения.
+
+    Ожидающие запросы обслуживаются строго в порядке очереди.
+    """
+
+    def __init__(
+        self, per_second: float, burst: typing.Optional[int] = None
+    ) -> None:
+        """
+        Arguments:
+            per_second: Сколько запросов в секунду разрешено в среднем
+            burst: Сколько запросов можно отправить разом. По умолчанию
+                равно `per_second`
+        """
+        if per_second <= 0:
+            raise ValueError("`per_second` should be positive")
+        self._per_second = per_second
+        self._burst = burst if burst is not None else max(1, int(per_second))
+        self._tokens = float(self._burst)
+        self._updated_at = time.monotonic()
+        # Лок создается лениво, чтобы ограничитель можно
+        # было создать вне запущенного цикла событий
+        self._lock: typing.Optional[asyncio.Lock] = None
+
+        self.acquired_count = 0
+        self.delayed_count = 0
+        self.waiting_time = 0.0
+
+    @property
+    def per_second(self) -> float:
+        return self._per_second
+
+    @property
+    def burst(self) -> int:
+        return self._burst
+
+    @property
+    def headroom(self) -> float:
+        self._refill()
+        return self._tokens
+
+    async def acquire(self) -> None:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # Лок в asyncio честный (FIFO), поэтому ожидающие
+        # запросы получают токены в порядке поступления
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                waiting_time = (1 - self._tokens) / self._per_second
+                self.delayed_count += 1
+                self.waiting_time += waiting_time
+                await asyncio.sleep(waiting_time)
+                self._refill()
+            self._tokens -= 1
+            self.acquired_count += 1
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self._burst,
+            self._tokens + (now - self._updated_at) * self._per_second,
+        )
+        self._updated_at = now
+
+    def __repr__(self) -> str:
+        return (
+            f"<vkquick.{self.__class__.__name__} "
+            f"per_second={self._per_second!r} burst={self._burst!r}>"
+        )
@@ -0,0 +1,329 @@
+"""
+Настройки HTTP транспорта: пул соединений, keep-alive,
+DNS кэш и параметры сокетов
+"""
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import functools
+import inspect
+import socket
+import ssl as ssl_module
+import typing
+import weakref
+
+import aiohttp
+from loguru import logger
+
+# `socket_factory` появился только в новых версиях aiohttp
+_SOCKET_FACTORY_SUPPORTED = (
+    "socket_factory"
+    in inspect.signature(aiohttp.TCPConnector.__init__).parameters
+)
+
+
+@dataclasses.dataclass
+class TransportStatistics:
+    """
+    Состояние пула соединений коннектора
+
+    Arguments:
+        opened: Сколько соединений было открыто за все время
+        in_use: Сколько соединений занято запросами прямо сейчас.
+            Соединение занято, пока тело ответа не прочитано
+            или ответ не освобожден
+        idle: Сколько открытых соединений ждут следующего запроса.
+            `None`, если версия aiohttp не позволяет следить за сокетами
+        limit: Максимум одновременных соединений (0 -- без ограничения)
+        limit_per_host: Максимум соединений к одному хосту
+    """
+
+    opened: int = 0
+    in_use: int = 0
+    idle: typing.Optional[int] = 0
+    limit: int = 0
+    limit_per_host: int = 0
+
+
+class TransportConnector(aiohttp.TCPConnector):
+    """
+    `TCPConnector`, который выставляет параметры сокетов
+    из `TransportConfig` и считает соединения через `trace_config`.
+    Счетчики видят только запросы сессий, созданных
+    с этим `trace_config` (`TransportConfig.make_session` передает его сам)
+    """
+
+    def __init__(
+        self,
+        *,
+        tcp_nodelay: bool = True,
+        send_buffer_size: typing.Optional[int] = None,
+        receive_buffer_size: typing.Optional[int] = None,
+        **kwargs,
+    ) -> None:
+        if _SOCKET_FACTORY_SUPPORTED:
+            kwargs["socket_factory"] = self._make_socket
+        elif send_buffer_size is not None or receive_buffer_size is not None:
+            logger.warning(
+                "Socket buffer sizes are ignored: "
+                "this aiohttp version doesn't support `socket_factory`"
+            )
+        super().__init__(**kwargs)
+        self._tcp_nodelay = tcp_nodelay
+        self._send_buffer_size = send_buffer_size
+        self._receive_buffer_size = receive_buffer_size
+        self._sockets: weakref.WeakSet = weakref.WeakSet()
+        self._opened_connections = 0
+        self._connections_in_use = 0
+        self.trace_config = self._make_trace_config()
+
+    def _make_socket(self, addr_info: tuple) -> socket.socket:
+        family, type_, proto, _, _ = addr_info
+        sock = socket.socket(family=family, type=type_, proto=proto)
+        self._sockets.add(sock)
+        if family in {socket.AF_INET, socket.AF_INET6}:
+            # Буферы выставляются до подключения,
+            # чтобы от них зависел масштаб TCP окна
+            if self._send_buffer_size is not None:
+                sock.setsockopt(
+                    socket.SOL_SOCKET,
+                    socket.SO_SNDBUF,
+                    self._send_buffer_size,
+                )
+            if self._receive_buffer_size is not None:
+                sock.setsockopt(
+                    socket.SOL_SOCKET,
+                    socket.SO_RCVBUF,
+                    self._receive_buffer_size,
+                )
+        return sock
+
+    async def _create_connection(self, req, traces, timeout):
+        protocol = await super()._create_connection(req, traces, timeout)
+        # asyncio и aiohttp включают TCP_NODELAY при подключении,
+        # поэтому выключить его можно только у готового соединения
+        if not self._tcp_nodelay and protocol.transport is not None:
+            sock = protocol.transport.get_extra_info("socket")
+            if sock is not None and sock.family in {
+                socket.AF_INET,
+                socket.AF_INET6,
+            }:
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, False)
+        return protocol
+
+    def _make_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_connection_create_end.append(
+            self._on_connection_create_end
+        )
+        trace_config.on_connection_reuseconn.append(
+            self._on_connection_acquired
+        )
+        trace_config.on_request_redirect.append(self._on_connection_released)
+        trace_config.on_request_exception.append(
+            self._on_connection_released
+        )
+        trace_config.on_request_end.append(self._on_request_end)
+        return trace_config
+
+    async def _on_connection_create_end(self, session, context, params):
+        self._opened_connections += 1
+        await self._on_connection_acquired(session, context, params)
+
+    async def _on_connection_acquired(self, session, context, params):
+        context.holds_connection = True
+        self._connections_in_use += 1
+
+    async def _on_connection_released(self, session, context, params):
+        self._release_connection(context)
+
+    def _release_connection(self, context) -> None:
+        # Запрос мог упасть еще до получения соединения
+        if getattr(context, "holds_connection", False):
+            context.holds_connection = False
+            self._connections_in_use -= 1
+
+    async def _on_request_end(self, session, context, params):
+        # После заголовков тело ответа еще может читаться,
+        # поэтому соединение освобождается вместе с ответом
+        connection = params.response.connection
+        if connection is None:
+            self._release_connection(context)
+        else:
+            connection.add_callback(
+                functools.partial(self._release_connection, context)
+            )
+
+    @property
+    def statistics(self) -> TransportStatistics:
+        idle = None
+        if _SOCKET_FACTORY_SUPPORTED:
+            # У закрытого сокета `fileno` -- -1
+            alive = sum(sock.fileno() != -1 for sock in self._sockets)
+            idle = max(alive - self._connections_in_use, 0)
+        return TransportStatistics(
+            opened=self._opened_connections,
+            in_use=self._connections_in_use,
+            idle=idle,
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+        )
+
+
+@dataclasses.dataclass
+class TransportConfig:
+    """
+    Настройки HTTP транспорта, которые принимают `API`,
+    `GroupLongPoll`, `UserLongPoll` и общая сессия
+    вспомогательных функций (`set_shared_transport`)
+
+    Arguments:
+        limit: Максимум одновременных соединений (0 -- без ограничения)
+        limit_per_host: Максимум соединений к одному хосту
+            (0 -- без ограничения)
+        keepalive_timeout: Сколько секунд держать
+            неиспользуемое соединение открытым
+        ttl_dns_cache: Сколько секунд кэшировать DNS ответы
+            (`None` -- бессрочно)
+        tcp_nodelay: Отключает алгоритм Нейгла для сокетов
+        send_buffer_size: Размер буфера отправки сокета (`SO_SNDBUF`).
+            `None` -- значение системы
+        receive_buffer_size: Размер буфера приема сокета (`SO_RCVBUF`).
+            `None` -- значение системы
+        ssl: SSL контекст или `False`, чтобы не проверять сертификаты.
+            По умолчанию -- `ssl.SSLContext()`, как и раньше
+        share_connector: Все сессии, созданные с этими настройками
+            в одном цикле событий, используют один общий коннектор
+            (и один пул соединений). Его нужно закрыть через `close`
+        prewarm_connections: Сколько соединений открывать
+            заранее при запуске бота (`API.prewarm_connections`)
+    """
+
+    limit: int = 100
+    limit_per_host: int = 0
+    keepalive_timeout: float = 15.0
+    ttl_dns_cache: typing.Optional[int] = 10
+    tcp_nodelay: bool = True
+    send_buffer_size: typing.Optional[int] = None
+    receive_buffer_size: typing.Optional[int] = None
+    ssl: typing.Union[ssl_module.SSLContext, bool, None] = None
+    share_connector: bool = False
+    prewarm_connections: int = 0
+
+    _ssl_context: typing.Optional[ssl_module.SSLContext] = dataclasses.field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # Общие коннекторы, по одному на цикл событий
+    _shared_connectors: weakref.WeakKeyDictionary = dataclasses.field(
+        default_factory=weakref.WeakKeyDictionary,
+        init=False,
+        repr=False,
+        compare=False,
+    )
+
+    def _get_ssl(self) -> typing.Union[ssl_module.SSLContext, bool]:
+        if self.ssl is not None:
+            return self.ssl
+        # Контекст создается один раз на все соединения
+        if self._ssl_context is None:
+            self._ssl_context = ssl_module.SSLContext()
+        return self._ssl_context
+
+    def _make_connector(self) -> TransportConnector:
+        return TransportConnector(
+            tcp_nodelay=self.tcp_nodelay,
+            send_buffer_size=self.send_buffer_size,
+            receive_buffer_size=self.receive_buffer_size,
+            ssl=self._get_ssl(),
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            ttl_dns_cache=self.ttl_dns_cache,
+            use_dns_cache=True,
+        )
+
+    def get_connector(self) -> TransportConnector:
+        """
+        Возвращает коннектор для новой сессии: общий для
+        текущего цикла событий, если `share_connector`, иначе новый
+        """
+        if not self.share_connector:
+            return self._make_connector()
+        loop = asyncio.get_running_loop()
+        connector = self._shared_connectors.get(loop)
+        if connector is None or connector.closed:
+            connector = self._make_connector()
+            self._shared_connectors[loop] = connector
+        return connector
+
+    def make_session(self, **session_kwargs) -> aiohttp.ClientSession:
+        """
+        Создает сессию с коннектором из этих настроек.
+        Сессия не закрывает общий коннектор и передает
+        в него события запросов для `TransportStatistics`
+
+        Arguments:
+            session_kwargs: Остальные параметры `aiohttp.ClientSession`
+        """
+        connector = self.get_connector()
+        trace_configs = list(session_kwargs.pop("trace_configs", None) or ())
+        trace_configs.append(connector.trace_config)
+        return aiohttp.ClientSession(
+            connector=connector,
+            connector_owner=not self.share_connector,
+            trace_configs=trace_configs,
+            **session_kwargs,
+        )
+
+    async def prewarm(
+        self,
+        session: aiohttp.ClientSession,
+        url: str,
+        connections: typing.Optional[int] = None,
+    ) -> None:
+        """
+        Заранее открывает соединения к хосту `url`, чтобы первые
+        запросы не тратили время на TCP и TLS рукопожатия.
+        Ошибки не пробрасываются: прогрев -- только оптимизация
+
+        Arguments:
+            session: Сессия, в пул которой попадут соединения
+            url: Адрес хоста
+            connections: Сколько соединений открыть.
+                По умолчанию -- `prewarm_connections`
+        """
+        if connections is None:
+            connections = self.prewarm_connections
+        if connections < 1:
+            return
+
+        async def open_connection():
+            async with session.head(
+                url, allow_redirects=False, raise_for_status=False
+            ):
+                pass
+
+        results = await asyncio.gather(
+            *(open_connection() for _ in range(connections)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.warning(
+                    "Can't prewarm connection to {url}: {error!r}",
+                    url=url,
+                    error=result,
+                )
+                break
+
+    async def close(self) -> None:
+        """
+        Закрывает общий коннектор текущего цикла событий
+        (см. `share_connector`)
+        """
+        connector = self._shared_connectors.pop(
+            asyncio.get_running_loop(), None
+        )
+        if connector is not None:
+            await connector.close()